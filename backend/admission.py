@@ -0,0 +1,213 @@
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+from starlette.routing import BaseRoute, Match
+from metrics import Labels, registry
+
+ADMISSION_ENABLED = os.environ.get('ADMISSION_ENABLED', 'true').lower() == 'true'
+# Shared by every class; at or below the storage pool size, so excess requests wait here
+# in priority order instead of on the pool
+ADMISSION_MAX_CONCURRENT = int(os.environ.get('ADMISSION_MAX_CONCURRENT', '64'))
+
+registry.describe("app_admission_wait_seconds", "histogram", "Time requests spent queued for admission by class")
+
+class RequestClass:
+    """Admission settings and live counters for one class of routes; a lower priority number is served first"""
+
+    def __init__(self, name: str, priority: int, limit: int, max_queue: int, timeout_seconds: float):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.max_queue = max_queue
+        self.timeout_seconds = timeout_seconds
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"queue_full": 0, "timeout": 0}
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.timeout_seconds))
+
+def request_class_from_env(name: str, priority: int, limit: int, max_queue: int, timeout_seconds: float) -> RequestClass:
+    """Request class with defaults overridable by ADMISSION_<NAME>_LIMIT, _QUEUE and _TIMEOUT_SECONDS"""
+    prefix = f"ADMISSION_{name.upper()}"
+    return RequestClass(
+        name,
+        priority,
+        limit=int(os.environ.get(f'{prefix}_LIMIT', str(limit))),
+        max_queue=int(os.environ.get(f'{prefix}_QUEUE', str(max_queue))),
+        timeout_seconds=float(os.environ.get(f'{prefix}_TIMEOUT_SECONDS', str(timeout_seconds))),
+    )
+
+def default_request_classes() -> List[RequestClass]:
+    return [
+        # Catalog, plan, trip and shared-trip reads: may use every slot
+        request_class_from_env("interactive", 0, ADMISSION_MAX_CONCURRENT, 256, 1.0),
+        # Trip creation and progress updates
+        request_class_from_env("write", 1, max(ADMISSION_MAX_CONCURRENT // 2, 1), 128, 2.0),
+        # Exports and analytics scans
+        request_class_from_env("bulk", 2, 4, 16, 5.0),
+        # Seeding and rollup refreshes
+        request_class_from_env("admin", 3, 1, 2, 10.0),
+    ]
+
+class Overloaded(Exception):
+    def __init__(self, request_class: RequestClass, reason: str):
+        super().__init__(f"{request_class.name} requests over capacity ({reason})")
+        self.request_class = request_class
+        self.reason = reason
+
+class AdmissionController:
+    """Per-class concurrency limits under one shared limit, with freed slots granted by priority
+
+    A request starts at once when its class and the shared limit both have room.
+    Otherwise it waits, in a queue bounded per class, for at most its class timeout.
+    Every release hands slots to the waiting requests of the most urgent classes
+    (FIFO within a class) whose class limit allows it, so nothing left waiting could
+    have started. A full queue or an expired wait raises Overloaded.
+    """
+
+    def __init__(self, max_concurrent: int, request_classes: Iterable[RequestClass]):
+        self.max_concurrent = max_concurrent
+        self.classes: Dict[str, RequestClass] = {request_class.name: request_class for request_class in request_classes}
+        self.in_flight = 0
+        # (priority, arrival, class, future); abandoned waits stay until popped, with their future cancelled
+        self._waiters: List[Tuple[int, int, RequestClass, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+
+    def _has_room(self, request_class: RequestClass) -> bool:
+        return self.in_flight < self.max_concurrent and request_class.in_flight < request_class.limit
+
+    def _start(self, request_class: RequestClass):
+        self.in_flight += 1
+        request_class.in_flight += 1
+        request_class.admitted += 1
+
+    def _shed(self, request_class: RequestClass, reason: str):
+        request_class.shed[reason] += 1
+        raise Overloaded(request_class, reason)
+
+    async def acquire(self, name: str) -> RequestClass:
+        """Wait for a slot for a request of the named class; pair with release()"""
+        request_class = self.classes[name]
+        if self._has_room(request_class):
+            self._start(request_class)
+            return request_class
+        if request_class.queued >= request_class.max_queue:
+            self._shed(request_class, "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (request_class.priority, next(self._arrivals), request_class, future))
+        request_class.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait({future}, timeout=request_class.timeout_seconds)
+        except BaseException:
+            # Client gone while waiting; give back a slot granted in the meantime
+            if future.done():
+                self.release(request_class)
+            else:
+                self._abandon(request_class, future)
+            raise
+        finally:
+            registry.observe("app_admission_wait_seconds", (("class", name),), time.perf_counter() - start)
+        if not future.done():
+            self._abandon(request_class, future)
+            self._shed(request_class, "timeout")
+        return request_class
+
+    def _abandon(self, request_class: RequestClass, future: asyncio.Future):
+        future.cancel()
+        request_class.queued -= 1
+
+    def release(self, request_class: RequestClass):
+        """Free a slot taken by acquire() and pass it on to the most urgent waiter that may run"""
+        self.in_flight -= 1
+        request_class.in_flight -= 1
+        blocked = []
+        while self._waiters and self.in_flight < self.max_concurrent:
+            waiter = heapq.heappop(self._waiters)
+            waiting_class, future = waiter[2], waiter[3]
+            if future.cancelled():
+                continue
+            if waiting_class.in_flight >= waiting_class.limit:
+                blocked.append(waiter)
+                continue
+            waiting_class.queued -= 1
+            self._start(waiting_class)
+            future.set_result(None)
+        for waiter in blocked:
+            heapq.heappush(self._waiters, waiter)
+
+    def samples(self) -> Iterable[Tuple[str, str, str, Labels, float]]:
+        """Queue depth, in-flight, admitted and shed counts per class, for the metrics registry"""
+        yield "app_admission_slots_in_use", "gauge", "Requests holding an admission slot", (), self.in_flight
+        for request_class in self.classes.values():
+            labels = (("class", request_class.name),)
+            yield "app_admission_in_flight", "gauge", "Admitted requests still running by class", labels, request_class.in_flight
+            yield "app_admission_queue_depth", "gauge", "Requests waiting for admission by class", labels, request_class.queued
+            yield "app_admission_admitted_total", "counter", "Requests admitted by class", labels, request_class.admitted
+            for reason, count in request_class.shed.items():
+                yield "app_admission_shed_total", "counter", "Requests rejected with 503 by class and reason", labels + (("reason", reason),), count
+
+class AdmissionMiddleware:
+    """ASGI middleware running each request under the admission slot of its route's class
+
+    classify(method, route_path) names the class, or returns None for routes that
+    bypass admission (health checks, metrics). Requests matching no route pass
+    through. The slot is held until the response, streamed or not, is finished.
+    """
+
+    def __init__(
+        self,
+        app,
+        controller: AdmissionController,
+        routes: List[BaseRoute],
+        classify: Callable[[str, str], Optional[str]]
+    ):
+        self.app = app
+        self.controller = controller
+        self.routes = routes
+        self.classify = classify
+
+    def _route(self, scope) -> Optional[BaseRoute]:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = self._route(scope)
+        name = self.classify(scope["method"], route.path) if route is not None else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            request_class = await self.controller.acquire(name)
+        except Overloaded as e:
+            # Labels the shed request in the HTTP metrics, as routing would have
+            scope["route"] = route
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, please retry"},
+                headers={"Retry-After": str(e.request_class.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(request_class)
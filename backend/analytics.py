@@ -0,0 +1,87 @@
+from collections import defaultdict
+from typing import Dict, List, Optional
+from models import activity_key
+
+def trips_per_day(buckets: List[dict]) -> List[dict]:
+    """Trips created per day and destination"""
+    counts = defaultdict(int)
+    for bucket in buckets:
+        counts[(bucket["date"], bucket["destination"])] += bucket["trips"]
+    return [
+        {"date": date, "destination": destination, "trips": trips}
+        for (date, destination), trips in sorted(counts.items(), key=lambda item: (item[0][0], item[0][1] or ""))
+    ]
+
+def budget_mix(buckets: List[dict]) -> List[dict]:
+    """Trips per budget tier with their share of the total"""
+    counts = defaultdict(int)
+    for bucket in buckets:
+        counts[bucket["selected_budget"]] += bucket["trips"]
+    total = sum(counts.values())
+    return [
+        {"selected_budget": tier, "trips": trips, "share": round(trips / total, 4)}
+        for tier, trips in sorted(counts.items(), key=lambda item: -item[1])
+    ]
+
+def _completion(trips: int, completion_sum: float, completed_trips: int) -> dict:
+    return {
+        "trips": trips,
+        "average_completion_percentage": round(completion_sum / trips * 100, 1) if trips else 0.0,
+        "completed_trips": completed_trips,
+    }
+
+def completion_summary(buckets: List[dict]) -> dict:
+    """Average completion percentage overall and per destination"""
+    per_destination: Dict[Optional[str], List[float]] = defaultdict(lambda: [0, 0.0, 0])
+    for bucket in buckets:
+        totals = per_destination[bucket["destination"]]
+        totals[0] += bucket["trips"]
+        totals[1] += bucket["completion_sum"]
+        totals[2] += bucket["completed_trips"]
+    overall = [sum(totals[index] for totals in per_destination.values()) for index in range(3)]
+    return {
+        **_completion(*overall),
+        "by_destination": sorted(
+            ({"destination": destination, **_completion(*totals)} for destination, totals in per_destination.items()),
+            key=lambda row: -row["trips"]
+        ),
+    }
+
+def skipped_activities(completion: dict, plans: Dict[tuple, object], limit: int) -> List[dict]:
+    """Activities of ended trips ranked by how many trips never checked them off
+
+    completion is Storage.aggregate_activity_completion output; plans maps
+    (destination, selected_budget) to the BudgetPlan the trips followed. Completions
+    count under the activity's positional key or, for trips stored as bitsets, its id.
+    """
+    completed = {
+        (row["destination"], row["selected_budget"], row["key"]): row["completed"]
+        for row in completion["completed"]
+    }
+    rows = []
+    for row in completion["trips"]:
+        plan_key = (row["destination"], row["selected_budget"])
+        budget_plan = plans.get(plan_key)
+        if budget_plan is None:
+            continue
+        for day_index, itinerary_day in enumerate(budget_plan.itinerary):
+            for activity_index, activity in enumerate(itinerary_day.activities):
+                key = activity_key(day_index, activity_index)
+                completions = completed.get((*plan_key, key), 0)
+                if activity.id is not None:
+                    completions += completed.get((*plan_key, activity.id), 0)
+                skipped = row["trips"] - completions
+                rows.append({
+                    "destination": row["destination"],
+                    "selected_budget": row["selected_budget"],
+                    "key": key,
+                    "activity_id": activity.id,
+                    "day": itinerary_day.day,
+                    "task": activity.task,
+                    "type": activity.type,
+                    "trips": row["trips"],
+                    "skipped": skipped,
+                    "skip_rate": round(skipped / row["trips"], 4),
+                })
+    rows.sort(key=lambda row: (-row["skipped"], -row["skip_rate"]))
+    return rows[:limit]
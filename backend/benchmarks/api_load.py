@@ -0,0 +1,229 @@
+"""Mixed-workload load test for the API with per-endpoint latency percentiles.
+
+Runs the FastAPI app in-process against an offline storage backend (memory by
+default, or sqlite / mongomock-motor; no MongoDB needed), seeds the sample catalog plus N synthetic destinations and M trips, then drives
+catalog browse, search, plan fetch, trip create, progress toggle and shared
+view traffic from --concurrency workers. Prints a JSON report; compare it
+against the previous deploy's report to catch regressions.
+
+    python benchmarks/api_load.py --destinations 1000 --trips 500 --concurrency 50 --duration 20
+    python benchmarks/api_load.py --storage sqlite
+    python benchmarks/api_load.py --url http://localhost:8001   # an already running server
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager, redirect_stdout
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ.setdefault("DB_NAME", "vacation_planner_bench")
+
+import httpx
+
+DEFAULT_MIX = "browse=25,search=20,plans=30,trip_create=5,progress=15,shared=5"
+TIERS = ["backpacker", "travelEnthusiast", "luxury"]
+
+def parse_mix(mix: str) -> dict:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        weights[name.strip()] = float(weight)
+    return weights
+
+async def use_storage(backend: str):
+    """Point the database module at a fresh offline storage backend"""
+    import database
+
+    if backend == "mongomock":
+        from mongomock_motor import AsyncMongoMockClient
+        from mongo_storage import MongoStorage
+        database.storage = MongoStorage(db=AsyncMongoMockClient()[os.environ["DB_NAME"]])
+    elif backend == "sqlite":
+        from sqlite_storage import SQLiteStorage
+        database.storage = SQLiteStorage(path=str(Path(tempfile.mkdtemp()) / "api_load.db"))
+    else:
+        from memory_storage import MemoryStorage
+        database.storage = MemoryStorage()
+    await database.storage.connect()
+
+async def seed(destinations: int):
+    """Sample catalog through seed_data, plus synthetic copies of its plans"""
+    from seed_data import seed_database
+    from seeding import load_catalog
+    from database import DatabaseManager
+    from models import DestinationCreate, TravelPlanCreate
+
+    # seed_data prints a confirmation; keep stdout for the JSON report
+    with redirect_stdout(sys.stderr):
+        await seed_database()
+    templates = [await DatabaseManager.get_travel_plan_by_destination(name) for name in ("Paris, France", "Tokyo, Japan")]
+
+    def records():
+        for i in range(destinations):
+            name = f"Benchmark City {i}, Country {i % 40}"
+            yield DestinationCreate(name=name, country=f"Country {i % 40}", popular=i % 25 == 0)
+            template = templates[i % len(templates)]
+            yield TravelPlanCreate(
+                destination_id=f"benchmark_city_{i}",
+                destination_name=name,
+                backpacker=template.backpacker,
+                travel_enthusiast=template.travel_enthusiast,
+                luxury=template.luxury,
+            )
+
+    await load_catalog(records())
+
+@asynccontextmanager
+async def api_client(url: str, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+            yield client
+        return
+
+    import server
+    async with server.lifespan(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            yield client
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, destination_names, planned_names, rng: random.Random):
+        self.client = client
+        self.destination_names = destination_names
+        # Destinations that have travel plans; the others would only measure 404s
+        self.planned_names = planned_names
+        self.rng = rng
+        self.trips = []
+
+    def destination(self) -> str:
+        return self.rng.choice(self.destination_names)
+
+    async def create_trip(self):
+        response = await self.client.post("/api/trips", json={
+            "destination": self.destination(),
+            "start_date": "2026-06-01T00:00:00",
+            "end_date": "2026-06-06T00:00:00",
+            "travelers": self.rng.randint(1, 4),
+            "selected_budget": self.rng.choice(TIERS),
+        })
+        if response.status_code == 200:
+            body = response.json()
+            self.trips.append((body["tripId"], body["shareToken"]))
+        return response
+
+    async def browse(self):
+        return await self.client.get("/api/destinations", params={"popular": True, "limit": 24, "fields": "name,country,popular"})
+
+    async def search(self):
+        name = self.destination()
+        return await self.client.get("/api/destinations/search", params={"q": name[: self.rng.randint(1, 6)]})
+
+    async def plans(self):
+        return await self.client.get(f"/api/destinations/{self.rng.choice(self.planned_names)}/plans")
+
+    async def trip_create(self):
+        return await self.create_trip()
+
+    async def progress(self):
+        trip_id, _ = self.rng.choice(self.trips)
+        key = f"{self.rng.randint(0, 2)}-{self.rng.randint(0, 5)}"
+        return await self.client.patch(f"/api/trips/{trip_id}/activities", json={"changes": {key: self.rng.random() < 0.7}})
+
+    async def shared(self):
+        _, share_token = self.rng.choice(self.trips)
+        return await self.client.get(f"/api/trips/shared/{share_token}")
+
+def summarize(samples, elapsed: float) -> dict:
+    latencies = sorted(latency for latency, _ in samples)
+    statuses = defaultdict(int)
+    for _, status in samples:
+        statuses[str(status)] += 1
+
+    def percentile(fraction):
+        return round(latencies[min(int(len(latencies) * fraction), len(latencies) - 1)], 3)
+
+    return {
+        "requests": len(samples),
+        "status_codes": dict(sorted(statuses.items())),
+        "throughput_rps": round(len(samples) / elapsed, 1),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": round(latencies[-1], 3),
+    }
+
+async def run(args) -> dict:
+    if not args.url:
+        await use_storage(args.storage)
+        await seed(args.destinations)
+
+    rng = random.Random(args.seed)
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    samples = defaultdict(list)
+
+    async with api_client(args.url, args.concurrency) as client:
+        destination_names = [destination["name"] for destination in (await client.get("/api/destinations")).json()]
+        planned_names = [
+            name for name in destination_names
+            if (await client.get(f"/api/destinations/{name}/plans")).status_code == 200
+        ]
+        workload = Workload(client, destination_names, planned_names, rng)
+        for _ in range(args.trips):
+            await workload.create_trip()
+
+        deadline = time.perf_counter() + args.duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                name = rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                response = await getattr(workload, name)()
+                samples[name].append(((time.perf_counter() - start) * 1000, response.status_code))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+
+    all_samples = [sample for endpoint_samples in samples.values() for sample in endpoint_samples]
+    return {
+        "config": {
+            "url": args.url or "in-process",
+            "storage": None if args.url else args.storage,
+            "destinations": args.destinations,
+            "trips": args.trips,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "mix": mix,
+        },
+        "endpoints": {name: summarize(endpoint_samples, elapsed) for name, endpoint_samples in sorted(samples.items())},
+        "total": summarize(all_samples, elapsed),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="", help="Target a running server instead of the in-process app")
+    parser.add_argument("--storage", choices=["memory", "sqlite", "mongomock"], default="memory", help="Backend for the in-process app")
+    parser.add_argument("--destinations", type=int, default=200, help="Synthetic destinations to seed")
+    parser.add_argument("--trips", type=int, default=100, help="Trips created before the timed run")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of timed traffic")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Comma-separated endpoint=weight pairs")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
@@ -0,0 +1,90 @@
+"""Interactive latency under overload, with and without admission control.
+
+Simulates a storage connection pool (--pool connections, waited on in FIFO order
+like Motor's) and drives it open-loop with fast interactive reads and slow bulk
+scans arriving faster than the pool can serve the scans. Without admission
+control every request queues on the pool; with it, requests pass through
+AdmissionController first (ADMISSION_* defaults scaled to --pool). Prints latency
+percentiles of completed requests and 503 counts per class. No database needed.
+
+    python benchmarks/bench_admission.py --duration 10 --interactive-rate 400 --bulk-rate 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from admission import AdmissionController, Overloaded, RequestClass
+
+def percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)] if samples else None
+
+async def run(args, admission: bool) -> dict:
+    rng = random.Random(args.seed)
+    pool = asyncio.Semaphore(args.pool)
+    controller = AdmissionController(args.pool, [
+        RequestClass("interactive", 0, args.pool, 256, 1.0),
+        RequestClass("bulk", 2, max(args.pool // 8, 1), 16, 5.0),
+    ])
+    latencies = defaultdict(list)
+    shed = defaultdict(int)
+
+    async def request(name: str, service_seconds: float):
+        start = time.perf_counter()
+        try:
+            request_class = await controller.acquire(name) if admission else None
+        except Overloaded:
+            shed[name] += 1
+            return
+        try:
+            async with pool:
+                await asyncio.sleep(service_seconds)
+        finally:
+            if request_class is not None:
+                controller.release(request_class)
+        latencies[name].append((time.perf_counter() - start) * 1000)
+
+    async def arrivals(name: str, rate: float, service_seconds: float, tasks: list):
+        deadline = time.perf_counter() + args.duration
+        while time.perf_counter() < deadline:
+            tasks.append(asyncio.ensure_future(request(name, service_seconds)))
+            await asyncio.sleep(rng.expovariate(rate))
+
+    tasks = []
+    await asyncio.gather(
+        arrivals("interactive", args.interactive_rate, args.interactive_ms / 1000, tasks),
+        arrivals("bulk", args.bulk_rate, args.bulk_ms / 1000, tasks),
+    )
+    await asyncio.gather(*tasks)
+
+    report = {"admission": admission}
+    for name in ("interactive", "bulk"):
+        samples = sorted(latencies[name])
+        report[name] = {
+            "completed": len(samples),
+            "shed": shed[name],
+            "p50_ms": round(percentile(samples, 0.50), 1) if samples else None,
+            "p99_ms": round(percentile(samples, 0.99), 1) if samples else None,
+        }
+    return report
+
+async def main(args):
+    print(json.dumps([await run(args, admission) for admission in (False, True)], indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pool", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--interactive-rate", type=float, default=400, help="Interactive requests per second")
+    parser.add_argument("--interactive-ms", type=float, default=5)
+    parser.add_argument("--bulk-rate", type=float, default=20, help="Bulk requests per second")
+    parser.add_argument("--bulk-ms", type=float, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,63 @@
+"""Per-keystroke latency of the destination typeahead index.
+
+Builds the in-memory index over a synthetic catalog and replays every prefix of
+a sample of names, the way a search box does while the user types. No database
+needed.
+
+    python benchmarks/bench_destination_search.py --size 100000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from search_index import DestinationSearchIndex
+
+SYLLABLES = ["ba", "ca", "de", "fé", "go", "hi", "jo", "ka", "lu", "ma", "né", "po", "ri", "sa", "to", "vi", "yo", "zé"]
+
+def synthetic_catalog(size: int, rng: random.Random):
+    for i in range(size):
+        city = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        country = "".join(rng.choice(SYLLABLES) for _ in range(3)).title()
+        name = f"{city} {i}, {country}"
+        yield name.casefold(), {"name": name, "country": country, "popular": i % 50 == 0, "image_url": None}
+
+def percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+def main(size: int, queries: int, limit: int, seed: int):
+    rng = random.Random(seed)
+    catalog = list(synthetic_catalog(size, rng))
+    index = DestinationSearchIndex()
+
+    start = time.perf_counter()
+    index.rebuild(catalog)
+    print(f"built index over {size} destinations in {time.perf_counter() - start:.2f}s")
+
+    samples = []
+    for _, destination in rng.sample(catalog, min(queries, size)):
+        name = destination["name"]
+        # Accent-free typing, as users usually do
+        typed = name.replace("é", "e")
+        for length in range(1, min(len(typed), 12) + 1):
+            start = time.perf_counter()
+            index.search(typed[:length], limit)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+
+    samples.sort()
+    print(
+        f"{len(samples)} keystrokes  "
+        f"p50={percentile(samples, 0.50):.1f}us  p99={percentile(samples, 0.99):.1f}us  max={samples[-1]:.1f}us"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.size, args.queries, args.limit, args.seed)
@@ -0,0 +1,68 @@
+"""Cold import time of the API module, from ``python -X importtime``.
+
+Imports ``server`` in fresh interpreters (best of --runs), prints the slowest
+modules by cumulative time and fails if the total exceeds --max-ms or if a
+module that should load on first use (storage drivers, the seed catalog, the
+CLI) was imported at startup. Worker cold start on autoscale pays exactly this.
+
+    python benchmarks/bench_import_time.py --max-ms 600
+    python benchmarks/bench_import_time.py --storage mongo --top 30
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Loaded by the lifespan or the first request that needs them, never by `import server`
+DEFERRED_MODULES = ["motor", "pymongo", "aiosqlite", "mongo_storage", "sqlite_storage", "memory_storage", "seed_data", "seeding", "typer"]
+
+def profile_import(module: str, storage: str) -> dict:
+    """Cumulative import time in microseconds per module for one cold import"""
+    env = {**os.environ, "STORAGE_BACKEND": storage, "PYTHONDONTWRITEBYTECODE": "1"}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+def main(args) -> int:
+    runs = [profile_import(args.module, args.storage) for _ in range(args.runs)]
+    best = min(runs, key=lambda timings: timings[args.module])
+    total_ms = best[args.module] / 1000
+
+    print(f"import {args.module} (STORAGE_BACKEND={args.storage}): {total_ms:.1f} ms, best of {args.runs}")
+    for name, cumulative in sorted(best.items(), key=lambda item: item[1], reverse=True)[1:args.top + 1]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = [module for module in DEFERRED_MODULES if module in best]
+    if eager:
+        failures.append(f"imported at startup but should load on first use: {', '.join(eager)}")
+    if args.max_ms and total_ms > args.max_ms:
+        failures.append(f"{total_ms:.1f} ms exceeds the {args.max_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="server")
+    parser.add_argument("--storage", default="mongo", help="STORAGE_BACKEND for the import; the driver must still not load")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to list")
+    parser.add_argument("--max-ms", type=float, default=0, help="Fail above this total (0 disables)")
+    sys.exit(main(parser.parse_args()))
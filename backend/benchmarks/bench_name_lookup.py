@@ -0,0 +1,68 @@
+"""Destination lookup latency as the catalog grows.
+
+Compares the indexed ``name_key`` lookup with the old anchored ``$regex`` scan.
+Needs a running MongoDB (STORAGE_BACKEND=mongo); uses ``BENCH_DB_NAME`` (default ``vacation_planner_bench``)
+and drops its collections between runs.
+
+    python benchmarks/bench_name_lookup.py --sizes 1000 10000 100000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "vacation_planner_bench")
+
+from database import DatabaseManager, get_storage, normalize_name
+
+storage = get_storage()
+destinations_collection = storage.destinations
+
+async def populate(size: int):
+    await destinations_collection.drop()
+    await storage.create_indexes()
+    batch = []
+    for i in range(size):
+        name = f"Destination {i}, Country {i % 200}"
+        batch.append({"id": str(i), "name": name, "name_key": normalize_name(name), "country": f"Country {i % 200}", "popular": False})
+        if len(batch) == 5000:
+            await destinations_collection.insert_many(batch)
+            batch = []
+    if batch:
+        await destinations_collection.insert_many(batch)
+
+async def time_lookups(lookup, names):
+    samples = []
+    for name in names:
+        start = time.perf_counter()
+        await lookup(name)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p99_ms": round(samples[int(len(samples) * 0.99) - 1], 3),
+    }
+
+async def regex_lookup(name: str):
+    return await destinations_collection.find_one({"name": {"$regex": f"^{name}$", "$options": "i"}})
+
+async def main(sizes, lookups: int):
+    for size in sizes:
+        await populate(size)
+        step = max(size // lookups, 1)
+        names = [f"destination {i}, country {i % 200}" for i in range(0, size, step)][:lookups]
+        indexed = await time_lookups(DatabaseManager.get_destination_by_name, names)
+        regex = await time_lookups(regex_lookup, names)
+        print(f"{size:>8} destinations  indexed={indexed}  regex={regex}")
+    await destinations_collection.drop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.lookups))
@@ -0,0 +1,85 @@
+"""Query latency of the plan activity/highlight search index.
+
+Builds the in-memory index over synthetic travel plans (three tiers of --days days
+with --per-day activities each) and runs a mix of queries: one common word, one
+rare word, two words, an activity type alone and a word narrowed by type. No
+database needed.
+
+    python benchmarks/bench_plan_search.py --plans 20000
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from models import BUDGET_TIERS
+from search_index import PlanSearchIndex
+
+TYPES = ["accommodation", "transport", "sightseeing", "dining", "activity"]
+COMMON_WORDS = ["visit", "tour", "lunch", "dinner", "walk", "museum", "market", "hotel", "train", "free"]
+RARE_WORDS = [f"landmark{index}" for index in range(5000)]
+
+def synthetic_plan(index: int, days: int, per_day: int, rng: random.Random) -> dict:
+    def budget_plan():
+        return {
+            "highlights": [f"{rng.choice(COMMON_WORDS)} {rng.choice(RARE_WORDS)}" for _ in range(4)],
+            "itinerary": [
+                {"day": day, "activities": [
+                    {
+                        "id": (day - 1) * per_day + slot,
+                        "time": f"{8 + slot:02d}:00",
+                        "task": " ".join([rng.choice(COMMON_WORDS), rng.choice(COMMON_WORDS), rng.choice(RARE_WORDS)]),
+                        "type": rng.choice(TYPES),
+                    }
+                    for slot in range(per_day)
+                ]}
+                for day in range(1, days + 1)
+            ],
+        }
+    return {"destination_name": f"Destination {index}", **{field: budget_plan() for field in BUDGET_TIERS.values()}}
+
+def percentile(samples, fraction):
+    return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+def main(plans: int, days: int, per_day: int, queries: int, limit: int, seed: int):
+    rng = random.Random(seed)
+    catalog = [(f"destination {index}", synthetic_plan(index, days, per_day, rng)) for index in range(plans)]
+    index = PlanSearchIndex()
+
+    start = time.perf_counter()
+    index.rebuild(catalog)
+    print(f"built index over {plans} plans ({plans * 3 * (days * per_day + 4)} entries) in {time.perf_counter() - start:.2f}s")
+
+    kinds = {
+        "common word": lambda: {"query": rng.choice(COMMON_WORDS)},
+        "rare word": lambda: {"query": rng.choice(RARE_WORDS)},
+        "two words": lambda: {"query": f"{rng.choice(COMMON_WORDS)} {rng.choice(COMMON_WORDS)}"},
+        "type only": lambda: {"activity_type": rng.choice(TYPES)},
+        "word + type": lambda: {"query": rng.choice(COMMON_WORDS), "activity_type": rng.choice(TYPES)},
+    }
+    for kind, arguments in kinds.items():
+        samples = []
+        totals = 0
+        for _ in range(queries):
+            start = time.perf_counter()
+            totals += index.search(limit=limit, **arguments())["total"]
+            samples.append((time.perf_counter() - start) * 1000)
+        samples.sort()
+        print(
+            f"{kind:12s} avg matches={totals // queries:8d}  "
+            f"p50={percentile(samples, 0.50):.2f}ms  p99={percentile(samples, 0.99):.2f}ms  max={samples[-1]:.2f}ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--plans", type=int, default=20000)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--per-day", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    main(args.plans, args.days, args.per_day, args.queries, args.limit, args.seed)
@@ -0,0 +1,178 @@
+"""Trip document size and check-off latency for both progress encodings.
+
+Compares trips storing progress as the completed_activities map (PROGRESS_ENCODING=map)
+with trips storing completed_bits (PROGRESS_ENCODING=bitset). Sizes are BSON
+bytes of whole trip documents at several completion levels, for the sample plans and
+a long synthetic itinerary (--days x --per-day activities); maps hold checked keys
+only, their smallest form, since unchecking leaves a False entry behind. Latency is
+DatabaseManager.apply_activity_changes for random single toggles on --trips trips of
+the long plan. The default mongo backend needs a running MongoDB and writes to
+BENCH_DB_NAME (default vacation_planner_bench); --storage memory/sqlite/mongomock
+run offline but only say something about the Python side.
+
+    python benchmarks/bench_progress_encoding.py
+    python benchmarks/bench_progress_encoding.py --storage mongomock --days 30 --per-day 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "vacation_planner_bench")
+
+import bson
+import database
+from database import DatabaseManager
+from models import Activity, ActivityProgressDelta, BudgetPlan, DayItinerary, TravelPlan, TravelPlanCreate, UserTrip, UserTripCreate
+from progress_encoding import to_bitset
+
+ENCODINGS = ["map", "bitset"]
+COMPLETION_LEVELS = [0.25, 0.5, 1.0]
+LONG_PLAN_DESTINATION = "Progress Benchmark"
+
+def long_plan(days: int, per_day: int) -> TravelPlanCreate:
+    """Travel plan whose tiers all follow one itinerary of days x per_day activities"""
+    budget_plan = BudgetPlan(
+        total_budget="$0",
+        duration=f"{days} days",
+        accommodation="Hotel",
+        transport="Train",
+        highlights=[],
+        itinerary=[
+            DayItinerary(day=day, title=f"Day {day}", activities=[
+                Activity(time=f"{8 + index:02d}:00", task=f"Activity {index + 1} of day {day}", type="activity")
+                for index in range(per_day)
+            ])
+            for day in range(1, days + 1)
+        ],
+    )
+    return TravelPlanCreate(
+        destination_id="progress_benchmark",
+        destination_name=LONG_PLAN_DESTINATION,
+        backpacker=budget_plan,
+        travel_enthusiast=budget_plan,
+        luxury=budget_plan,
+    )
+
+def with_activity_ids(plan: TravelPlanCreate) -> TravelPlan:
+    plan_obj = TravelPlan(**plan.dict())
+    plan_obj.assign_activity_ids()
+    return plan_obj
+
+def trip_document(budget_plan: BudgetPlan, fraction: float, encoding: str) -> dict:
+    """A stored trip with the first fraction of the plan's activities checked off"""
+    activity_ids = budget_plan.activity_ids()
+    keys = list(activity_ids)
+    completed_activities = {key: True for key in keys[:round(len(keys) * fraction)]}
+    trip = UserTrip(
+        destination=LONG_PLAN_DESTINATION,
+        start_date="2026-01-01T00:00:00",
+        end_date="2026-01-08T00:00:00",
+        travelers=2,
+        selected_budget="backpacker",
+        completed_count=len(completed_activities),
+        total_activities=len(keys),
+        user_email="traveler@example.com",
+        share_token="x" * 22,
+    ).dict()
+    if encoding == "bitset":
+        del trip["completed_activities"]
+        trip["completed_bits"] = to_bitset(completed_activities, activity_ids)
+    else:
+        trip["completed_activities"] = completed_activities
+    return trip
+
+def measure_sizes(plans) -> list:
+    rows = []
+    for name, budget_plan in plans:
+        for fraction in COMPLETION_LEVELS:
+            sizes = {encoding: len(bson.encode(trip_document(budget_plan, fraction, encoding))) for encoding in ENCODINGS}
+            rows.append({
+                "plan": name,
+                "activities": budget_plan.count_activities(),
+                "completed": fraction,
+                **{f"{encoding}_bytes": size for encoding, size in sizes.items()},
+                "saved": round(1 - sizes["bitset"] / sizes["map"], 3),
+            })
+    return rows
+
+async def use_storage(backend: str):
+    if backend == "mongomock":
+        from mongomock_motor import AsyncMongoMockClient
+        from mongo_storage import MongoStorage
+        database.storage = MongoStorage(db=AsyncMongoMockClient()[os.environ["DB_NAME"]])
+    elif backend == "sqlite":
+        from sqlite_storage import SQLiteStorage
+        database.storage = SQLiteStorage(path=str(Path(tempfile.mkdtemp()) / "bench_progress.db"))
+    elif backend == "memory":
+        from memory_storage import MemoryStorage
+        database.storage = MemoryStorage()
+    await DatabaseManager.connect()
+
+async def measure_latency(encoding: str, trips: int, toggles: int, activities: int) -> dict:
+    database.PROGRESS_ENCODING = encoding
+    trip_ids = [
+        (await DatabaseManager.create_user_trip(UserTripCreate(
+            destination=LONG_PLAN_DESTINATION,
+            start_date="2026-01-01T00:00:00",
+            end_date="2026-01-08T00:00:00",
+            travelers=2,
+            selected_budget="backpacker",
+        ))).id
+        for _ in range(trips)
+    ]
+    keys = list((await DatabaseManager.get_budget_plan(LONG_PLAN_DESTINATION, "backpacker")).activity_ids())
+    timings = []
+    for _ in range(toggles):
+        delta = ActivityProgressDelta(changes={random.choice(keys): random.random() < 0.7})
+        start = time.perf_counter()
+        await DatabaseManager.apply_activity_changes(random.choice(trip_ids), delta)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "encoding": encoding,
+        "activities": activities,
+        "toggles": toggles,
+        "mean_ms": round(statistics.mean(timings), 3),
+        "p50_ms": round(timings[len(timings) // 2], 3),
+        "p95_ms": round(timings[int(len(timings) * 0.95)], 3),
+    }
+
+async def main(args):
+    from seed_data import build_sample_catalog
+
+    plan = long_plan(args.days, args.per_day)
+    sample_plans = [
+        (f"{sample.destination_name} {field}", with_activity_ids(sample).get_budget_plan(field))
+        for sample in build_sample_catalog() if isinstance(sample, TravelPlanCreate)
+        for field in ("backpacker", "luxury")
+    ]
+    sizes = measure_sizes([*sample_plans, (f"{args.days}x{args.per_day} synthetic", with_activity_ids(plan).backpacker)])
+
+    await use_storage(args.storage)
+    await DatabaseManager.upsert_travel_plans([plan])
+    latency = [
+        await measure_latency(encoding, args.trips, args.toggles, args.days * args.per_day)
+        for encoding in ENCODINGS
+    ]
+    await DatabaseManager.close()
+    print(json.dumps({"storage": args.storage, "document_bytes": sizes, "check_off_latency": latency}, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storage", choices=["mongo", "mongomock", "sqlite", "memory"], default="mongo")
+    parser.add_argument("--days", type=int, default=14)
+    parser.add_argument("--per-day", type=int, default=8)
+    parser.add_argument("--trips", type=int, default=200)
+    parser.add_argument("--toggles", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+    asyncio.run(main(args))
@@ -0,0 +1,76 @@
+"""Database query rate for one hot key as concurrent clients scale from 1 to 1000.
+
+Each round expires the cached plan and fires N concurrent plan lookups for the
+same destination, the way a trending destination looks at cache expiry. With
+single-flight the query count per round stays at one regardless of N; pass
+--no-single-flight to see the uncoalesced baseline. Needs a running MongoDB;
+seeds the sample catalog into BENCH_DB_NAME (default vacation_planner_bench).
+
+    python benchmarks/bench_single_flight.py --clients 1 10 100 1000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["DB_NAME"] = os.environ.get("BENCH_DB_NAME", "vacation_planner_bench")
+
+import database
+from database import DatabaseManager, normalize_name
+
+DESTINATION = "Paris, France"
+
+class CountingCollection:
+    """Proxies a Motor collection, counting find_one calls"""
+
+    def __init__(self, collection):
+        self._collection = collection
+        self.queries = 0
+
+    async def find_one(self, *args, **kwargs):
+        self.queries += 1
+        return await self._collection.find_one(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+async def run_level(clients: int, rounds: int, single_flight: bool, counter: CountingCollection) -> dict:
+    key = normalize_name(DESTINATION)
+    lookup = (
+        (lambda: DatabaseManager.get_travel_plan_by_destination(DESTINATION))
+        if single_flight
+        else (lambda: DatabaseManager.load_travel_plan(key))
+    )
+    counter.queries = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        DatabaseManager.invalidate_travel_plan(key)
+        await asyncio.gather(*(lookup() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "queries_per_round": round(counter.queries / rounds, 2),
+        "queries_per_second": round(counter.queries / elapsed, 1),
+        "requests_per_second": round(clients * rounds / elapsed, 1),
+    }
+
+async def main(client_levels, rounds: int, single_flight: bool):
+    from seed_data import seed_database
+    await DatabaseManager.connect()
+    await seed_database()
+    storage = database.get_storage()
+    counter = CountingCollection(storage.travel_plans)
+    storage.travel_plans = counter
+    for clients in client_levels:
+        print(await run_level(clients, rounds, single_flight, counter))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--no-single-flight", dest="single_flight", action="store_false")
+    args = parser.parse_args()
+    asyncio.run(main(args.clients, args.rounds, args.single_flight))
@@ -0,0 +1,71 @@
+"""CPU per plan request: validated reads vs trusted reads.
+
+Replays the work /api/destinations/{name}/plans does per request once the
+document is in hand, using the sample Paris plan as stored in Mongo:
+
+- validated: TravelPlan(**doc), then FastAPI's response_model path
+  (dump, re-validate against TravelPlansResponse, jsonable_encoder, json.dumps)
+- trusted: construct_trusted(TravelPlan, doc), then model_dump_json directly
+
+    python benchmarks/bench_trusted_reads.py --iterations 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "vacation_planner_bench")
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from models import TravelPlan, TravelPlanCreate, TravelPlansResponse, construct_trusted
+from seed_data import build_sample_catalog
+from server import build_travel_plans_response
+
+def stored_plan_document() -> dict:
+    plan = next(record for record in build_sample_catalog() if isinstance(record, TravelPlanCreate))
+    document = TravelPlan(**plan.model_dump()).model_dump()
+    document.update({"_id": "0" * 24, "destination_key": plan.destination_name.casefold()})
+    return document
+
+response_adapter = TypeAdapter(TravelPlansResponse)
+
+def validated(document: dict) -> bytes:
+    travel_plan = TravelPlan(**document)
+    response = build_travel_plans_response(travel_plan)
+    value = response_adapter.validate_python(response.model_dump())
+    return json.dumps(jsonable_encoder(value), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def trusted(document: dict) -> bytes:
+    travel_plan = construct_trusted(TravelPlan, document)
+    return build_travel_plans_response(travel_plan).model_dump_json().encode("utf-8")
+
+def measure(function, document: dict, iterations: int) -> float:
+    for _ in range(min(iterations, 200)):
+        function(document)
+    start = time.process_time()
+    for _ in range(iterations):
+        function(document)
+    return (time.process_time() - start) / iterations * 1_000_000
+
+def main(iterations: int):
+    document = stored_plan_document()
+    assert json.loads(validated(document)) == json.loads(trusted(document))
+    before = measure(validated, document, iterations)
+    after = measure(trusted, document, iterations)
+    print(json.dumps({
+        "iterations": iterations,
+        "validated_cpu_us_per_request": round(before, 1),
+        "trusted_cpu_us_per_request": round(after, 1),
+        "speedup": round(before / after, 2),
+    }, indent=2))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.iterations)
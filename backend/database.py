@@ -1,103 +1,760 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient
 from models import *
-from typing import List, Optional
+from cache import TTLCache
+from storage import ProgressChanges, Storage, create_storage, progress_total
+from search_index import DestinationSearchIndex, PlanSearchIndex
+from singleflight import SingleFlight
+from write_behind import ProgressWriteBuffer
+from metrics import instrument, timed
+from analytics import skipped_activities
+from itinerary import calendar_date, plan_day_indexes, scale_budget, trip_length
+from progress_encoding import count_bits, ordinal_changes, to_bitset, to_completed_activities
+from datetime import datetime, time, timedelta, timezone, tzinfo
+from typing import AsyncIterator, List, Optional, Tuple
+import asyncio
+import logging
 import secrets
+import unicodedata
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# Storage backend (mongo, memory or sqlite), chosen with STORAGE_BACKEND. Created by
+# DatabaseManager.connect() inside the app lifespan, not at import, so workers boot fast
+storage: Optional[Storage] = None
+storage_ready = False
 
-# Collections
-destinations_collection = db.destinations
-travel_plans_collection = db.travel_plans
-user_trips_collection = db.user_trips
+def get_storage() -> Storage:
+    """The configured backend, created (but not connected) on first use"""
+    global storage
+    if storage is None:
+        storage = create_storage()
+    return storage
 
+# Read-through caches for catalog data, which only changes on catalog writes
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '1024'))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '300'))
+destinations_cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+travel_plans_cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+
+# Typeahead index over the destination catalog, rebuilt at startup and kept current on writes
+SEARCH_FOLD_ACCENTS = os.environ.get('SEARCH_FOLD_ACCENTS', 'true').lower() == 'true'
+destination_search_index = DestinationSearchIndex(fold_accents=SEARCH_FOLD_ACCENTS)
+SEARCH_SUMMARY_FIELDS = ("name", "country", "popular", "image_url")
+
+# Full-text index over plan activities and highlights, loaded at startup and kept current on plan writes
+plan_search_index = PlanSearchIndex(fold_accents=SEARCH_FOLD_ACCENTS)
+PLAN_INDEX_BATCH_SIZE = int(os.environ.get('PLAN_INDEX_BATCH_SIZE', '200'))
+
+# Share links can go viral: short-lived cache plus coalescing of concurrent misses
+SHARED_TRIP_CACHE_MAX_ENTRIES = int(os.environ.get('SHARED_TRIP_CACHE_MAX_ENTRIES', '10000'))
+SHARED_TRIP_CACHE_TTL_SECONDS = float(os.environ.get('SHARED_TRIP_CACHE_TTL_SECONDS', '5'))
+shared_trips_cache = TTLCache(max_entries=SHARED_TRIP_CACHE_MAX_ENTRIES, ttl_seconds=SHARED_TRIP_CACHE_TTL_SECONDS)
+shared_trip_flights = SingleFlight()
+
+# Concurrent identical reads await one in-flight query instead of each hitting storage
+read_flights = SingleFlight()
+SHARED_TRIP_FIELDS = (*(field for field in SharedTrip.model_fields if field != "progress_percentage"), "completed_bits")
+
+# Documents in our collections were validated on write; rebuild them without re-validating
+TRUSTED_READS = os.environ.get('TRUSTED_READS', 'true').lower() == 'true'
+
+# Optional write-behind for activity check-offs: merged per trip, flushed after a window or size threshold
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'false').lower() == 'true'
+WRITE_BEHIND_WINDOW_MS = int(os.environ.get('WRITE_BEHIND_WINDOW_MS', '250'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '1000'))
+progress_buffer = ProgressWriteBuffer(
+    flush_callback=lambda batch: DatabaseManager.write_buffered_progress(batch),
+    window_seconds=WRITE_BEHIND_WINDOW_MS / 1000,
+    max_pending=WRITE_BEHIND_MAX_PENDING,
+) if WRITE_BEHIND_ENABLED else None
+# Ids of trips known to exist, so buffered check-offs are only acknowledged for real trips
+known_trips_cache = TTLCache(max_entries=SHARED_TRIP_CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+
+# Dashboards read materialized per-day rollups instead of aggregating user_trips on every request.
+# Refreshes recompute the last ANALYTICS_ROLLUP_LOOKBACK_DAYS creation days, where progress still moves
+ANALYTICS_ROLLUPS_ENABLED = os.environ.get('ANALYTICS_ROLLUPS_ENABLED', 'false').lower() == 'true'
+ANALYTICS_ROLLUP_LOOKBACK_DAYS = int(os.environ.get('ANALYTICS_ROLLUP_LOOKBACK_DAYS', '30'))
+
+# "bitset" stores new trips' progress as completed_bits, a bitset over activity ids, instead of
+# the map of positional keys. It is smaller, but on Mongo every check-off becomes a read plus a
+# compare-and-set instead of one $set/$inc, so it is opt-in. The API reads and writes the map either way.
+# migrations.py converts stored trips to bitsets; there is no way back, so keep bitset once migrated
+PROGRESS_ENCODING = os.environ.get('PROGRESS_ENCODING', 'map').lower()
+# Plan (destination, tier) of trips stored with completed_bits; a trip's plan never changes
+bitset_trips_cache = TTLCache(max_entries=SHARED_TRIP_CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+
+# Trip exports stream from a cursor TRIP_EXPORT_BATCH_SIZE documents at a time, with only these fields
+TRIP_EXPORT_BATCH_SIZE = int(os.environ.get('TRIP_EXPORT_BATCH_SIZE', '500'))
+TRIP_EXPORT_FIELDS = (
+    "id", "destination", "start_date", "end_date", "travelers", "selected_budget",
+    "completed_count", "total_activities", "user_email", "created_at",
+)
+
+# Trip itineraries share one day layout per (destination, tier, length) while the plan is unchanged
+ITINERARY_MAX_DAYS = int(os.environ.get('ITINERARY_MAX_DAYS', '365'))
+itinerary_templates_cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=CACHE_TTL_SECONDS)
+
+def normalize_name(name: str) -> str:
+    """Canonical lookup key for a destination name (NFKC, casefolded, single-spaced)"""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+def from_document(model, document: dict):
+    """Model from a stored document, skipping validation when TRUSTED_READS is on"""
+    return construct_trusted(model, document) if TRUSTED_READS else model(**document)
+
+def search_summary(destination: dict) -> dict:
+    return {field: destination.get(field) for field in SEARCH_SUMMARY_FIELDS}
+
+def stored_changes(changes: Dict[str, bool], activity_ids: Optional[Dict[str, int]]) -> ProgressChanges:
+    """Activity changes keyed like the trip stores progress: by id when it has activity_ids"""
+    return ordinal_changes(changes, activity_ids) if activity_ids is not None else changes
+
+@instrument("db")
 class DatabaseManager:
     
+    @staticmethod
+    async def connect():
+        """Prepare storage for serving (indexes, warm pool), then load the search indexes"""
+        global storage_ready
+        await get_storage().connect()
+        await DatabaseManager.rebuild_search_index()
+        await DatabaseManager.rebuild_plan_search_index()
+        storage_ready = True
+    
+    @staticmethod
+    async def close():
+        """Close all pooled connections"""
+        global storage_ready
+        storage_ready = False
+        if storage is not None:
+            await storage.close()
+    
+    @staticmethod
+    def is_ready() -> bool:
+        """Whether connect() has finished and requests can be served"""
+        return storage_ready
+    
+    @staticmethod
+    async def ping():
+        """Round trip to the storage backend"""
+        await storage.ping()
+    
+    @staticmethod
+    def pool_stats() -> Dict[str, float]:
+        """Connection pool saturation counters"""
+        return storage.pool_stats() if storage is not None else {}
+    
     @staticmethod
     async def create_destination(destination: DestinationCreate) -> Destination:
         """Create a new destination"""
         destination_obj = Destination(**destination.dict())
-        await destinations_collection.insert_one(destination_obj.dict())
+        document = destination_obj.dict()
+        document["name_key"] = normalize_name(destination_obj.name)
+        await storage.insert_destination(document)
+        destinations_cache.clear()
+        destination_search_index.add(document["name_key"], search_summary(document))
         return destination_obj
     
     @staticmethod
     async def get_destinations(popular_only: bool = False) -> List[Destination]:
         """Get all destinations or only popular ones"""
-        query = {"popular": True} if popular_only else {}
-        destinations = await destinations_collection.find(query).to_list(1000)
-        return [Destination(**dest) for dest in destinations]
+        cache_key = ("list", popular_only)
+        cached = destinations_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        # Keyed by generation too: a read after an invalidation must not join a load started before it
+        generation = destinations_cache.generation
+        return await read_flights.do(
+            (*cache_key, generation),
+            lambda: DatabaseManager.load_destinations(popular_only, generation)
+        )
+    
+    @staticmethod
+    async def load_destinations(popular_only: bool, generation: Optional[int] = None) -> List[Destination]:
+        destinations = await storage.find_destinations(popular_only)
+        with timed("model.Destination"):
+            result = [from_document(Destination, dest) for dest in destinations]
+        destinations_cache.set(("list", popular_only), result, generation)
+        return result
+    
+    @staticmethod
+    async def iter_destinations(
+        limit: int,
+        after: Optional[str] = None,
+        country: Optional[str] = None,
+        popular_only: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[dict]:
+        """Stream raw destination documents ordered by name_key, starting after a keyset cursor"""
+        async for document in storage.iter_destinations(limit, after, country, popular_only, fields):
+            yield document
+    
+    @staticmethod
+    async def rebuild_search_index():
+        """Load the catalog into the typeahead index"""
+        entries = [
+            (document["name_key"], search_summary(document))
+            async for document in storage.iter_destinations(fields=list(SEARCH_SUMMARY_FIELDS))
+            if document.get("name_key")
+        ]
+        destination_search_index.rebuild(entries)
+    
+    @staticmethod
+    def search_destinations(query: str, limit: int = 10) -> List[dict]:
+        """Prefix search over destination names and countries"""
+        return destination_search_index.search(query, limit)
+    
+    @staticmethod
+    async def rebuild_plan_search_index():
+        """Load every travel plan into the plan search index"""
+        plans = [
+            (document["destination_key"], document)
+            async for document in storage.iter_travel_plans(PLAN_INDEX_BATCH_SIZE)
+            if document.get("destination_key")
+        ]
+        plan_search_index.rebuild(plans)
+    
+    @staticmethod
+    def search_plans(
+        query: str = "",
+        activity_type: Optional[str] = None,
+        tier: Optional[str] = None,
+        destination: Optional[str] = None,
+        limit: int = 20,
+        after: Optional[Tuple[float, int]] = None
+    ) -> dict:
+        """Ranked full-text search over plan activities and highlights, with activity type facets"""
+        field = budget_field(tier) if tier else None
+        return plan_search_index.search(
+            query,
+            activity_type=activity_type,
+            # The index holds API tier names
+            tier=next((name for name, tier_field in BUDGET_TIERS.items() if tier_field == field), None),
+            destination_key=normalize_name(destination) if destination else None,
+            limit=limit,
+            after=after
+        )
     
     @staticmethod
     async def get_destination_by_name(name: str) -> Optional[Destination]:
         """Find destination by name (case insensitive)"""
-        destination = await destinations_collection.find_one({
-            "name": {"$regex": f"^{name}$", "$options": "i"}
-        })
-        return Destination(**destination) if destination else None
+        name_key = normalize_name(name)
+        cached = destinations_cache.get(("name", name_key))
+        if cached is not None:
+            return cached
+        generation = destinations_cache.generation
+        return await read_flights.do(
+            ("name", name_key, generation),
+            lambda: DatabaseManager.load_destination(name_key, generation)
+        )
+    
+    @staticmethod
+    async def load_destination(name_key: str, generation: Optional[int] = None) -> Optional[Destination]:
+        destination = await storage.find_destination(name_key)
+        if not destination:
+            return None
+        with timed("model.Destination"):
+            result = from_document(Destination, destination)
+        destinations_cache.set(("name", name_key), result, generation)
+        return result
     
     @staticmethod
     async def create_travel_plan(travel_plan: TravelPlanCreate) -> TravelPlan:
         """Create travel plan for a destination"""
         plan_obj = TravelPlan(**travel_plan.dict())
-        await travel_plans_collection.insert_one(plan_obj.dict())
+        plan_obj.assign_activity_ids()
+        document = plan_obj.dict()
+        document["destination_key"] = normalize_name(plan_obj.destination_name)
+        await storage.insert_travel_plan(document)
+        DatabaseManager.invalidate_travel_plan(document["destination_key"])
+        plan_search_index.add(document["destination_key"], document)
         return plan_obj
     
+    @staticmethod
+    def invalidate_travel_plan(destination_key: str):
+        """Drop a destination's plan and its per-tier slices from the cache"""
+        travel_plans_cache.invalidate(destination_key)
+        for field in BUDGET_TIERS.values():
+            travel_plans_cache.invalidate((destination_key, field))
+    
     @staticmethod
     async def get_travel_plan_by_destination(destination_name: str) -> Optional[TravelPlan]:
         """Get travel plan by destination name (case insensitive)"""
-        plan = await travel_plans_collection.find_one({
-            "destination_name": {"$regex": f"^{destination_name}$", "$options": "i"}
-        })
-        return TravelPlan(**plan) if plan else None
+        destination_key = normalize_name(destination_name)
+        cached = travel_plans_cache.get(destination_key)
+        if cached is not None:
+            return cached
+        generation = travel_plans_cache.generation
+        return await read_flights.do(
+            ("plan", destination_key, generation),
+            lambda: DatabaseManager.load_travel_plan(destination_key, generation)
+        )
+    
+    @staticmethod
+    async def load_travel_plan(destination_key: str, generation: Optional[int] = None) -> Optional[TravelPlan]:
+        plan = await storage.find_travel_plan(destination_key)
+        if not plan:
+            return None
+        with timed("model.TravelPlan"):
+            result = from_document(TravelPlan, plan)
+        travel_plans_cache.set(destination_key, result, generation)
+        return result
+    
+    @staticmethod
+    async def upsert_destinations(destinations: List[DestinationCreate]) -> int:
+        """Insert or update a batch of destinations keyed on normalized name, in one bulk_write"""
+        if not destinations:
+            return 0
+        documents = []
+        for destination in destinations:
+            # id and created_at only land on insert; existing destinations keep theirs
+            document = Destination(**destination.dict()).dict()
+            document["name_key"] = normalize_name(destination.name)
+            documents.append(document)
+        written = await storage.upsert_destinations(documents)
+        destinations_cache.clear()
+        for document in documents:
+            destination_search_index.add(document["name_key"], search_summary(document))
+        return written
+    
+    @staticmethod
+    async def upsert_travel_plans(travel_plans: List[TravelPlanCreate]) -> int:
+        """Insert or update a batch of travel plans keyed on normalized destination, in one bulk_write"""
+        if not travel_plans:
+            return 0
+        destination_keys = [normalize_name(travel_plan.destination_name) for travel_plan in travel_plans]
+        # Activities keep their ids across edits, so stored progress still points at them
+        previous_plans = await storage.find_travel_plans(destination_keys)
+        documents = []
+        for travel_plan, destination_key in zip(travel_plans, destination_keys):
+            previous = previous_plans.get(destination_key)
+            plan_obj = TravelPlan(**travel_plan.dict())
+            plan_obj.assign_activity_ids(from_document(TravelPlan, previous) if previous else None)
+            document = plan_obj.dict()
+            document["destination_key"] = destination_key
+            documents.append(document)
+        written = await storage.upsert_travel_plans(documents)
+        for document in documents:
+            DatabaseManager.invalidate_travel_plan(document["destination_key"])
+            plan_search_index.add(document["destination_key"], document)
+        return written
+    
+    @staticmethod
+    async def get_budget_plan(destination_name: str, tier: str) -> Optional[BudgetPlan]:
+        """Fetch and validate a single budget tier of a destination's travel plan"""
+        field = budget_field(tier)
+        if not field:
+            return None
+        
+        destination_key = normalize_name(destination_name)
+        cached = travel_plans_cache.get((destination_key, field))
+        if cached is not None:
+            return cached
+        generation = travel_plans_cache.generation
+        return await read_flights.do(
+            ("plan", destination_key, field, generation),
+            lambda: DatabaseManager.load_budget_plan(destination_key, field, generation)
+        )
+    
+    @staticmethod
+    async def load_budget_plan(destination_key: str, field: str, generation: Optional[int] = None) -> Optional[BudgetPlan]:
+        budget_plan = await storage.find_budget_plan(destination_key, field)
+        if not budget_plan:
+            return None
+        with timed("model.BudgetPlan"):
+            result = from_document(BudgetPlan, budget_plan)
+        travel_plans_cache.set((destination_key, field), result, generation)
+        return result
+    
+    @staticmethod
+    async def get_plan_day(destination_name: str, tier: str, day: int) -> Optional[DayItinerary]:
+        """Fetch a single itinerary day of a budget tier, filtered server-side"""
+        field = budget_field(tier)
+        if not field:
+            return None
+        
+        destination_key = normalize_name(destination_name)
+        cached = travel_plans_cache.get((destination_key, field))
+        if cached is not None:
+            return next((itinerary_day for itinerary_day in cached.itinerary if itinerary_day.day == day), None)
+        
+        itinerary_day = await storage.find_plan_day(destination_key, field, day)
+        if not itinerary_day:
+            return None
+        with timed("model.DayItinerary"):
+            return from_document(DayItinerary, itinerary_day)
+    
+    @staticmethod
+    def get_itinerary_template(destination_key: str, field: str, budget_plan: BudgetPlan, length: int) -> List[Tuple[int, DayItinerary]]:
+        """Plan days (with their indexes) laid out over a trip length, shared by every trip of that destination, tier and length"""
+        key = (destination_key, field, length)
+        cached = itinerary_templates_cache.get(key)
+        # Only while built from the plan object currently cached; an edited plan is a new object
+        if cached is not None and cached[0] is budget_plan:
+            return cached[1]
+        template = [
+            (index, budget_plan.itinerary[index])
+            for index in plan_day_indexes(len(budget_plan.itinerary), length)
+        ]
+        itinerary_templates_cache.set(key, (budget_plan, template))
+        return template
+    
+    @staticmethod
+    async def get_trip_itinerary(trip_id: str, zone: tzinfo = timezone.utc) -> Optional[TripItinerary]:
+        """A trip's budget plan on the trip's own dates, repeated or trimmed to its length and priced for its travelers
+
+        Trip dates are stored as UTC instants; zone is the traveler's time zone, whose
+        calendar days the itinerary follows.
+        """
+        user_trip = await DatabaseManager.get_user_trip(trip_id)
+        if not user_trip:
+            return None
+        budget_plan = await DatabaseManager.get_budget_plan(user_trip.destination, user_trip.selected_budget)
+        if not budget_plan:
+            return None
+        
+        start = calendar_date(user_trip.start_date, zone)
+        end = calendar_date(user_trip.end_date, zone)
+        length = trip_length(start, end, ITINERARY_MAX_DAYS)
+        template = DatabaseManager.get_itinerary_template(
+            normalize_name(user_trip.destination), budget_field(user_trip.selected_budget), budget_plan, length
+        )
+        with timed("model.TripItinerary"):
+            return TripItinerary.model_construct(
+                trip_id=user_trip.id,
+                destination=user_trip.destination,
+                selected_budget=user_trip.selected_budget,
+                start_date=start,
+                end_date=end,
+                travelers=user_trip.travelers,
+                duration=f"{length} days",
+                total_budget=scale_budget(budget_plan.total_budget, user_trip.travelers),
+                per_person_budget=budget_plan.total_budget,
+                accommodation=budget_plan.accommodation,
+                transport=budget_plan.transport,
+                highlights=budget_plan.highlights,
+                days=[
+                    TripItineraryDay.model_construct(
+                        day=offset + 1,
+                        date=start + timedelta(days=offset),
+                        title=itinerary_day.title,
+                        plan_day_index=index,
+                        activities=itinerary_day.activities,
+                    )
+                    for offset, (index, itinerary_day) in enumerate(template)
+                ],
+            )
+    
+    @staticmethod
+    def cache_stats() -> Dict[str, dict]:
+        """Hit/miss/eviction counters for the catalog caches"""
+        return {
+            "destinations": destinations_cache.stats(),
+            "travel_plans": travel_plans_cache.stats(),
+            "itinerary_templates": itinerary_templates_cache.stats(),
+            "shared_trips": {**shared_trips_cache.stats(), "single_flight": shared_trip_flights.stats()},
+            "single_flight": read_flights.stats(),
+        }
+    
+    @staticmethod
+    def write_behind_stats() -> Optional[Dict[str, int]]:
+        """Write-behind buffer counters, or None when the buffer is disabled"""
+        return progress_buffer.stats() if progress_buffer else None
     
     @staticmethod
     async def create_user_trip(trip_data: UserTripCreate) -> UserTrip:
         """Create a new user trip"""
         trip_obj = UserTrip(**trip_data.dict())
         trip_obj.share_token = secrets.token_urlsafe(16)
-        await user_trips_collection.insert_one(trip_obj.dict())
+        document = await DatabaseManager.new_trip_document(trip_obj)
+        await storage.insert_user_trip(document)
+        DatabaseManager.remember_trip_encoding(document)
         return trip_obj
     
+    @staticmethod
+    async def create_user_trips(trips: List[TripBatchItem]) -> List[dict]:
+        """Create trips with client-supplied IDs in one bulk_write; already-created IDs are reported, not duplicated"""
+        trip_objs = [UserTrip(**trip.dict()) for trip in trips]
+        for trip_obj in trip_objs:
+            trip_obj.share_token = secrets.token_urlsafe(16)
+        documents = await asyncio.gather(*(DatabaseManager.new_trip_document(trip_obj) for trip_obj in trip_objs))
+        stored, errors = await storage.insert_user_trips(documents)
+        
+        trip_ids = [trip.id for trip in trips]
+        results = []
+        for index, trip_id in enumerate(trip_ids):
+            if index in errors:
+                results.append({"id": trip_id, "status": "error", "error": errors[index]})
+            elif trip_id not in stored:
+                results.append({"id": trip_id, "status": "error", "error": "Trip was not stored"})
+            else:
+                # Our freshly generated token is only stored if this call inserted the trip
+                created = stored[trip_id] == documents[index]["share_token"]
+                if created:
+                    DatabaseManager.remember_trip_encoding(documents[index])
+                results.append({
+                    "id": trip_id,
+                    "status": "created" if created else "exists",
+                    "shareToken": stored[trip_id],
+                })
+        return results
+    
+    @staticmethod
+    async def new_trip_document(trip_obj: UserTrip) -> dict:
+        """Stored form of a new trip: plan size filled in, progress as a bitset when the plan has activity ids"""
+        budget_plan = await DatabaseManager.get_budget_plan(trip_obj.destination, trip_obj.selected_budget)
+        trip_obj.total_activities = budget_plan.count_activities() if budget_plan else 0
+        document = trip_obj.dict()
+        if PROGRESS_ENCODING == "bitset" and budget_plan and budget_plan.activity_ids() is not None:
+            del document["completed_activities"]
+            document["completed_bits"] = b""
+        return document
+    
+    @staticmethod
+    def remember_trip_encoding(document: dict):
+        """Cache the plan of a stored trip that keeps completed_bits"""
+        if "completed_bits" in document and "id" in document:
+            bitset_trips_cache.set(document["id"], (document["destination"], document["selected_budget"]))
+    
+    @staticmethod
+    async def get_activity_ids(trip_id: str) -> Optional[Dict[str, int]]:
+        """Activity ids of a trip's plan if the trip stores completed_bits; None for map-encoded or unknown trips"""
+        plan_key = bitset_trips_cache.get(trip_id)
+        if plan_key is None:
+            if PROGRESS_ENCODING != "bitset":
+                # Every trip keeps the map, so writes go straight to storage without reading the trip
+                return None
+            trip = await storage.find_user_trip(trip_id)
+            if not trip or "completed_bits" not in trip:
+                return None
+            DatabaseManager.remember_trip_encoding(trip)
+            plan_key = (trip["destination"], trip["selected_budget"])
+        budget_plan = await DatabaseManager.get_budget_plan(*plan_key)
+        return budget_plan.activity_ids() if budget_plan else None
+    
+    @staticmethod
+    async def decode_progress(trip: dict) -> dict:
+        """Trip document with completed_bits turned back into the completed_activities map"""
+        if "completed_bits" not in trip:
+            return trip
+        DatabaseManager.remember_trip_encoding(trip)
+        budget_plan = await DatabaseManager.get_budget_plan(trip["destination"], trip["selected_budget"])
+        activity_ids = (budget_plan.activity_ids() if budget_plan else None) or {}
+        decoded = {field: value for field, value in trip.items() if field != "completed_bits"}
+        decoded["completed_activities"] = to_completed_activities(trip["completed_bits"], activity_ids)
+        return decoded
+    
+    @staticmethod
+    async def sync_trip_progress(updates: List[ProgressSyncItem]) -> List[dict]:
+        """Apply queued activity changes for many trips in one ordered bulk write"""
+        trip_ids = list(dict.fromkeys(update.trip_id for update in updates))
+        activity_ids = dict(zip(trip_ids, await asyncio.gather(*(DatabaseManager.get_activity_ids(trip_id) for trip_id in trip_ids))))
+        await storage.apply_progress_changes([
+            (update.trip_id, stored_changes(update.changes, activity_ids[update.trip_id])) for update in updates
+        ])
+        
+        counts = await storage.find_progress_counts(trip_ids)
+        for document in counts.values():
+            shared_trips_cache.invalidate(document.get("share_token"))
+        
+        results = []
+        for trip_id in trip_ids:
+            document = counts.get(trip_id)
+            if not document:
+                results.append({"tripId": trip_id, "status": "not_found"})
+                continue
+            results.append({
+                "tripId": trip_id,
+                "status": "updated",
+                "progressPercentage": await DatabaseManager.counts_progress_percentage(trip_id, document),
+            })
+        return results
+    
+    @staticmethod
+    async def iter_user_trips(user_email: str) -> AsyncIterator[dict]:
+        """A user's trips, newest first, streamed from storage in bounded batches"""
+        async for document in storage.iter_user_trips_by_email(user_email, TRIP_EXPORT_FIELDS, TRIP_EXPORT_BATCH_SIZE):
+            yield document
+    
+    @staticmethod
+    async def export_trips(start: Optional[datetime] = None, end: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """Trips starting in [start, end), in start_date order, streamed from storage in bounded batches"""
+        async for document in storage.iter_user_trips_by_start(start, end, TRIP_EXPORT_FIELDS, TRIP_EXPORT_BATCH_SIZE):
+            yield document
+    
     @staticmethod
     async def get_user_trip(trip_id: str) -> Optional[UserTrip]:
-        """Get user trip by ID"""
-        trip = await user_trips_collection.find_one({"id": trip_id})
-        return UserTrip(**trip) if trip else None
+        """Get user trip by ID, including any check-offs not yet flushed"""
+        # Not coalesced: a read that joined a load started before a write would miss that write
+        user_trip = await DatabaseManager.load_user_trip(trip_id)
+        return DatabaseManager.with_pending_progress(user_trip) if user_trip else None
     
     @staticmethod
-    async def get_user_trip_by_token(share_token: str) -> Optional[UserTrip]:
-        """Get user trip by share token"""
-        trip = await user_trips_collection.find_one({"share_token": share_token})
-        return UserTrip(**trip) if trip else None
+    def with_pending_progress(user_trip: UserTrip) -> UserTrip:
+        """Overlay check-offs still sitting in the write-behind buffer"""
+        if not progress_buffer:
+            return user_trip
+        completed_activities, completed_count = progress_buffer.apply_pending(
+            user_trip.id, user_trip.completed_activities, user_trip.completed_count
+        )
+        user_trip.completed_activities = completed_activities
+        user_trip.completed_count = completed_count
+        return user_trip
+    
+    @staticmethod
+    async def load_user_trip(trip_id: str) -> Optional[UserTrip]:
+        trip = await storage.find_user_trip(trip_id)
+        if not trip:
+            return None
+        trip = await DatabaseManager.decode_progress(trip)
+        with timed("model.UserTrip"):
+            return from_document(UserTrip, trip)
+    
+    @staticmethod
+    async def get_shared_trip(share_token: str) -> Optional[SharedTrip]:
+        """Public view of a trip by share token: cached briefly, concurrent misses share one query"""
+        cached = shared_trips_cache.get(share_token)
+        if cached is not None:
+            return cached
+        return await shared_trip_flights.do(share_token, lambda: DatabaseManager.load_shared_trip(share_token))
+    
+    @staticmethod
+    async def load_shared_trip(share_token: str) -> Optional[SharedTrip]:
+        trip = await storage.find_user_trip_by_token(share_token, SHARED_TRIP_FIELDS)
+        if not trip:
+            return None
+        trip = await DatabaseManager.decode_progress(trip)
+        total_activities = progress_total(trip.get("total_activities", 0), trip.get("completed_activities"))
+        progress_percentage = await DatabaseManager.calculate_progress_percentage(trip.get("completed_count", 0), total_activities)
+        with timed("model.SharedTrip"):
+            shared_trip = from_document(SharedTrip, {
+                **trip, "total_activities": total_activities, "progress_percentage": progress_percentage
+            })
+        shared_trips_cache.set(share_token, shared_trip)
+        return shared_trip
     
     @staticmethod
     async def update_trip_progress(trip_id: str, progress_update: UserTripUpdate) -> Optional[UserTrip]:
         """Update user trip progress"""
-        result = await user_trips_collection.update_one(
-            {"id": trip_id},
-            {"$set": {"completed_activities": progress_update.completed_activities}}
-        )
-        
-        if result.modified_count:
-            return await DatabaseManager.get_user_trip(trip_id)
-        return None
+        if progress_buffer:
+            # Buffered check-offs are older than this full replacement; don't let them land after it
+            await progress_buffer.flush()
+        activity_ids = await DatabaseManager.get_activity_ids(trip_id)
+        if activity_ids is not None:
+            completed_bits = to_bitset(progress_update.completed_activities, activity_ids)
+            progress = {"completed_bits": completed_bits, "completed_count": count_bits(completed_bits)}
+        else:
+            progress = {
+                "completed_activities": progress_update.completed_activities,
+                "completed_count": sum(1 for completed in progress_update.completed_activities.values() if completed),
+            }
+        trip = await storage.set_trip_progress(trip_id, progress)
+        if not trip:
+            return None
+        shared_trips_cache.invalidate(trip.get("share_token"))
+        return UserTrip(**await DatabaseManager.decode_progress(trip))
+    
+    @staticmethod
+    async def apply_activity_changes(trip_id: str, delta: ActivityProgressDelta) -> Optional[Dict[str, int]]:
+        """Set individual activities, leaving other keys untouched, and return the progress counters"""
+        changes = stored_changes(delta.changes, await DatabaseManager.get_activity_ids(trip_id))
+        counts = await storage.apply_activity_changes(trip_id, changes)
+        if counts:
+            shared_trips_cache.invalidate(counts.get("share_token"))
+        return counts
+    
+    @staticmethod
+    async def trip_exists(trip_id: str) -> bool:
+        """Whether a trip is stored; trips are never deleted, so a found id is remembered"""
+        if known_trips_cache.get(trip_id) or bitset_trips_cache.get(trip_id) is not None:
+            return True
+        if not await storage.find_progress_counts([trip_id]):
+            return False
+        known_trips_cache.set(trip_id, True)
+        return True
+    
+    @staticmethod
+    async def queue_activity_changes(trip_id: str, delta: ActivityProgressDelta) -> bool:
+        """Buffer activity changes for the next write-behind flush; False, with nothing buffered, for unknown trips"""
+        if not await DatabaseManager.trip_exists(trip_id):
+            return False
+        progress_buffer.add(trip_id, delta.changes)
+        return True
     
     @staticmethod
-    async def calculate_progress_percentage(completed_activities: Dict[str, bool]) -> float:
+    async def write_buffered_progress(batch: Dict[str, Dict[str, bool]]):
+        """Flush callback of the write-behind buffer: one bulk write for every buffered trip"""
+        results = await DatabaseManager.sync_trip_progress([
+            ProgressSyncItem.model_construct(trip_id=trip_id, changes=changes)
+            for trip_id, changes in batch.items()
+        ])
+        for result in results:
+            if result["status"] == "not_found":
+                logging.error(f"Dropped buffered progress for unknown trip {result['tripId']}")
+    
+    @staticmethod
+    async def flush_progress_buffer():
+        """Write out any buffered check-offs; called on shutdown"""
+        if progress_buffer:
+            await progress_buffer.close()
+    
+    @staticmethod
+    async def get_trip_buckets(
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> Tuple[List[dict], str]:
+        """Trip counters per creation day, destination and tier, and whether they came from the rollups"""
+        if ANALYTICS_ROLLUPS_ENABLED:
+            return await storage.find_trip_rollups(start, end, destination), "rollup"
+        return await storage.aggregate_trip_buckets(start, end, destination), "live"
+    
+    @staticmethod
+    async def refresh_trip_rollups(full: bool = False) -> dict:
+        """Recompute rollups for recent creation days (or all days) from user_trips"""
+        since = None
+        if not full:
+            since = datetime.combine(datetime.utcnow().date() - timedelta(days=ANALYTICS_ROLLUP_LOOKBACK_DAYS), time.min)
+        buckets = await storage.aggregate_trip_buckets(since)
+        await storage.save_trip_rollups(buckets)
+        return {"since": since, "buckets": len(buckets)}
+    
+    @staticmethod
+    async def get_skipped_activities(destination: Optional[str] = None, limit: int = 20) -> List[dict]:
+        """Activities of ended trips that were most often left unchecked"""
+        completion = await storage.aggregate_activity_completion(datetime.utcnow(), destination)
+        plan_keys = [(row["destination"], row["selected_budget"]) for row in completion["trips"]]
+        budget_plans = await asyncio.gather(*(
+            DatabaseManager.get_budget_plan(destination_name, tier) for destination_name, tier in plan_keys
+        ))
+        plans = {key: budget_plan for key, budget_plan in zip(plan_keys, budget_plans) if budget_plan}
+        return skipped_activities(completion, plans, limit)
+    
+    @staticmethod
+    async def count_plan_activities(destination_name: str, budget: str) -> int:
+        """Number of activities in the itinerary of the selected budget tier"""
+        travel_plan = await DatabaseManager.get_travel_plan_by_destination(destination_name)
+        budget_plan = travel_plan.get_budget_plan(budget) if travel_plan else None
+        return budget_plan.count_activities() if budget_plan else 0
+    
+    @staticmethod
+    async def counts_progress_percentage(trip_id: str, counts: dict) -> float:
+        """Completion percentage from a trip's PROGRESS_COUNT_FIELDS; a trip without a plan has no
+        total there, so its progress map is read to count its keys instead"""
+        total_activities = counts.get("total_activities", 0)
+        if total_activities <= 0:
+            trip = await storage.find_user_trip(trip_id)
+            total_activities = progress_total(0, trip.get("completed_activities") if trip else None)
+        return await DatabaseManager.calculate_progress_percentage(counts.get("completed_count", 0), total_activities)
+    
+    @staticmethod
+    async def calculate_progress_percentage(completed_count: int, total_activities: int) -> float:
         """Calculate completion percentage"""
-        if not completed_activities:
+        if total_activities <= 0:
             return 0.0
         
-        total_activities = len(completed_activities)
-        completed_count = sum(1 for completed in completed_activities.values() if completed)
-        
-        return round((completed_count / total_activities) * 100, 1) if total_activities > 0 else 0.0
\ No newline at end of file
+        return round(min(completed_count / total_activities, 1.0) * 100, 1)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import gzip
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_SIZE = 1024
+
+class EncodedResponse:
+    """A JSON body encoded once, with its gzip variant and a content-derived ETag"""
+
+    __slots__ = ("source", "body", "gzip_body", "tag")
+
+    def __init__(self, source: Any, body: bytes):
+        # The object the body was encoded from; lets callers detect stale entries by identity
+        self.source = source
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=6) if len(body) >= GZIP_MIN_SIZE else None
+        self.tag = hashlib.sha256(body).hexdigest()[:32]
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.tag}"'
+
+    @property
+    def gzip_etag(self) -> str:
+        return f'"{self.tag}-gzip"'
+
+    @classmethod
+    def from_model(cls, source: Any, model: BaseModel) -> "EncodedResponse":
+        return cls(source, model.model_dump_json().encode("utf-8"))
+
+    @classmethod
+    def from_value(cls, source: Any, value: Any, value_type: Any) -> "EncodedResponse":
+        return cls(source, TypeAdapter(value_type).dump_json(value))
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an opaque tag, per RFC 9110"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        # Accept the tag of the compressed variant as well
+        if candidate == tag or candidate == f"{tag}-gzip":
+            return True
+    return False
+
+def accepts_gzip(request: Request) -> bool:
+    accept_encoding = request.headers.get("accept-encoding", "")
+    return any(part.split(";")[0].strip() == "gzip" for part in accept_encoding.split(","))
+
+def cached_json_response(request: Request, encoded: EncodedResponse, cache_control: str = "no-cache") -> Response:
+    """Serve a pre-encoded body, answering 304 when the client already has it"""
+    use_gzip = encoded.gzip_body is not None and accepts_gzip(request)
+    etag = encoded.gzip_etag if use_gzip else encoded.etag
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if etag_matches(request.headers.get("if-none-match"), encoded.tag):
+        return Response(status_code=304, headers=headers)
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=encoded.gzip_body, media_type="application/json", headers=headers)
+    return Response(content=encoded.body, media_type="application/json", headers=headers)
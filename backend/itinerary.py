@@ -0,0 +1,40 @@
+import re
+from datetime import date, datetime, timezone, tzinfo
+from typing import List
+
+# Numbers inside a budget string such as "$800-1200" or "$1,800 - 2,500"
+BUDGET_AMOUNT = re.compile(r"\d+(?:,\d{3})*(?:\.\d+)?")
+
+def calendar_date(instant: datetime, zone: tzinfo) -> date:
+    """Date a stored instant (naive values are UTC) falls on in the traveler's time zone"""
+    if instant.tzinfo is None:
+        instant = instant.replace(tzinfo=timezone.utc)
+    return instant.astimezone(zone).date()
+
+def trip_length(start: date, end: date, max_days: int) -> int:
+    """Calendar days a trip covers, counting both ends, between 1 and max_days"""
+    return max(1, min((end - start).days + 1, max_days))
+
+def plan_day_indexes(plan_days: int, length: int) -> List[int]:
+    """Indexes of the plan days that make up each day of a trip of the given length
+
+    The first and last plan days (arrival and departure) stay at the ends. Longer
+    trips repeat the days in between in order; shorter trips drop them from the end.
+    """
+    if plan_days == 0:
+        return []
+    if plan_days == 1 or length == 1:
+        return [0] * length
+    middle = range(1, plan_days - 1) or range(plan_days - 1)
+    return [0, *(middle[index % len(middle)] for index in range(length - 2)), plan_days - 1]
+
+def _scale_amount(text: str, factor: int) -> str:
+    decimals = len(text.split(".")[1]) if "." in text else 0
+    value = float(text.replace(",", "")) * factor
+    return f"{value:,.{decimals}f}" if "," in text else f"{value:.{decimals}f}"
+
+def scale_budget(per_person_budget: str, travelers: int) -> str:
+    """Budget string with every amount multiplied by the number of travelers"""
+    if travelers == 1:
+        return per_person_budget
+    return BUDGET_AMOUNT.sub(lambda match: _scale_amount(match.group(), travelers), per_person_budget)
@@ -0,0 +1,240 @@
+import bisect
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from storage import (
+    INSERT_ONLY_FIELDS,
+    PROGRESS_COUNT_FIELDS,
+    TRIP_BUCKET_KEY,
+    ProgressChanges,
+    Storage,
+    bucket_trips,
+    changed_progress,
+    count_activity_completion,
+    day_key,
+    in_range,
+    project,
+)
+
+class MemoryStorage(Storage):
+    """Process-local storage with dict indexes on id, share_token and normalized name
+
+    Stored documents are never mutated in place: writes swap in a new dict, so
+    documents handed to callers stay valid snapshots without copying on read.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self.destinations: Dict[str, dict] = {}
+        self.destination_ids: Dict[str, str] = {}
+        # name_keys in order, for keyset pagination
+        self._sorted_name_keys: List[str] = []
+        self.travel_plans: Dict[str, dict] = {}
+        self.user_trips: Dict[str, dict] = {}
+        self.share_tokens: Dict[str, str] = {}
+        self.trip_rollups: Dict[tuple, dict] = {}
+
+    def _put_destination(self, document: dict):
+        name_key = document["name_key"]
+        existing = self.destinations.get(name_key)
+        if existing is None:
+            if document.get("id") in self.destination_ids:
+                raise ValueError(f"Duplicate destination id {document['id']}")
+            bisect.insort(self._sorted_name_keys, name_key)
+        elif existing.get("id") != document.get("id"):
+            self.destination_ids.pop(existing.get("id"), None)
+        self.destinations[name_key] = document
+        self.destination_ids[document.get("id")] = name_key
+
+    @staticmethod
+    def _merge(existing: Optional[dict], document: dict) -> dict:
+        if existing is None:
+            return dict(document)
+        return {**existing, **{field: value for field, value in document.items() if field not in INSERT_ONLY_FIELDS}}
+
+    async def insert_destination(self, document: dict):
+        if document["name_key"] in self.destinations:
+            raise ValueError(f"Duplicate destination {document['name_key']}")
+        self._put_destination(dict(document))
+
+    async def find_destinations(self, popular_only: bool = False) -> List[dict]:
+        destinations = list(self.destinations.values())
+        if popular_only:
+            return [destination for destination in destinations if destination.get("popular") is True]
+        return destinations
+
+    async def iter_destinations(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        country: Optional[str] = None,
+        popular_only: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[dict]:
+        start = bisect.bisect_right(self._sorted_name_keys, after) if after is not None else 0
+        returned = 0
+        for name_key in self._sorted_name_keys[start:]:
+            if limit and returned >= limit:
+                break
+            document = self.destinations[name_key]
+            if popular_only and document.get("popular") is not True:
+                continue
+            if country and document.get("country") != country:
+                continue
+            returned += 1
+            yield project(document, [*fields, "name_key"]) if fields else document
+
+    async def find_destination(self, name_key: str) -> Optional[dict]:
+        return self.destinations.get(name_key)
+
+    async def upsert_destinations(self, documents: List[dict]) -> int:
+        for document in documents:
+            self._put_destination(self._merge(self.destinations.get(document["name_key"]), document))
+        return len(documents)
+
+    async def insert_travel_plan(self, document: dict):
+        if document["destination_key"] in self.travel_plans:
+            raise ValueError(f"Duplicate travel plan {document['destination_key']}")
+        self.travel_plans[document["destination_key"]] = dict(document)
+
+    async def find_travel_plan(self, destination_key: str) -> Optional[dict]:
+        return self.travel_plans.get(destination_key)
+
+    async def find_travel_plans(self, destination_keys: List[str]) -> Dict[str, dict]:
+        return {key: self.travel_plans[key] for key in destination_keys if key in self.travel_plans}
+
+    async def find_budget_plan(self, destination_key: str, field: str) -> Optional[dict]:
+        plan = self.travel_plans.get(destination_key)
+        return plan.get(field) if plan else None
+
+    async def find_plan_day(self, destination_key: str, field: str, day: int) -> Optional[dict]:
+        budget_plan = await self.find_budget_plan(destination_key, field)
+        if not budget_plan:
+            return None
+        return next((itinerary_day for itinerary_day in budget_plan.get("itinerary", []) if itinerary_day.get("day") == day), None)
+
+    async def iter_travel_plans(self, batch_size: int) -> AsyncIterator[dict]:
+        for document in list(self.travel_plans.values()):
+            yield document
+
+    async def upsert_travel_plans(self, documents: List[dict]) -> int:
+        for document in documents:
+            key = document["destination_key"]
+            self.travel_plans[key] = self._merge(self.travel_plans.get(key), document)
+        return len(documents)
+
+    def _put_user_trip(self, document: dict):
+        self.user_trips[document["id"]] = document
+        if document.get("share_token"):
+            self.share_tokens[document["share_token"]] = document["id"]
+
+    async def insert_user_trip(self, document: dict):
+        if document["id"] in self.user_trips:
+            raise ValueError(f"Duplicate trip id {document['id']}")
+        if document.get("share_token") in self.share_tokens:
+            raise ValueError("Duplicate share token")
+        self._put_user_trip(dict(document))
+
+    async def insert_user_trips(self, documents: List[dict]) -> Tuple[Dict[str, Optional[str]], Dict[int, str]]:
+        errors = {}
+        for index, document in enumerate(documents):
+            if document["id"] in self.user_trips:
+                continue
+            try:
+                await self.insert_user_trip(document)
+            except ValueError as e:
+                errors[index] = str(e)
+        stored = {
+            document["id"]: self.user_trips[document["id"]].get("share_token")
+            for document in documents
+            if document["id"] in self.user_trips
+        }
+        return stored, errors
+
+    async def find_user_trip(self, trip_id: str) -> Optional[dict]:
+        return self.user_trips.get(trip_id)
+
+    async def find_user_trip_by_token(self, share_token: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[dict]:
+        trip = self.user_trips.get(self.share_tokens.get(share_token))
+        if trip is None:
+            return None
+        return project(trip, fields) if fields else trip
+
+    async def iter_user_trips_by_email(self, user_email: str, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[dict]:
+        trips = [trip for trip in self.user_trips.values() if trip.get("user_email") == user_email]
+        trips.sort(key=lambda trip: trip["created_at"], reverse=True)
+        for trip in trips:
+            yield project(trip, fields)
+
+    async def iter_user_trips_by_start(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        fields: Tuple[str, ...],
+        batch_size: int
+    ) -> AsyncIterator[dict]:
+        trips = [trip for trip in self.user_trips.values() if trip.get("start_date") and in_range(trip["start_date"], start, end)]
+        trips.sort(key=lambda trip: trip["start_date"])
+        for trip in trips:
+            yield project(trip, fields)
+
+    async def set_trip_progress(self, trip_id: str, progress: dict) -> Optional[dict]:
+        trip = self.user_trips.get(trip_id)
+        if trip is None:
+            return None
+        trip = {**trip, **progress}
+        self._put_user_trip(trip)
+        return trip
+
+    async def find_progress_counts(self, trip_ids: List[str]) -> Dict[str, dict]:
+        return {
+            trip_id: project(self.user_trips[trip_id], PROGRESS_COUNT_FIELDS)
+            for trip_id in trip_ids
+            if trip_id in self.user_trips
+        }
+
+    async def apply_activity_changes(self, trip_id: str, changes: ProgressChanges) -> Optional[dict]:
+        trip = self.user_trips.get(trip_id)
+        if trip is None:
+            return None
+        trip = {**trip, **changed_progress(trip, changes)}
+        self._put_user_trip(trip)
+        return project(trip, PROGRESS_COUNT_FIELDS)
+
+    async def apply_progress_changes(self, updates: List[Tuple[str, ProgressChanges]]):
+        for trip_id, changes in updates:
+            await self.apply_activity_changes(trip_id, changes)
+
+    def _trips(self, destination: Optional[str]) -> List[dict]:
+        trips = list(self.user_trips.values())
+        return [trip for trip in trips if trip.get("destination") == destination] if destination else trips
+
+    async def aggregate_trip_buckets(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        return bucket_trips(trip for trip in self._trips(destination) if in_range(trip.get("created_at"), start, end))
+
+    async def aggregate_activity_completion(self, ended_before: datetime, destination: Optional[str] = None) -> dict:
+        return count_activity_completion(trip for trip in self._trips(destination) if in_range(trip.get("end_date"), None, ended_before))
+
+    async def save_trip_rollups(self, buckets: List[dict]):
+        for bucket in buckets:
+            self.trip_rollups[tuple(bucket[field] for field in TRIP_BUCKET_KEY)] = dict(bucket)
+
+    async def find_trip_rollups(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        first = day_key(start) if start is not None else None
+        last = day_key(end) if end is not None else None
+        return [
+            bucket for bucket in self.trip_rollups.values()
+            if (first is None or bucket["date"] >= first)
+            and (last is None or bucket["date"] < last)
+            and (not destination or bucket["destination"] == destination)
+        ]
@@ -0,0 +1,190 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Seconds; tuned for a service whose requests mostly take 1-100 ms
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in labels) + "}"
+
+class Histogram:
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Counters, gauges and histograms rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Labels, float]]]] = []
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1.0):
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def set_gauge(self, name: str, labels: Labels, value: float):
+        self._gauges.setdefault(name, {})[labels] = value
+
+    def add_gauge(self, name: str, labels: Labels, amount: float):
+        series = self._gauges.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def observe(self, name: str, labels: Labels, value: float):
+        series = self._histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(value)
+
+    def register_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Labels, float]]]):
+        """collector() yields (name, kind, help, labels, value) samples computed at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+
+        def header(name: str, default_kind: str):
+            kind, help_text = self._help.get(name, (default_kind, ""))
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in sorted(self._counters.items()):
+            header(name, "counter")
+            lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in series.items())
+
+        for name, series in sorted(self._gauges.items()):
+            header(name, "gauge")
+            lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in series.items())
+
+        for name, series in sorted(self._histograms.items()):
+            header(name, "histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', repr(bound)),))} {cumulative}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+
+        collected: Dict[str, List[str]] = {}
+        for collector in self._collectors:
+            for name, kind, help_text, labels, value in collector():
+                if name not in collected:
+                    collected[name] = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                collected[name].append(f"{name}{format_labels(labels)} {value}")
+        for name in sorted(collected):
+            lines.extend(collected[name])
+
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+registry.describe("http_requests_total", "counter", "HTTP requests by method, route and status")
+registry.describe("http_request_duration_seconds", "histogram", "HTTP request latency by method and route")
+registry.describe("http_requests_in_flight", "gauge", "HTTP requests currently being served")
+registry.describe("app_span_duration_seconds", "histogram", "Time spent in database calls, model construction and serialization")
+
+# Spans recorded for the current request, used for the Server-Timing header
+request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+@contextmanager
+def timed(span: str):
+    """Record a span in the span histogram and the current request's Server-Timing breakdown"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("app_span_duration_seconds", (("span", span),), elapsed)
+        timings = request_timings.get()
+        if timings is not None:
+            timings[span] = timings.get(span, 0.0) + elapsed
+
+def instrument(prefix: str):
+    """Class decorator wrapping every async static method in a span named prefix.method"""
+    def decorate(cls):
+        for name, attribute in list(vars(cls).items()):
+            if not isinstance(attribute, staticmethod) or not inspect.iscoroutinefunction(attribute.__func__):
+                continue
+            setattr(cls, name, staticmethod(_timed_coroutine(f"{prefix}.{name}", attribute.__func__)))
+        return cls
+    return decorate
+
+def _timed_coroutine(span: str, function):
+    @functools.wraps(function)
+    async def wrapper(*args, **kwargs):
+        with timed(span):
+            return await function(*args, **kwargs)
+    return wrapper
+
+def server_timing_header(timings: Dict[str, float], total: float) -> str:
+    entries = [f"{span};dur={elapsed * 1000:.2f}" for span, elapsed in timings.items()]
+    entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status counts and in-flight requests"""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        token = request_timings.set(timings)
+        status_code = 500
+        registry.add_gauge("http_requests_in_flight", (), 1)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing_header(timings, time.perf_counter() - start).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            registry.add_gauge("http_requests_in_flight", (), -1)
+            request_timings.reset(token)
+            route = scope.get("route")
+            route_label = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            registry.inc("http_requests_total", (("method", method), ("route", route_label), ("status", str(status_code))))
+            registry.observe("http_request_duration_seconds", (("method", method), ("route", route_label)), elapsed)
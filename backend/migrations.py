@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import logging
+from typing import Dict, List
+from pymongo import UpdateOne
+from database import PROGRESS_ENCODING, DatabaseManager, get_storage, normalize_name, travel_plans_cache
+from models import BUDGET_TIERS, TravelPlan
+from mongo_storage import MongoStorage
+from progress_encoding import count_bits, to_bitset
+
+logger = logging.getLogger(__name__)
+
+class DuplicateLookupKeys(Exception):
+    """Documents whose names normalize to the same lookup key; nothing was changed"""
+
+    def __init__(self, collection_name: str, conflicts: Dict[str, List[dict]]):
+        super().__init__(
+            f"{collection_name}: {len(conflicts)} lookup keys shared by several documents; "
+            f"resolve them or rerun with --remove-duplicates to keep the oldest of each"
+        )
+        self.collection_name = collection_name
+        self.conflicts = conflicts
+
+async def backfill_lookup_keys(collection, source_field: str, key_field: str, remove_duplicates: bool = False) -> dict:
+    """Store the normalized lookup key on every document
+
+    Documents sharing a key would break the unique index. They are reported with
+    DuplicateLookupKeys before anything is written, unless remove_duplicates is set,
+    in which case all but the oldest document of each key are deleted.
+    """
+    seen = {}
+    updates = []
+    conflicts: Dict[str, List[dict]] = {}
+
+    # Oldest document wins, matching what the old regex lookup usually returned
+    cursor = collection.find({}, {"_id": 1, "id": 1, source_field: 1, key_field: 1, "created_at": 1}).sort("created_at", 1)
+    async for document in cursor:
+        key = normalize_name(document.get(source_field, ""))
+        if key in seen:
+            conflicts.setdefault(key, [seen[key]]).append(document)
+            continue
+        seen[key] = document
+        if document.get(key_field) != key:
+            updates.append(UpdateOne({"_id": document["_id"]}, {"$set": {key_field: key}}))
+
+    for key, documents in conflicts.items():
+        logger.warning(
+            f"{collection.name}: {len(documents)} documents share {key_field} {key!r}: "
+            + ", ".join(f"{document.get('id', document['_id'])} ({document.get(source_field)!r}, created {document.get('created_at')})" for document in documents)
+        )
+    if conflicts and not remove_duplicates:
+        raise DuplicateLookupKeys(collection.name, conflicts)
+
+    duplicates = [document["_id"] for documents in conflicts.values() for document in documents[1:]]
+    if duplicates:
+        await collection.delete_many({"_id": {"$in": duplicates}})
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+
+    return {"updated": len(updates), "duplicates_removed": len(duplicates)}
+
+async def migrate_name_keys(remove_duplicates: bool = False):
+    """Backfill name keys for destinations and travel plans, then build the unique indexes"""
+    storage = get_storage()
+    destinations = await backfill_lookup_keys(storage.destinations, "name", "name_key", remove_duplicates)
+    plans = await backfill_lookup_keys(storage.travel_plans, "destination_name", "destination_key", remove_duplicates)
+    await storage.create_indexes()
+    logger.info(f"destinations: {destinations}, travel_plans: {plans}")
+    return {"destinations": destinations, "travel_plans": plans}
+
+async def migrate_trip_progress_counters(batch_size: int = 1000) -> dict:
+    """Backfill completed_count and total_activities on trips created before they existed"""
+    storage = get_storage()
+    updated = 0
+    updates = []
+    cursor = storage.user_trips.find(
+        {"total_activities": {"$exists": False}},
+        {"_id": 1, "destination": 1, "selected_budget": 1, "completed_activities": 1}
+    )
+    async for trip in cursor:
+        completed_activities = trip.get("completed_activities") or {}
+        total_activities = await DatabaseManager.count_plan_activities(
+            trip.get("destination", ""), trip.get("selected_budget", "")
+        )
+        updates.append(UpdateOne({"_id": trip["_id"]}, {"$set": {
+            "completed_count": sum(1 for completed in completed_activities.values() if completed),
+            # Trips without a known plan keep the old denominator
+            "total_activities": total_activities or len(completed_activities),
+        }}))
+        if len(updates) >= batch_size:
+            await storage.user_trips.bulk_write(updates, ordered=False)
+            updated += len(updates)
+            updates = []
+
+    if updates:
+        await storage.user_trips.bulk_write(updates, ordered=False)
+        updated += len(updates)
+
+    logger.info(f"user_trips progress counters backfilled: {updated}")
+    return {"updated": updated}
+
+async def migrate_activity_ids() -> dict:
+    """Assign ordinal ids to activities of travel plans stored before activities had them"""
+    storage = get_storage()
+    updates = []
+    async for document in storage.travel_plans.find({}):
+        plan = TravelPlan(**document)
+        if all(plan.get_budget_plan(field).activity_ids() is not None for field in BUDGET_TIERS.values()):
+            continue
+        # Ids that already exist are kept; the rest follow itinerary order
+        plan.assign_activity_ids(plan.model_copy(deep=True))
+        updates.append(UpdateOne({"_id": document["_id"]}, {"$set": {
+            field: plan.get_budget_plan(field).dict() for field in BUDGET_TIERS.values()
+        }}))
+    if updates:
+        await storage.travel_plans.bulk_write(updates, ordered=False)
+        # Plans cached by earlier migrations predate the ids
+        travel_plans_cache.clear()
+    logger.info(f"travel_plans given activity ids: {len(updates)}")
+    return {"updated": len(updates)}
+
+async def migrate_progress_encoding(batch_size: int = 1000) -> dict:
+    """Rewrite completed_activities maps as completed_bits, for PROGRESS_ENCODING=bitset"""
+    storage = get_storage()
+    updated = 0
+    skipped = 0
+    updates = []
+    cursor = storage.user_trips.find(
+        {"completed_bits": {"$exists": False}},
+        {"_id": 1, "destination": 1, "selected_budget": 1, "completed_activities": 1}
+    )
+    async for trip in cursor:
+        budget_plan = await DatabaseManager.get_budget_plan(trip.get("destination", ""), trip.get("selected_budget", ""))
+        activity_ids = budget_plan.activity_ids() if budget_plan else None
+        if activity_ids is None:
+            # Without a plan there are no activity ids to set bits for; the trip keeps its map
+            skipped += 1
+            continue
+        completed_bits = to_bitset(trip.get("completed_activities") or {}, activity_ids)
+        updates.append(UpdateOne(
+            # Only if no check-off landed since the read; a rerun picks up the rest
+            {"_id": trip["_id"], "completed_activities": trip.get("completed_activities")},
+            {
+                "$set": {"completed_bits": completed_bits, "completed_count": count_bits(completed_bits)},
+                "$unset": {"completed_activities": ""},
+            }
+        ))
+        if len(updates) >= batch_size:
+            updated += (await storage.user_trips.bulk_write(updates, ordered=False)).modified_count
+            updates = []
+
+    if updates:
+        updated += (await storage.user_trips.bulk_write(updates, ordered=False)).modified_count
+
+    logger.info(f"user_trips progress re-encoded: {updated}, without a plan: {skipped}")
+    return {"updated": updated, "skipped": skipped}
+
+async def run_migrations(remove_duplicates: bool = False):
+    """Run all migrations in order; remove_duplicates lets the name key backfill delete duplicate documents"""
+    # Other backends are created with the current document shape and need none of these
+    storage = get_storage()
+    if not isinstance(storage, MongoStorage):
+        raise RuntimeError(f"Migrations only apply to the mongo storage backend, not {storage.name}")
+    results = {
+        "name_keys": await migrate_name_keys(remove_duplicates),
+        "trip_progress_counters": await migrate_trip_progress_counters(),
+        "activity_ids": await migrate_activity_ids(),
+    }
+    if PROGRESS_ENCODING == "bitset":
+        results["progress_encoding"] = await migrate_progress_encoding()
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the mongo collections to the current document shape")
+    parser.add_argument(
+        "--remove-duplicates",
+        action="store_true",
+        help="Delete all but the oldest of destinations or travel plans whose names normalize to the same key"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    print(asyncio.run(run_migrations(remove_duplicates=args.remove_duplicates)))
@@ -1,12 +1,18 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict
-from datetime import datetime
+from pydantic import BaseModel, Field, field_validator
+from typing import Any, Callable, List, Optional, Dict, Type, TypeVar, Union, get_args, get_origin
+from datetime import date, datetime, timezone
 import uuid
 
 class Activity(BaseModel):
     time: str
     task: str
     type: str  # accommodation, transport, sightseeing, dining, activity
+    # Ordinal within its BudgetPlan, kept when the plan is edited; assigned on write
+    id: Optional[int] = None
+
+def activity_key(day_index: int, activity_index: int) -> str:
+    """Positional key of an activity in completed_activities, as the frontend builds it"""
+    return f"{day_index}-{activity_index}"
 
 class DayItinerary(BaseModel):
     day: int
@@ -21,6 +27,50 @@ class BudgetPlan(BaseModel):
     highlights: List[str]
     itinerary: List[DayItinerary]
 
+    def count_activities(self) -> int:
+        return sum(len(day.activities) for day in self.itinerary)
+
+    def assign_activity_ids(self, previous: Optional["BudgetPlan"] = None):
+        """Give every activity an ordinal id, reusing previous ids for the same task on the same day"""
+        reusable: Dict[tuple, List[int]] = {}
+        next_id = 0
+        if previous is not None:
+            for itinerary_day in previous.itinerary:
+                for activity in itinerary_day.activities:
+                    if activity.id is not None:
+                        reusable.setdefault((itinerary_day.day, activity.task), []).append(activity.id)
+                        next_id = max(next_id, activity.id + 1)
+        for itinerary_day in self.itinerary:
+            for activity in itinerary_day.activities:
+                kept = reusable.get((itinerary_day.day, activity.task))
+                if kept:
+                    activity.id = kept.pop(0)
+                else:
+                    activity.id = next_id
+                    next_id += 1
+
+    def activity_ids(self) -> Optional[Dict[str, int]]:
+        """Activity ids by completed_activities key, or None if some activity has no id yet"""
+        ids = {}
+        for day_index, itinerary_day in enumerate(self.itinerary):
+            for activity_index, activity in enumerate(itinerary_day.activities):
+                if activity.id is None:
+                    return None
+                ids[activity_key(day_index, activity_index)] = activity.id
+        return ids
+
+# API tier names (as used by the frontend) mapped to TravelPlan fields
+BUDGET_TIERS = {
+    "backpacker": "backpacker",
+    "travelEnthusiast": "travel_enthusiast",
+    "luxury": "luxury",
+}
+
+def budget_field(tier: str) -> Optional[str]:
+    """TravelPlan field for an API tier name or field name"""
+    field = BUDGET_TIERS.get(tier, tier)
+    return field if field in BUDGET_TIERS.values() else None
+
 class TravelPlan(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     destination_id: str
@@ -30,6 +80,16 @@ class TravelPlan(BaseModel):
     luxury: BudgetPlan
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
+    def get_budget_plan(self, tier: str) -> Optional[BudgetPlan]:
+        """Budget plan for an API tier name or field name"""
+        field = budget_field(tier)
+        return getattr(self, field) if field else None
+
+    def assign_activity_ids(self, previous: Optional["TravelPlan"] = None):
+        """Assign activity ids in every tier, keeping those of the plan this one replaces"""
+        for field in BUDGET_TIERS.values():
+            getattr(self, field).assign_activity_ids(getattr(previous, field) if previous else None)
+
 class TravelPlanCreate(BaseModel):
     destination_id: str
     destination_name: str
@@ -51,6 +111,16 @@ class DestinationCreate(BaseModel):
     popular: bool = False
     image_url: Optional[str] = None
 
+class DestinationPage(BaseModel):
+    # With fields=, each item carries only the requested fields
+    items: List[Destination]
+    # Cursor of the next page; None on the last one
+    next_cursor: Optional[str] = None
+
+def utc_naive(value: datetime) -> datetime:
+    """Naive UTC form of a datetime, as Mongo stores and returns it; naive values are taken to be UTC already"""
+    return value.astimezone(timezone.utc).replace(tzinfo=None) if value.tzinfo is not None else value
+
 class UserTrip(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     destination: str
@@ -59,21 +129,73 @@ class UserTrip(BaseModel):
     travelers: int
     selected_budget: str
     completed_activities: Dict[str, bool] = Field(default_factory=dict)
+    # Denormalized so progress does not require walking completed_activities
+    completed_count: int = 0
+    total_activities: int = 0
     user_email: Optional[str] = None
     share_token: Optional[str] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
-class UserTripCreate(BaseModel):
+    @field_validator("start_date", "end_date", "created_at")
+    @classmethod
+    def store_as_utc(cls, value: datetime) -> datetime:
+        # Clients send offsets (toISOString); every backend stores and compares naive UTC
+        return utc_naive(value)
+
+class SharedTrip(BaseModel):
+    # Public view of a trip behind a share link; omits id, user_email and share_token
     destination: str
     start_date: datetime
     end_date: datetime
     travelers: int
     selected_budget: str
+    completed_activities: Dict[str, bool] = Field(default_factory=dict)
+    completed_count: int = 0
+    total_activities: int = 0
+    progress_percentage: float = 0.0
+    created_at: datetime
+
+class UserTripCreate(BaseModel):
+    destination: str
+    start_date: datetime
+    end_date: datetime
+    travelers: int = Field(ge=1)
+    selected_budget: str
     user_email: Optional[str] = None
 
 class UserTripUpdate(BaseModel):
     completed_activities: Dict[str, bool]
 
+class ActivityProgressDelta(BaseModel):
+    # Only the activities that changed, keyed like completed_activities
+    changes: Dict[str, bool] = Field(min_length=1)
+
+    @field_validator("changes")
+    @classmethod
+    def validate_activity_keys(cls, changes: Dict[str, bool]) -> Dict[str, bool]:
+        # Keys become dotted update paths, so they must be plain field names
+        for key in changes:
+            if not key or "." in key or key.startswith("$"):
+                raise ValueError(f"Invalid activity key: {key!r}")
+        return changes
+
+# Batch endpoints for offline clients replaying queued changes
+MAX_BATCH_SIZE = 500
+
+class TripBatchItem(UserTripCreate):
+    # Client-generated, so replaying the same queue entry is a no-op
+    id: str = Field(min_length=1, max_length=100)
+
+class TripBatchCreate(BaseModel):
+    trips: List[TripBatchItem] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+class ProgressSyncItem(ActivityProgressDelta):
+    trip_id: str
+
+class ProgressSyncBatch(BaseModel):
+    # Applied in order, so a later toggle of the same activity wins
+    updates: List[ProgressSyncItem] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
 class TravelPlansResponse(BaseModel):
     destination: str
     plans: Dict[str, BudgetPlan]
@@ -83,4 +205,73 @@ class TripProgressResponse(BaseModel):
     destination: str
     selected_budget: str
     completed_activities: Dict[str, bool]
-    progress_percentage: float
\ No newline at end of file
+    completed_count: int = 0
+    total_activities: int = 0
+    progress_percentage: float
+
+class TripItineraryDay(BaseModel):
+    day: int
+    date: date
+    title: str
+    # Plan day this one follows; its activities keep their completed_activities keys
+    # (f"{plan_day_index}-{activity_index}") and ids, even when the day repeats
+    plan_day_index: int
+    activities: List[Activity]
+
+class TripItinerary(BaseModel):
+    # A budget plan laid out over a trip's actual dates and party size
+    trip_id: str
+    destination: str
+    selected_budget: str
+    start_date: date
+    end_date: date
+    travelers: int
+    duration: str
+    total_budget: str
+    per_person_budget: str
+    accommodation: str
+    transport: str
+    highlights: List[str]
+    days: List[TripItineraryDay]
+
+class SeedReport(BaseModel):
+    destinations: int
+    travel_plans: int
+    elapsed_seconds: float
+    documents_per_second: float
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+_constructors: Dict[type, Dict[str, Callable[[Any], Any]]] = {}
+
+def _field_converter(annotation) -> Optional[Callable[[Any], Any]]:
+    """Converter that builds nested models inside a value of the given annotation, or None if there are none"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return lambda value: construct_trusted(annotation, value) if isinstance(value, dict) else value
+
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Union:
+        converters = [_field_converter(arg) for arg in args if arg is not type(None)]
+        return converters[0] if len(converters) == 1 else None
+    if origin is list and args:
+        item = _field_converter(args[0])
+        return (lambda value: [item(element) for element in value] if isinstance(value, list) else value) if item else None
+    if origin is dict and len(args) == 2:
+        item = _field_converter(args[1])
+        return (lambda value: {key: item(element) for key, element in value.items()} if isinstance(value, dict) else value) if item else None
+    return None
+
+def construct_trusted(model: Type[ModelType], data: dict) -> ModelType:
+    """Build a model tree from a document we wrote ourselves, skipping validation (model_construct, recursively)"""
+    converters = _constructors.get(model)
+    if converters is None:
+        converters = {}
+        for name, field in model.model_fields.items():
+            converter = _field_converter(field.annotation)
+            if converter:
+                converters[name] = converter
+        _constructors[model] = converters
+
+    if converters:
+        data = {key: converters[key](value) if key in converters else value for key, value in data.items()}
+    return model.model_construct(**data)
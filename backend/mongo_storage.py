@@ -0,0 +1,449 @@
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from pool_metrics import PoolMetricsListener
+from progress_encoding import completed_ids
+from storage import (
+    INSERT_ONLY_FIELDS,
+    PROGRESS_COUNT_FIELDS,
+    TRIP_BUCKET_KEY,
+    ProgressChanges,
+    Storage,
+    changed_progress,
+    day_key,
+    project,
+)
+
+# MongoDB connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '2000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000'))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '10000'))
+
+PROGRESS_COUNTS_PROJECTION = {"_id": 0, **{field: 1 for field in PROGRESS_COUNT_FIELDS}}
+
+# Bitset progress has no update operator: read, then write only if the bits are unchanged
+BIT_UPDATE_ATTEMPTS = int(os.environ.get('BIT_UPDATE_ATTEMPTS', '5'))
+
+def activity_change(trip_id: str, key: str, completed: bool) -> tuple:
+    """Conditional (filter, update) that only matches, and adjusts completed_count, when the activity flips"""
+    path = f"completed_activities.{key}"
+    if completed:
+        return (
+            # Trips stored with completed_bits take id-keyed changes only
+            {"id": trip_id, path: {"$ne": True}, "completed_bits": {"$exists": False}},
+            {"$set": {path: True}, "$inc": {"completed_count": 1}}
+        )
+    return (
+        {"id": trip_id, path: True},
+        {"$set": {path: False}, "$inc": {"completed_count": -1}}
+    )
+
+def created_between(start: Optional[datetime], end: Optional[datetime]) -> dict:
+    created_at = {}
+    if start is not None:
+        created_at["$gte"] = start
+    if end is not None:
+        created_at["$lt"] = end
+    return {"created_at": created_at} if created_at else {}
+
+def upsert_operation(key_field: str, document: dict) -> UpdateOne:
+    fields = {field: value for field, value in document.items() if field not in INSERT_ONLY_FIELDS}
+    new_fields = {field: document[field] for field in INSERT_ONLY_FIELDS if field in document}
+    return UpdateOne({key_field: document[key_field]}, {"$set": fields, "$setOnInsert": new_fields}, upsert=True)
+
+class MongoStorage(Storage):
+    """Motor-backed storage; pass db to run against an existing database handle (e.g. mongomock)"""
+
+    name = "mongo"
+
+    def __init__(self, db=None):
+        self.pool_metrics = PoolMetricsListener(max_pool_size=MONGO_MAX_POOL_SIZE)
+        self.client = None
+        if db is None:
+            self.client = AsyncIOMotorClient(
+                os.environ['MONGO_URL'],
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                event_listeners=[self.pool_metrics],
+            )
+            db = self.client[os.environ['DB_NAME']]
+        self.db = db
+        self.destinations = db.destinations
+        self.travel_plans = db.travel_plans
+        self.user_trips = db.user_trips
+        self.trip_rollups = db.trip_rollups
+
+    async def create_indexes(self):
+        """Create the indexes used by the lookup paths (idempotent)"""
+        await asyncio.gather(
+            self.destinations.create_index("name_key", unique=True),
+            self.destinations.create_index("id", unique=True),
+            # Keyset pagination over name_key, optionally filtered
+            self.destinations.create_index([("popular", 1), ("name_key", 1)]),
+            self.destinations.create_index([("country", 1), ("name_key", 1)]),
+            self.travel_plans.create_index("destination_key", unique=True),
+            self.user_trips.create_index("id", unique=True),
+            self.user_trips.create_index(
+                "share_token",
+                unique=True,
+                partialFilterExpression={"share_token": {"$type": "string"}}
+            ),
+            # Analytics: date-range scans, optionally narrowed to one destination or tier
+            self.user_trips.create_index("created_at"),
+            self.user_trips.create_index([("destination", 1), ("created_at", 1)]),
+            self.user_trips.create_index([("selected_budget", 1), ("created_at", 1)]),
+            self.user_trips.create_index([("destination", 1), ("end_date", 1)]),
+            # Trip exports: per user by creation time, and by trip start date
+            self.user_trips.create_index([("user_email", 1), ("created_at", 1)]),
+            self.user_trips.create_index("start_date"),
+            self.trip_rollups.create_index([(field, 1) for field in TRIP_BUCKET_KEY], unique=True),
+        )
+
+    async def warm_pool(self):
+        """Open minPoolSize connections up front so the first requests don't pay for connection setup"""
+        await asyncio.gather(*(self.ping() for _ in range(max(MONGO_MIN_POOL_SIZE, 1))))
+
+    async def connect(self):
+        try:
+            await self.create_indexes()
+        except Exception as e:
+            # Lookups rely on the unique indexes, so the worker must not report ready without them.
+            # Usually duplicate legacy documents; run migrations.py to backfill and resolve them
+            logging.error(f"Error creating database indexes: {e}")
+            raise
+        await self.warm_pool()
+
+    async def close(self):
+        if self.client is not None:
+            self.client.close()
+
+    async def ping(self):
+        await self.db.command("ping")
+
+    def pool_stats(self) -> Dict[str, float]:
+        return self.pool_metrics.stats()
+
+    async def insert_destination(self, document: dict):
+        await self.destinations.insert_one(document)
+
+    async def find_destinations(self, popular_only: bool = False) -> List[dict]:
+        query = {"popular": True} if popular_only else {}
+        return await self.destinations.find(query).to_list(1000)
+
+    async def iter_destinations(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        country: Optional[str] = None,
+        popular_only: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[dict]:
+        query = {}
+        if popular_only:
+            query["popular"] = True
+        if country:
+            query["country"] = country
+        if after is not None:
+            query["name_key"] = {"$gt": after}
+
+        projection = {"_id": 0}
+        if fields:
+            projection.update({field: 1 for field in fields})
+            projection["name_key"] = 1
+
+        cursor = self.destinations.find(query, projection).sort("name_key", 1)
+        if limit:
+            cursor = cursor.limit(limit).batch_size(min(limit, 100))
+        async for document in cursor:
+            yield document
+
+    async def find_destination(self, name_key: str) -> Optional[dict]:
+        return await self.destinations.find_one({"name_key": name_key})
+
+    async def upsert_destinations(self, documents: List[dict]) -> int:
+        result = await self.destinations.bulk_write(
+            [upsert_operation("name_key", document) for document in documents],
+            ordered=False
+        )
+        return result.upserted_count + result.matched_count
+
+    async def insert_travel_plan(self, document: dict):
+        await self.travel_plans.insert_one(document)
+
+    async def find_travel_plan(self, destination_key: str) -> Optional[dict]:
+        return await self.travel_plans.find_one({"destination_key": destination_key})
+
+    async def find_travel_plans(self, destination_keys: List[str]) -> Dict[str, dict]:
+        return {
+            document["destination_key"]: document
+            async for document in self.travel_plans.find({"destination_key": {"$in": destination_keys}}, {"_id": 0})
+        }
+
+    async def find_budget_plan(self, destination_key: str, field: str) -> Optional[dict]:
+        plan = await self.travel_plans.find_one({"destination_key": destination_key}, {"_id": 0, field: 1})
+        return plan.get(field) if plan else None
+
+    async def find_plan_day(self, destination_key: str, field: str, day: int) -> Optional[dict]:
+        documents = await self.travel_plans.aggregate([
+            {"$match": {"destination_key": destination_key}},
+            {"$limit": 1},
+            {"$project": {"_id": 0, "day": {"$arrayElemAt": [
+                {"$filter": {
+                    "input": f"${field}.itinerary",
+                    "as": "itinerary_day",
+                    "cond": {"$eq": ["$$itinerary_day.day", day]}
+                }},
+                0
+            ]}}}
+        ]).to_list(1)
+        return documents[0].get("day") if documents else None
+
+    async def iter_travel_plans(self, batch_size: int) -> AsyncIterator[dict]:
+        async for document in self.travel_plans.find({}, {"_id": 0}).batch_size(batch_size):
+            yield document
+
+    async def upsert_travel_plans(self, documents: List[dict]) -> int:
+        result = await self.travel_plans.bulk_write(
+            [upsert_operation("destination_key", document) for document in documents],
+            ordered=False
+        )
+        return result.upserted_count + result.matched_count
+
+    async def insert_user_trip(self, document: dict):
+        await self.user_trips.insert_one(document)
+
+    async def insert_user_trips(self, documents: List[dict]) -> Tuple[Dict[str, Optional[str]], Dict[int, str]]:
+        operations = [UpdateOne({"id": document["id"]}, {"$setOnInsert": document}, upsert=True) for document in documents]
+        errors = {}
+        try:
+            await self.user_trips.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Concurrent replays of the same ID race on the unique index; those count as existing
+            errors = {
+                error["index"]: error.get("errmsg")
+                for error in e.details.get("writeErrors", [])
+                if error.get("code") != 11000
+            }
+
+        trip_ids = [document["id"] for document in documents]
+        stored = {
+            document["id"]: document.get("share_token")
+            async for document in self.user_trips.find({"id": {"$in": trip_ids}}, {"_id": 0, "id": 1, "share_token": 1})
+        }
+        return stored, errors
+
+    async def find_user_trip(self, trip_id: str) -> Optional[dict]:
+        return await self.user_trips.find_one({"id": trip_id})
+
+    async def find_user_trip_by_token(self, share_token: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[dict]:
+        projection = {"_id": 0, **{field: 1 for field in fields}} if fields else None
+        return await self.user_trips.find_one({"share_token": share_token}, projection)
+
+    async def iter_user_trips_by_email(self, user_email: str, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[dict]:
+        cursor = self.user_trips.find({"user_email": user_email}, {"_id": 0, **{field: 1 for field in fields}})
+        async for document in cursor.sort("created_at", -1).batch_size(batch_size):
+            yield document
+
+    async def iter_user_trips_by_start(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        fields: Tuple[str, ...],
+        batch_size: int
+    ) -> AsyncIterator[dict]:
+        start_date = {}
+        if start is not None:
+            start_date["$gte"] = start
+        if end is not None:
+            start_date["$lt"] = end
+        cursor = self.user_trips.find(
+            {"start_date": start_date} if start_date else {},
+            {"_id": 0, **{field: 1 for field in fields}}
+        )
+        async for document in cursor.sort("start_date", 1).batch_size(batch_size):
+            yield document
+
+    async def set_trip_progress(self, trip_id: str, progress: dict) -> Optional[dict]:
+        return await self.user_trips.find_one_and_update(
+            {"id": trip_id},
+            {"$set": progress},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def find_progress_counts(self, trip_ids: List[str]) -> Dict[str, dict]:
+        return {
+            document.pop("id"): document
+            async for document in self.user_trips.find({"id": {"$in": trip_ids}}, {**PROGRESS_COUNTS_PROJECTION, "id": 1})
+        }
+
+    async def apply_bit_changes(self, trip_id: str, changes: Dict[int, bool]) -> Optional[dict]:
+        """Set activity ids in a trip's completed_bits with compare-and-set, retrying on concurrent writes"""
+        for _ in range(BIT_UPDATE_ATTEMPTS):
+            trip = await self.user_trips.find_one({"id": trip_id}, {**PROGRESS_COUNTS_PROJECTION, "completed_bits": 1})
+            if trip is None:
+                return None
+            counts = project(trip, PROGRESS_COUNT_FIELDS)
+            if "completed_bits" not in trip:
+                return counts
+            progress = changed_progress(trip, changes)
+            if progress["completed_bits"] == trip["completed_bits"]:
+                return counts
+            counts = await self.user_trips.find_one_and_update(
+                {"id": trip_id, "completed_bits": trip["completed_bits"]},
+                {"$set": progress},
+                projection=PROGRESS_COUNTS_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+            if counts is not None:
+                return counts
+        raise RuntimeError(f"Progress of trip {trip_id} kept changing during {BIT_UPDATE_ATTEMPTS} update attempts")
+
+    async def apply_activity_changes(self, trip_id: str, changes: ProgressChanges) -> Optional[dict]:
+        bit_changes = {key: completed for key, completed in changes.items() if isinstance(key, int)}
+        if bit_changes:
+            return await self.apply_bit_changes(trip_id, bit_changes)
+        operations = [activity_change(trip_id, key, completed) for key, completed in changes.items()]
+
+        if len(operations) == 1:
+            # Common single check-off: one round trip unless it was a no-op
+            query, update = operations[0]
+            counts = await self.user_trips.find_one_and_update(
+                query,
+                update,
+                projection=PROGRESS_COUNTS_PROJECTION,
+                return_document=ReturnDocument.AFTER
+            )
+            if counts is not None:
+                return counts
+        elif operations:
+            await self.user_trips.bulk_write([UpdateOne(query, update) for query, update in operations], ordered=False)
+        return await self.user_trips.find_one({"id": trip_id}, PROGRESS_COUNTS_PROJECTION)
+
+    async def apply_progress_changes(self, updates: List[Tuple[str, ProgressChanges]]):
+        operations = []
+        bit_changes: Dict[str, Dict[int, bool]] = {}
+        for trip_id, changes in updates:
+            for key, completed in changes.items():
+                if isinstance(key, int):
+                    # Merged per trip in order, so a later toggle of the same activity wins
+                    bit_changes.setdefault(trip_id, {})[key] = completed
+                else:
+                    operations.append(UpdateOne(*activity_change(trip_id, key, completed)))
+        if operations:
+            await self.user_trips.bulk_write(operations, ordered=True)
+        await asyncio.gather(*(self.apply_bit_changes(trip_id, changes) for trip_id, changes in bit_changes.items()))
+
+    async def aggregate_trip_buckets(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        match = created_between(start, end)
+        if destination:
+            match["destination"] = destination
+        documents = await self.user_trips.aggregate([
+            {"$match": match},
+            # storage.progress_total: trips without a plan are measured against their progress map's keys
+            {"$addFields": {"progress_total": {"$cond": [
+                {"$gt": ["$total_activities", 0]},
+                "$total_activities",
+                {"$size": {"$objectToArray": {"$ifNull": ["$completed_activities", {}]}}}
+            ]}}},
+            {"$group": {
+                "_id": {
+                    "date": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "destination": "$destination",
+                    "selected_budget": "$selected_budget",
+                },
+                "trips": {"$sum": 1},
+                "completion_sum": {"$sum": {"$cond": [
+                    {"$gt": ["$progress_total", 0]},
+                    {"$min": [{"$divide": ["$completed_count", "$progress_total"]}, 1]},
+                    0
+                ]}},
+                "completed_trips": {"$sum": {"$cond": [
+                    {"$and": [{"$gt": ["$progress_total", 0]}, {"$gte": ["$completed_count", "$progress_total"]}]},
+                    1,
+                    0
+                ]}},
+            }},
+        ]).to_list(None)
+        return [{**document.pop("_id"), **document} for document in documents]
+
+    async def aggregate_activity_completion(self, ended_before: datetime, destination: Optional[str] = None) -> dict:
+        match = {"end_date": {"$lt": ended_before}}
+        if destination:
+            match["destination"] = destination
+        plan = {"destination": "$destination", "selected_budget": "$selected_budget"}
+        documents = await self.user_trips.aggregate([
+            {"$match": match},
+            {"$facet": {
+                "trips": [{"$group": {"_id": plan, "trips": {"$sum": 1}}}],
+                "completed": [
+                    {"$project": {"destination": 1, "selected_budget": 1, "activity": {"$objectToArray": "$completed_activities"}}},
+                    {"$unwind": "$activity"},
+                    {"$match": {"activity.v": True}},
+                    {"$group": {"_id": {**plan, "key": "$activity.k"}, "completed": {"$sum": 1}}},
+                ],
+                # Bits can't be unwound server-side: count trips per distinct bitset and expand here
+                "completed_bits": [
+                    {"$match": {"completed_bits": {"$exists": True}}},
+                    {"$group": {"_id": {**plan, "bits": "$completed_bits"}, "trips": {"$sum": 1}}},
+                ],
+            }},
+        ]).to_list(1)
+        facets = documents[0] if documents else {}
+        completed_by_id = defaultdict(int)
+        for document in facets.get("completed_bits", []):
+            key = document["_id"]
+            for activity_id in completed_ids(key["bits"]):
+                completed_by_id[(key.get("destination"), key.get("selected_budget"), activity_id)] += document["trips"]
+        rows = {
+            facet: [{**document.pop("_id"), **document} for document in facets.get(facet, [])]
+            for facet in ("trips", "completed")
+        }
+        rows["completed"].extend(
+            {"destination": destination, "selected_budget": selected_budget, "key": activity_id, "completed": count}
+            for (destination, selected_budget, activity_id), count in completed_by_id.items()
+        )
+        return rows
+
+    async def save_trip_rollups(self, buckets: List[dict]):
+        if buckets:
+            await self.trip_rollups.bulk_write([
+                ReplaceOne({field: bucket[field] for field in TRIP_BUCKET_KEY}, bucket, upsert=True)
+                for bucket in buckets
+            ], ordered=False)
+
+    async def find_trip_rollups(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        query = {}
+        if start is not None or end is not None:
+            query["date"] = {}
+            if start is not None:
+                query["date"]["$gte"] = day_key(start)
+            if end is not None:
+                query["date"]["$lt"] = day_key(end)
+        if destination:
+            query["destination"] = destination
+        return await self.trip_rollups.find(query, {"_id": 0}).to_list(None)
@@ -0,0 +1,17 @@
+import base64
+import json
+from typing import Any, Optional
+
+def encode_cursor(value: Any) -> str:
+    """Opaque, URL-safe keyset cursor"""
+    return base64.urlsafe_b64encode(json.dumps(value, separators=(",", ":")).encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Any:
+    """Inverse of encode_cursor; raises ValueError on malformed input"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
@@ -0,0 +1,46 @@
+from typing import Dict, List
+
+# Trips store progress either as completed_activities, a map of positional keys to
+# booleans, or compactly as completed_bits: a little-endian bitset (BSON binary) where
+# bit n is set when the activity with id n is completed. The API always speaks the map;
+# these convert using the plan's Activity ids (BudgetPlan.activity_ids()). Keys that
+# match no activity of the plan are dropped.
+
+def _to_bytes(value: int) -> bytes:
+    # Trailing zero bytes are trimmed, so equal progress always encodes to equal bytes
+    return value.to_bytes((value.bit_length() + 7) // 8, "little")
+
+def completed_ids(bits: bytes) -> List[int]:
+    """Ids of the activities set in a bitset"""
+    value = int.from_bytes(bits, "little")
+    return [activity_id for activity_id in range(value.bit_length()) if value >> activity_id & 1]
+
+def count_bits(bits: bytes) -> int:
+    return bin(int.from_bytes(bits, "little")).count("1")
+
+def set_bits(bits: bytes, changes: Dict[int, bool]) -> bytes:
+    """Bitset after setting or clearing activity ids"""
+    value = int.from_bytes(bits, "little")
+    for activity_id, completed in changes.items():
+        if completed:
+            value |= 1 << activity_id
+        else:
+            value &= ~(1 << activity_id)
+    return _to_bytes(value)
+
+def to_bitset(completed_activities: Dict[str, bool], activity_ids: Dict[str, int]) -> bytes:
+    """Bitset of the completed activities in a progress map"""
+    return set_bits(b"", {
+        activity_ids[key]: True
+        for key, completed in completed_activities.items()
+        if completed is True and key in activity_ids
+    })
+
+def to_completed_activities(bits: bytes, activity_ids: Dict[str, int]) -> Dict[str, bool]:
+    """Progress map for a stored bitset, listing completed activities only"""
+    completed = set(completed_ids(bits))
+    return {key: True for key, activity_id in activity_ids.items() if activity_id in completed}
+
+def ordinal_changes(changes: Dict[str, bool], activity_ids: Dict[str, int]) -> Dict[int, bool]:
+    """Activity changes keyed by id instead of by positional key"""
+    return {activity_ids[key]: completed for key, completed in changes.items() if key in activity_ids}
@@ -0,0 +1,482 @@
+import math
+import re
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from models import BUDGET_TIERS, activity_key
+
+# Letters that NFKD does not decompose into a base letter plus a combining mark
+LATIN_LIGATURES = str.maketrans({"œ": "oe", "æ": "ae", "ø": "o", "ł": "l", "đ": "d", "ı": "i"})
+
+def fold_text(text: str, fold_accents: bool = True) -> str:
+    """Casefold and collapse whitespace; optionally strip accents so "Sacre" matches "Sacré" """
+    if text.isascii():
+        # Nothing to strip or normalize
+        return " ".join(text.casefold().split())
+    if fold_accents:
+        text = "".join(
+            char for char in unicodedata.normalize("NFKD", text.casefold().translate(LATIN_LIGATURES))
+            if not unicodedata.combining(char)
+        )
+    else:
+        text = unicodedata.normalize("NFKC", text)
+    return " ".join(text.casefold().split())
+
+# Runs of letters and digits (\w without the underscore)
+WORD = re.compile(r"[^\W_]+")
+
+def word_tokens(folded: str) -> List[str]:
+    return WORD.findall(folded)
+
+class _SortedTerms:
+    """Sorted (term, key) pairs for bisect-based prefix scans"""
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str]] = []
+
+    def add(self, term: str, key: str):
+        insort(self.entries, (term, key))
+
+    def remove(self, term: str, key: str):
+        position = bisect_left(self.entries, (term, key))
+        if position < len(self.entries) and self.entries[position] == (term, key):
+            del self.entries[position]
+
+    def scan(self, prefix: str) -> Iterable[str]:
+        entries = self.entries
+        position = bisect_left(entries, (prefix, ""))
+        while position < len(entries):
+            term, key = entries[position]
+            if not term.startswith(prefix):
+                return
+            yield key
+            position += 1
+
+class DestinationSearchIndex:
+    """In-memory prefix index over destination names and countries for typeahead"""
+
+    def __init__(self, fold_accents: bool = True):
+        self.fold_accents = fold_accents
+        # Searched in this order, so full-name prefix matches rank first
+        self._names = _SortedTerms()
+        self._name_words = _SortedTerms()
+        self._countries = _SortedTerms()
+        self._terms: Dict[str, List[Tuple[_SortedTerms, str]]] = {}
+        self._destinations: Dict[str, dict] = {}
+
+    def __len__(self) -> int:
+        return len(self._destinations)
+
+    def _terms_for(self, destination: dict) -> List[Tuple[_SortedTerms, str]]:
+        name = fold_text(destination["name"], self.fold_accents)
+        country = fold_text(destination.get("country") or "", self.fold_accents)
+        terms = [(self._names, name)]
+        terms.extend((self._name_words, token) for token in set(word_tokens(name)[1:]))
+        if country:
+            terms.append((self._countries, country))
+            terms.extend((self._countries, token) for token in set(word_tokens(country)[1:]))
+        return terms
+
+    def _remove(self, key: str):
+        for terms, term in self._terms.pop(key, []):
+            terms.remove(term, key)
+        self._destinations.pop(key, None)
+
+    def add(self, key: str, destination: dict):
+        """Index or re-index a single destination"""
+        self._remove(key)
+        terms = self._terms_for(destination)
+        for sorted_terms, term in terms:
+            sorted_terms.add(term, key)
+        self._terms[key] = terms
+        self._destinations[key] = destination
+
+    def rebuild(self, destinations: Iterable[Tuple[str, dict]]):
+        """Replace the whole index in one pass"""
+        self._names, self._name_words, self._countries = _SortedTerms(), _SortedTerms(), _SortedTerms()
+        self._terms, self._destinations = {}, {}
+        for key, destination in destinations:
+            terms = self._terms_for(destination)
+            for sorted_terms, term in terms:
+                sorted_terms.entries.append((term, key))
+            self._terms[key] = terms
+            self._destinations[key] = destination
+        # One sort per array instead of an insort per term
+        for sorted_terms in (self._names, self._name_words, self._countries):
+            sorted_terms.entries.sort()
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        prefix = fold_text(query, self.fold_accents)
+        if not prefix or limit <= 0:
+            return []
+
+        seen = set()
+        results = []
+        for sorted_terms in (self._names, self._name_words, self._countries):
+            for key in sorted_terms.scan(prefix):
+                if key in seen:
+                    continue
+                seen.add(key)
+                results.append(self._destinations[key])
+                if len(results) >= limit:
+                    return results
+        return results
+
+NONZERO_BYTE = re.compile(rb"[^\x00]")
+
+def _set_bit(bitmap: bytearray, entry_id: int):
+    byte = entry_id >> 3
+    if byte >= len(bitmap):
+        bitmap.extend(bytes(byte + 1 - len(bitmap)))
+    bitmap[byte] |= 1 << (entry_id & 7)
+
+def _bitmap_ids(bitmap: bytes, start: int = 0) -> Iterator[int]:
+    """Ids set in a little-endian bitmap, ascending from start"""
+    match = NONZERO_BYTE.search(bitmap, start >> 3)
+    while match:
+        byte = match.start()
+        value = bitmap[byte]
+        for bit in range(8):
+            entry_id = byte * 8 + bit
+            if value >> bit & 1 and entry_id >= start:
+                yield entry_id
+        match = NONZERO_BYTE.search(bitmap, byte + 1)
+
+class _Postings:
+    """Entry ids of one term: an array while the term is rare, a bitmap once it is common
+
+    A term switches to a bitmap once the array would take more memory than one
+    bit per entry of the index; bitmaps are what make broad queries cheap, since
+    intersections and counts run over whole Python ints.
+    """
+
+    __slots__ = ("ids", "bitmap", "size", "_value")
+
+    def __init__(self):
+        self.ids: Optional[array] = array("I")
+        self.bitmap: Optional[bytearray] = None
+        self.size = 0
+        # The bitmap as an int, kept between queries until the next write
+        self._value: Optional[int] = None
+
+    def add(self, entry_id: int, capacity: int):
+        self.size += 1
+        self._value = None
+        if self.bitmap is not None:
+            _set_bit(self.bitmap, entry_id)
+            return
+        self.ids.append(entry_id)
+        if len(self.ids) * 32 >= capacity:
+            self.bitmap = bytearray()
+            for known_id in self.ids:
+                _set_bit(self.bitmap, known_id)
+            self.ids = None
+
+    @classmethod
+    def from_ids(cls, ids: List[int], capacity: int) -> "_Postings":
+        postings = cls()
+        postings.size = len(ids)
+        if len(ids) * 32 >= capacity:
+            postings.bitmap = bytearray((capacity + 7) // 8)
+            bitmap = postings.bitmap
+            for entry_id in ids:
+                bitmap[entry_id >> 3] |= 1 << (entry_id & 7)
+            postings.ids = None
+        else:
+            postings.ids = array("I", ids)
+        return postings
+
+    def remove(self, entry_id: int):
+        self.size -= 1
+        self._value = None
+        if self.bitmap is not None:
+            self.bitmap[entry_id >> 3] &= ~(1 << (entry_id & 7))
+        else:
+            self.ids.remove(entry_id)
+
+    def contains(self) -> Callable[[int], bool]:
+        """Membership test, built once per query"""
+        if self.bitmap is not None:
+            bitmap = self.bitmap
+            return lambda entry_id: entry_id >> 3 < len(bitmap) and bitmap[entry_id >> 3] >> (entry_id & 7) & 1
+        return set(self.ids).__contains__
+
+    def to_int(self) -> int:
+        if self._value is None:
+            bitmap = self.bitmap
+            if bitmap is None:
+                bitmap = bytearray()
+                for entry_id in self.ids:
+                    _set_bit(bitmap, entry_id)
+            self._value = int.from_bytes(bitmap, "little")
+        return self._value
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids) if self.bitmap is None else _bitmap_ids(bytes(self.bitmap))
+
+EMPTY_POSTINGS = _Postings()
+
+class PlanEntry(NamedTuple):
+    """One searchable activity or highlight of a travel plan tier"""
+    destination: str
+    tier: str
+    match: str  # activity or highlight
+    day: Optional[int]
+    day_index: Optional[int]
+    activity_index: Optional[int]
+    activity_id: Optional[int]
+    time: Optional[str]
+    text: str
+    type: Optional[str]
+    # Token count, for length normalization
+    length: int
+
+# BM25 parameters; entries are a single line, so every token counts once
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Queries whose narrowest filter matches at most this many entries check the other
+# filters entry by entry instead of intersecting bitmaps
+SCAN_MAX_CANDIDATES = 4096
+
+class PlanSearchIndex:
+    """In-memory inverted index over plan activities and highlights, with a facet on activity type
+
+    Every activity and highlight of every tier is one entry. Tokens, activity types,
+    tiers, destinations and entry lengths each map to the postings of the entries
+    they cover. All query tokens are required and activity texts rarely repeat a
+    word, so ranking is by entry length alone: shortest first, then by entry id,
+    with pages continuing after the last (length, id) returned. Entry ids only
+    grow, and a re-indexed plan gets new ones, so its entries move behind every
+    open cursor instead of being skipped; rebuild() renumbers compactly.
+    """
+
+    def __init__(self, fold_accents: bool = True):
+        self.fold_accents = fold_accents
+        # Removed entries leave None behind; their ids are never handed out again
+        self._entries: List[Optional[PlanEntry]] = []
+        self._postings: Dict[str, _Postings] = {}
+        self._types: Dict[str, _Postings] = {}
+        self._tiers: Dict[str, _Postings] = {}
+        self._lengths: Dict[int, _Postings] = {}
+        self._plans: Dict[str, _Postings] = {}
+        self._type_names: Dict[str, str] = {}
+        self._entry_count = 0
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def _tokens(self, text: str) -> List[str]:
+        return word_tokens(fold_text(text, self.fold_accents))
+
+    def _type(self, activity_type: Optional[str]) -> Optional[str]:
+        if not activity_type:
+            return None
+        folded = self._type_names.get(activity_type)
+        if folded is None:
+            folded = self._type_names[activity_type] = fold_text(activity_type)
+        return folded
+
+    def _entries_for(self, plan: dict) -> Iterator[Tuple[PlanEntry, List[str]]]:
+        destination = plan.get("destination_name")
+        for tier, field in BUDGET_TIERS.items():
+            budget_plan = plan.get(field) or {}
+            for highlight in budget_plan.get("highlights", []):
+                tokens = self._tokens(highlight)
+                yield PlanEntry(destination, tier, "highlight", None, None, None, None, None, highlight, None, len(tokens)), tokens
+            for day_index, itinerary_day in enumerate(budget_plan.get("itinerary", [])):
+                for activity_index, activity in enumerate(itinerary_day.get("activities", [])):
+                    task = activity.get("task", "")
+                    tokens = self._tokens(task)
+                    entry = PlanEntry(
+                        destination,
+                        tier,
+                        "activity",
+                        itinerary_day.get("day"),
+                        day_index,
+                        activity_index,
+                        activity.get("id"),
+                        sys.intern(activity["time"]) if activity.get("time") else None,
+                        task,
+                        self._type(activity.get("type")),
+                        len(tokens),
+                    )
+                    yield entry, tokens
+
+    def _terms(self, entry: PlanEntry, tokens: Iterable[str]) -> Iterator[Tuple[Dict, object]]:
+        for token in set(tokens):
+            yield self._postings, token
+        if entry.type:
+            yield self._types, entry.type
+        yield self._tiers, entry.tier
+        yield self._lengths, entry.length
+
+    def _remove(self, destination_key: str):
+        postings = self._plans.pop(destination_key, None)
+        for entry_id in postings or ():
+            entry = self._entries[entry_id]
+            for index, term in self._terms(entry, self._tokens(entry.text)):
+                term_postings = index[term]
+                term_postings.remove(entry_id)
+                if not term_postings.size:
+                    del index[term]
+            self._entries[entry_id] = None
+            self._entry_count -= 1
+            self._total_length -= entry.length
+
+    def add(self, destination_key: str, plan: dict):
+        """Index or re-index one destination's travel plan document"""
+        self._remove(destination_key)
+        plan_postings = self._plans[destination_key] = _Postings()
+        for entry, tokens in self._entries_for(plan):
+            entry_id = len(self._entries)
+            self._entries.append(entry)
+            self._entry_count += 1
+            self._total_length += entry.length
+            capacity = len(self._entries)
+            plan_postings.add(entry_id, capacity)
+            for index, term in self._terms(entry, tokens):
+                term_postings = index.get(term)
+                if term_postings is None:
+                    term_postings = index[term] = _Postings()
+                term_postings.add(entry_id, capacity)
+
+    def rebuild(self, plans: Iterable[Tuple[str, dict]]):
+        """Replace the whole index in one pass"""
+        self.__init__(self.fold_accents)
+        # Plain id lists per term, turned into postings once every entry is numbered
+        token_ids, type_ids, tier_ids, length_ids, plan_ids = (defaultdict(list) for _ in range(5))
+        entries = self._entries
+        for destination_key, plan in plans:
+            entry_ids = plan_ids[destination_key]
+            for entry, tokens in self._entries_for(plan):
+                entry_id = len(entries)
+                entries.append(entry)
+                entry_ids.append(entry_id)
+                self._total_length += entry.length
+                for token in set(tokens):
+                    token_ids[token].append(entry_id)
+                if entry.type:
+                    type_ids[entry.type].append(entry_id)
+                tier_ids[entry.tier].append(entry_id)
+                length_ids[entry.length].append(entry_id)
+        self._entry_count = capacity = len(entries)
+        for index, term_ids in (
+            (self._postings, token_ids),
+            (self._types, type_ids),
+            (self._tiers, tier_ids),
+            (self._lengths, length_ids),
+            (self._plans, plan_ids),
+        ):
+            index.update((term, _Postings.from_ids(ids, capacity)) for term, ids in term_ids.items())
+
+    def _score(self, length: int, idf_sum: float) -> float:
+        average_length = self._total_length / self._entry_count if self._entry_count else 1
+        return idf_sum * (BM25_K1 + 1) / (1 + BM25_K1 * (1 - BM25_B + BM25_B * length / (average_length or 1)))
+
+    def _scan(self, filters: List[_Postings], activity_type: Optional[str]) -> Tuple[List[int], Dict[str, int]]:
+        """Matches and type counts by checking every entry of the narrowest filter"""
+        narrowest, *others = filters
+        tests = [postings.contains() for postings in others]
+        matches = [entry_id for entry_id in narrowest if all(test(entry_id) for test in tests)]
+        facets = Counter(self._entries[entry_id].type for entry_id in matches)
+        facets.pop(None, None)
+        if activity_type:
+            matches = [entry_id for entry_id in matches if self._entries[entry_id].type == activity_type]
+        return matches, dict(facets)
+
+    def _ranked_scan(self, matches: List[int], after: Optional[Tuple[int, int]], count: int) -> List[int]:
+        ranked = sorted((self._entries[entry_id].length, entry_id) for entry_id in matches)
+        if after is not None:
+            ranked = ranked[bisect_left(ranked, (after[0], after[1] + 1)):]
+        return [entry_id for _, entry_id in ranked[:count]]
+
+    def _ranked_bitmap(self, matches: int, after: Optional[Tuple[int, int]], count: int) -> List[int]:
+        page = []
+        for length in sorted(self._lengths):
+            if after is not None and length < after[0]:
+                continue
+            bucket = matches & self._lengths[length].to_int()
+            if not bucket:
+                continue
+            start = after[1] + 1 if after is not None and length == after[0] else 0
+            for entry_id in _bitmap_ids(bucket.to_bytes((bucket.bit_length() + 7) // 8, "little"), start):
+                page.append(entry_id)
+                if len(page) == count:
+                    return page
+        return page
+
+    def search(
+        self,
+        query: str = "",
+        activity_type: Optional[str] = None,
+        tier: Optional[str] = None,
+        destination_key: Optional[str] = None,
+        limit: int = 20,
+        after: Optional[Tuple[int, int]] = None
+    ) -> dict:
+        """Entries containing every query token, shortest first, with activity type counts
+
+        score is the BM25 score of the query tokens, which with every token required
+        follows entry length; filter-only queries have no tokens and score 0. Type
+        counts cover the matches before the activity_type filter, so they show how
+        many entries narrowing to each type would leave.
+        """
+        tokens = list(dict.fromkeys(self._tokens(query)))
+        activity_type = fold_text(activity_type) if activity_type else None
+        filters = [self._postings.get(token, EMPTY_POSTINGS) for token in tokens]
+        if tier:
+            filters.append(self._tiers.get(tier, EMPTY_POSTINGS))
+        if destination_key:
+            filters.append(self._plans.get(destination_key, EMPTY_POSTINGS))
+        filters.sort(key=lambda postings: postings.size)
+
+        if filters and filters[0].size <= SCAN_MAX_CANDIDATES:
+            matches, facets = self._scan(filters, activity_type)
+            total = len(matches)
+            page = self._ranked_scan(matches, after, limit + 1)
+        else:
+            bitmap = None
+            for postings in filters:
+                bitmap = postings.to_int() if bitmap is None else bitmap & postings.to_int()
+            type_bitmaps = {name: postings.to_int() for name, postings in self._types.items()}
+            if bitmap is None:
+                facets = {name: postings.size for name, postings in self._types.items()}
+            else:
+                facets = {name: (bitmap & type_bitmap).bit_count() for name, type_bitmap in type_bitmaps.items()}
+            if activity_type:
+                type_bitmap = type_bitmaps.get(activity_type, 0)
+                bitmap = type_bitmap if bitmap is None else bitmap & type_bitmap
+            bitmap = bitmap or 0
+            total = bitmap.bit_count()
+            page = self._ranked_bitmap(bitmap, after, limit + 1)
+
+        idf_sum = sum(
+            math.log(1 + (self._entry_count - self._postings[token].size + 0.5) / (self._postings[token].size + 0.5))
+            for token in tokens if token in self._postings
+        )
+        results = []
+        for entry_id in page[:limit]:
+            entry = self._entries[entry_id]
+            results.append({
+                "destination": entry.destination,
+                "tier": entry.tier,
+                "match": entry.match,
+                "day": entry.day,
+                "key": activity_key(entry.day_index, entry.activity_index) if entry.match == "activity" else None,
+                "activity_id": entry.activity_id,
+                "time": entry.time,
+                "text": entry.text,
+                "type": entry.type,
+                "score": round(self._score(entry.length, idf_sum), 4),
+            })
+        last = self._entries[page[limit - 1]] if len(page) > limit else None
+        return {
+            "total": total,
+            "facets": {"type": {name: count for name, count in sorted(facets.items(), key=lambda item: (-item[1], item[0])) if count}},
+            "results": results,
+            "next_after": (last.length, page[limit - 1]) if last else None,
+        }
@@ -1,8 +1,8 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
-from database import DatabaseManager
 from models import *
+from seeding import load_catalog, SEED_BATCH_SIZE, SEED_CONCURRENCY
 import asyncio
 
 # Load environment variables
@@ -10,8 +10,8 @@ ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # Seed data based on mockData.js
-async def seed_database():
-    """Seed the database with initial travel data"""
+def build_sample_catalog() -> list:
+    """Sample destinations followed by their travel plans"""
     
     # Create destinations
     destinations_data = [
@@ -23,9 +23,7 @@ async def seed_database():
         {"name": "Barcelona, Spain", "country": "Spain", "popular": True},
     ]
     
-    for dest_data in destinations_data:
-        destination = DestinationCreate(**dest_data)
-        await DatabaseManager.create_destination(destination)
+    destinations = [DestinationCreate(**dest_data) for dest_data in destinations_data]
     
     # Create Paris travel plan
     paris_plan = TravelPlanCreate(
@@ -168,8 +166,6 @@ async def seed_database():
         )
     )
     
-    await DatabaseManager.create_travel_plan(paris_plan)
-    
     # Create Tokyo travel plan
     tokyo_plan = TravelPlanCreate(
         destination_id="tokyo_japan",
@@ -249,9 +245,19 @@ async def seed_database():
         )
     )
     
-    await DatabaseManager.create_travel_plan(tokyo_plan)
+    return [*destinations, paris_plan, tokyo_plan]
+
+async def seed_database(batch_size: int = SEED_BATCH_SIZE, concurrency: int = SEED_CONCURRENCY) -> SeedReport:
+    """Seed the database with initial travel data (idempotent: existing entries are updated)"""
+    report = await load_catalog(
+        build_sample_catalog(),
+        batch_size=batch_size,
+        concurrency=concurrency
+    )
     
     print("✅ Database seeded successfully with destinations and travel plans!")
+    return report
 
 if __name__ == "__main__":
-    asyncio.run(seed_database())
\ No newline at end of file
+    from seeding import run_with_database
+    asyncio.run(run_with_database(seed_database()))
\ No newline at end of file
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import os
+import re
+import time
+from pathlib import Path
+from typing import Iterable, Iterator, List, Union
+import typer
+from database import DatabaseManager
+from models import *
+
+SEED_BATCH_SIZE = int(os.environ.get('SEED_BATCH_SIZE', '500'))
+SEED_CONCURRENCY = int(os.environ.get('SEED_CONCURRENCY', '4'))
+
+CatalogRecord = Union[DestinationCreate, TravelPlanCreate]
+
+class SeedError(Exception):
+    """Batches that failed to write; the other batches were written"""
+
+    def __init__(self, errors: List[BaseException]):
+        super().__init__(f"{len(errors)} catalog batches failed to write; first error: {errors[0]!r}")
+        self.errors = errors
+
+class CatalogLoader:
+    """Batches catalog documents per collection and writes them as concurrent bulk upserts"""
+
+    def __init__(self, batch_size: int = SEED_BATCH_SIZE, concurrency: int = SEED_CONCURRENCY):
+        self.batch_size = max(batch_size, 1)
+        # Bounds in-flight batches, which also bounds memory while streaming large files
+        self._slots = asyncio.Semaphore(max(concurrency, 1))
+        self._tasks = set()
+        # Failures of finished batches, raised by finish()
+        self._errors: List[BaseException] = []
+        self._destinations: List[DestinationCreate] = []
+        self._travel_plans: List[TravelPlanCreate] = []
+        self.destinations_written = 0
+        self.travel_plans_written = 0
+        self._started_at = time.perf_counter()
+
+    async def add(self, record: CatalogRecord):
+        if isinstance(record, TravelPlanCreate):
+            self._travel_plans.append(record)
+            if len(self._travel_plans) >= self.batch_size:
+                await self._dispatch_travel_plans()
+        else:
+            self._destinations.append(record)
+            if len(self._destinations) >= self.batch_size:
+                await self._dispatch_destinations()
+
+    async def _dispatch_destinations(self):
+        batch, self._destinations = self._destinations, []
+        await self._dispatch(self._write_destinations(batch))
+
+    async def _dispatch_travel_plans(self):
+        batch, self._travel_plans = self._travel_plans, []
+        await self._dispatch(self._write_travel_plans(batch))
+
+    async def _dispatch(self, write):
+        await self._slots.acquire()
+        task = asyncio.create_task(write)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        self._slots.release()
+        if not task.cancelled() and task.exception() is not None:
+            self._errors.append(task.exception())
+
+    # Counters are added to after the write: `+= await` would read them before it and lose
+    # the counts of batches finishing concurrently
+    async def _write_destinations(self, batch: List[DestinationCreate]):
+        written = await DatabaseManager.upsert_destinations(batch)
+        self.destinations_written += written
+
+    async def _write_travel_plans(self, batch: List[TravelPlanCreate]):
+        written = await DatabaseManager.upsert_travel_plans(batch)
+        self.travel_plans_written += written
+
+    async def finish(self) -> SeedReport:
+        """Flush partial batches, wait for all writes and report throughput"""
+        if self._destinations:
+            await self._dispatch_destinations()
+        if self._travel_plans:
+            await self._dispatch_travel_plans()
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        if self._errors:
+            raise SeedError(self._errors)
+
+        elapsed = time.perf_counter() - self._started_at
+        documents = self.destinations_written + self.travel_plans_written
+        return SeedReport(
+            destinations=self.destinations_written,
+            travel_plans=self.travel_plans_written,
+            elapsed_seconds=round(elapsed, 3),
+            documents_per_second=round(documents / elapsed, 1) if elapsed > 0 else 0.0,
+        )
+
+async def load_catalog(records: Iterable[CatalogRecord], batch_size: int = SEED_BATCH_SIZE, concurrency: int = SEED_CONCURRENCY) -> SeedReport:
+    """Upsert destinations and travel plans in batches; safe to run repeatedly"""
+    loader = CatalogLoader(batch_size=batch_size, concurrency=concurrency)
+    for record in records:
+        await loader.add(record)
+    return await loader.finish()
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.casefold()).strip("_")
+
+def parse_catalog_record(record: dict) -> Iterator[CatalogRecord]:
+    """Accepts {"destination": {...}, "travel_plan": {...}} or a bare destination/travel plan object"""
+    if "destination" in record or "travel_plan" in record:
+        destination = record.get("destination")
+        if destination:
+            yield DestinationCreate(**destination)
+        travel_plan = record.get("travel_plan")
+        if travel_plan:
+            travel_plan = dict(travel_plan)
+            if destination:
+                travel_plan.setdefault("destination_name", destination["name"])
+            travel_plan.setdefault("destination_id", slugify(travel_plan.get("destination_name", "")))
+            yield TravelPlanCreate(**travel_plan)
+    elif "backpacker" in record:
+        record = dict(record)
+        record.setdefault("destination_id", slugify(record.get("destination_name", "")))
+        yield TravelPlanCreate(**record)
+    else:
+        yield DestinationCreate(**record)
+
+def read_catalog_file(path: Path) -> Iterator[CatalogRecord]:
+    """Stream records from a JSONL file line by line, or from a JSON document"""
+    if path.suffix == ".jsonl":
+        with path.open(encoding="utf-8") as catalog_file:
+            for line in catalog_file:
+                if line.strip():
+                    yield from parse_catalog_record(json.loads(line))
+        return
+
+    with path.open(encoding="utf-8") as catalog_file:
+        data = json.load(catalog_file)
+    if isinstance(data, dict):
+        for destination in data.get("destinations", []):
+            yield DestinationCreate(**destination)
+        for travel_plan in data.get("travel_plans", []):
+            yield from parse_catalog_record(travel_plan)
+    else:
+        for record in data:
+            yield from parse_catalog_record(record)
+
+cli = typer.Typer(help="Load destination catalogs into the database")
+
+def print_report(report: SeedReport):
+    typer.echo(
+        f"Upserted {report.destinations} destinations and {report.travel_plans} travel plans "
+        f"in {report.elapsed_seconds:.2f}s ({report.documents_per_second:.0f} documents/sec)"
+    )
+
+async def run_with_database(work):
+    await DatabaseManager.connect()
+    try:
+        return await work
+    finally:
+        await DatabaseManager.close()
+
+@cli.command()
+def load(
+    path: Path = typer.Argument(..., exists=True, dir_okay=False, help="JSONL or JSON catalog file"),
+    batch_size: int = typer.Option(SEED_BATCH_SIZE, help="Documents per bulk_write"),
+    concurrency: int = typer.Option(SEED_CONCURRENCY, help="Bulk writes in flight at once"),
+):
+    """Stream a catalog file of destinations and travel plans into the database"""
+    report = asyncio.run(run_with_database(
+        load_catalog(read_catalog_file(path), batch_size=batch_size, concurrency=concurrency)
+    ))
+    print_report(report)
+
+@cli.command()
+def seed(
+    batch_size: int = typer.Option(SEED_BATCH_SIZE, help="Documents per bulk_write"),
+    concurrency: int = typer.Option(SEED_CONCURRENCY, help="Bulk writes in flight at once"),
+):
+    """Load the built-in sample catalog"""
+    from seed_data import seed_database
+    report = asyncio.run(run_with_database(seed_database(batch_size=batch_size, concurrency=concurrency)))
+    print_report(report)
+
+if __name__ == "__main__":
+    cli()
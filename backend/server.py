@@ -1,43 +1,334 @@
-from fastapi import FastAPI, APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
+import asyncio
 import logging
+import secrets
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Union
 from urllib.parse import unquote
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 # Import our models and database manager
 from models import *
-from database import DatabaseManager
+from database import DatabaseManager, normalize_name, CACHE_MAX_ENTRIES, WRITE_BEHIND_ENABLED, ANALYTICS_ROLLUPS_ENABLED
+import analytics
+from cache import TTLCache
+from storage import progress_total
+from http_cache import EncodedResponse, cached_json_response
+from pagination import encode_cursor, decode_cursor
+from metrics import MetricsMiddleware, registry, timed
+from admission import ADMISSION_ENABLED, ADMISSION_MAX_CONCURRENT, AdmissionController, AdmissionMiddleware, default_request_classes
+import json
+from datetime import date, datetime, time, timedelta
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Serve catalog endpoints from pre-encoded JSON bodies with ETag/304 support
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'true').lower() == 'true'
+encoded_responses_cache = TTLCache(max_entries=CACHE_MAX_ENTRIES, ttl_seconds=float('inf'))
+
+def get_encoded_response(key, source, encode) -> EncodedResponse:
+    """Reuse the encoded body while the underlying cached object is unchanged"""
+    encoded = encoded_responses_cache.get(key)
+    if encoded is None or encoded.source is not source:
+        with timed("serialize"):
+            encoded = encode()
+        encoded_responses_cache.set(key, encoded)
+    return encoded
+
+def model_response(model: BaseModel) -> Response:
+    """Serialize an already-typed model directly, skipping FastAPI's response_model re-validation"""
+    with timed("serialize"):
+        return Response(content=model.model_dump_json(), media_type="application/json")
+
+def build_travel_plans_response(travel_plan: TravelPlan) -> TravelPlansResponse:
+    """Format a travel plan according to the API contract"""
+    return TravelPlansResponse.model_construct(
+        destination=travel_plan.destination_name,
+        plans={
+            "backpacker": travel_plan.backpacker,
+            "travelEnthusiast": travel_plan.travel_enthusiast,
+            "luxury": travel_plan.luxury
+        }
+    )
+
+# Every worker refreshes the trip rollups on this period; refreshes are idempotent
+ANALYTICS_ROLLUP_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_ROLLUP_INTERVAL_SECONDS', '300'))
+
+async def refresh_rollups_periodically():
+    while True:
+        try:
+            await DatabaseManager.refresh_trip_rollups()
+        except Exception as e:
+            logging.error(f"Error refreshing trip rollups: {e}")
+        await asyncio.sleep(ANALYTICS_ROLLUP_INTERVAL_SECONDS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Storage client is created here, not at import; readiness flips once indexes and the pool are warm
+    await DatabaseManager.connect()
+    rollups = None
+    if ANALYTICS_ROLLUPS_ENABLED and ANALYTICS_ROLLUP_INTERVAL_SECONDS > 0:
+        rollups = asyncio.create_task(refresh_rollups_periodically())
+    yield
+    if rollups:
+        rollups.cancel()
+    # Nothing buffered may be lost on a clean shutdown
+    await DatabaseManager.flush_progress_buffer()
+    await DatabaseManager.close()
+
+HEALTH_PING_TIMEOUT_SECONDS = float(os.environ.get('HEALTH_PING_TIMEOUT_SECONDS', '1'))
+
+# Add a Server-Timing breakdown (database, model construction, serialization) to responses
+SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'false').lower() == 'true'
+
+def collect_database_metrics():
+    """Cache and connection pool counters, sampled at scrape time"""
+    for cache_name, stats in DatabaseManager.cache_stats().items():
+        if "size" in stats:
+            yield "app_cache_entries", "gauge", "Entries in the cache", (("cache", cache_name),), stats["size"]
+        for stat in ("hits", "misses", "evictions"):
+            if stat in stats:
+                yield f"app_cache_{stat}_total", "counter", f"Cache {stat}", (("cache", cache_name),), stats[stat]
+    for stat, value in DatabaseManager.pool_stats().items():
+        yield f"mongo_pool_{stat}", "gauge", f"MongoDB connection pool {stat}", (), value
+    for stat, value in (DatabaseManager.write_behind_stats() or {}).items():
+        kind = "gauge" if stat.startswith("pending_") else "counter"
+        name = f"app_write_behind_{stat}" if kind == "gauge" else f"app_write_behind_{stat}_total"
+        yield name, kind, f"Write-behind buffer {stat}", (), value
+
+registry.register_collector(collect_database_metrics)
+
+# Admission control: per-class concurrency limits with bounded, prioritized queues; 503 + Retry-After when full
+admission = AdmissionController(ADMISSION_MAX_CONCURRENT, default_request_classes())
+registry.register_collector(admission.samples)
+
+# Routes outside the defaults: unlisted GETs are interactive and other methods writes; None bypasses admission
+ADMISSION_ROUTE_CLASSES = {
+    "/metrics": None,
+    "/api/": None,
+    "/api/health": None,
+    "/api/health/live": None,
+    "/api/health/ready": None,
+    "/api/cache/stats": None,
+    "/api/db/pool": None,
+    "/api/users/{email}/trips": "bulk",
+    "/api/trips/export": "bulk",
+    "/api/analytics/rollups/refresh": "admin",
+    "/api/seed-database": "admin",
+}
+
+def admission_class(method: str, route_path: str) -> Optional[str]:
+    if route_path in ADMISSION_ROUTE_CLASSES:
+        return ADMISSION_ROUTE_CLASSES[route_path]
+    if route_path.startswith("/api/analytics/"):
+        return "bulk"
+    return "interactive" if method in ("GET", "HEAD") else "write"
+
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 # Add your routes to the router instead of directly to app
 @api_router.get("/")
 async def root():
     return {"message": "Travel Planner API is running!"}
 
-@api_router.get("/destinations", response_model=List[Destination])
-async def get_destinations(popular: bool = False):
+async def check_readiness() -> dict:
+    """Storage connected and answering a ping within HEALTH_PING_TIMEOUT_SECONDS"""
+    if not DatabaseManager.is_ready():
+        return {"ready": False, "reason": "starting"}
+    try:
+        await asyncio.wait_for(DatabaseManager.ping(), HEALTH_PING_TIMEOUT_SECONDS)
+    except Exception as e:
+        return {"ready": False, "reason": f"storage unavailable: {e.__class__.__name__}"}
+    return {"ready": True}
+
+@api_router.get("/health")
+async def get_health():
+    """Liveness and readiness together, for humans and dashboards"""
+    return {"live": True, **await check_readiness()}
+
+@api_router.get("/health/live")
+async def get_liveness():
+    """The process is up and serving the event loop; never touches storage"""
+    return {"live": True}
+
+@api_router.get("/health/ready")
+async def get_readiness():
+    """Whether this worker should receive traffic (503 until startup finishes or while storage is down)"""
+    readiness = await check_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+async def first_document(documents: AsyncIterator[dict]) -> Optional[dict]:
+    """Read the first document before the response starts, so a failing query still gets a 500"""
+    try:
+        return await documents.__anext__()
+    except StopAsyncIteration:
+        return None
+
+async def stream_destinations_page(first: Optional[dict], documents: AsyncIterator[dict], limit: int):
+    """Encode a page of destinations as it is read, ending with the next keyset cursor"""
+    yield b'{"items":['
+    count = 0
+    last_key = None
+    next_cursor = None
+    document = first
+    try:
+        while document is not None:
+            if count == limit:
+                # The extra document only tells us there is another page
+                next_cursor = encode_cursor(last_key) if last_key is not None else None
+                break
+            # Storage may hand out its own documents (MemoryStorage does), so never mutate them
+            last_key = document.get("name_key")
+            item = {field: value for field, value in document.items() if field != "name_key"}
+            yield (b"," if count else b"") + json.dumps(jsonable_encoder(item), ensure_ascii=False).encode("utf-8")
+            count += 1
+            document = await anext(documents, None)
+    except Exception as e:
+        # The status line is already sent; the client sees a truncated body
+        logging.error(f"Error streaming destinations: {e}")
+        raise
+    yield b'],"next_cursor":' + json.dumps(next_cursor).encode("utf-8") + b"}"
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Trip exports list every user's trips and emails, so they need this token in X-Admin-Token.
+# Unset (the default) disables them
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def ndjson_line(document: dict) -> bytes:
+    return json.dumps(jsonable_encoder(document), ensure_ascii=False).encode("utf-8") + b"\n"
+
+async def stream_ndjson(first: Optional[dict], documents: AsyncIterator[dict]):
+    """Encode documents one per line as the cursor yields them"""
+    if first is None:
+        return
+    yield ndjson_line(first)
+    try:
+        async for document in documents:
+            yield ndjson_line(document)
+    except Exception as e:
+        # The status line is already sent; the client sees a truncated body
+        logging.error(f"Error streaming NDJSON: {e}")
+        raise
+
+async def ndjson_response(documents: AsyncIterator[dict]) -> StreamingResponse:
+    """Stream documents as NDJSON, starting once the first one has been read"""
+    first = await first_document(documents)
+    return StreamingResponse(stream_ndjson(first, documents), media_type=NDJSON_MEDIA_TYPE)
+
+# A list without paging parameters, a DestinationPage with them
+@api_router.get("/destinations", response_model=Union[List[Destination], DestinationPage])
+async def get_destinations(
+    request: Request,
+    popular: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Page size; enables the paginated {items, next_cursor} response"),
+    cursor: Optional[str] = None,
+    country: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated Destination fields to return")
+):
     """Get all destinations or only popular ones"""
+    if limit is not None or cursor or country or fields:
+        try:
+            after = decode_cursor(cursor)
+            if after is not None and not isinstance(after, str):
+                raise ValueError(f"Invalid cursor: {cursor}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        selected_fields = [field.strip() for field in fields.split(",") if field.strip()] if fields else None
+        unknown_fields = set(selected_fields or []) - set(Destination.model_fields)
+        if unknown_fields:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}")
+        
+        page_size = limit or 50
+        documents = DatabaseManager.iter_destinations(
+            page_size + 1,
+            after=after,
+            country=country,
+            popular_only=popular,
+            fields=selected_fields
+        )
+        try:
+            first = await first_document(documents)
+        except Exception as e:
+            logging.error(f"Error getting destinations: {e}")
+            raise HTTPException(status_code=500, detail="Failed to fetch destinations")
+        return StreamingResponse(stream_destinations_page(first, documents, page_size), media_type="application/json")
+    
     try:
         destinations = await DatabaseManager.get_destinations(popular_only=popular)
+        
+        if RESPONSE_CACHE_ENABLED:
+            encoded = get_encoded_response(
+                ("destinations", popular),
+                destinations,
+                lambda: EncodedResponse.from_value(destinations, destinations, List[Destination])
+            )
+            return cached_json_response(request, encoded)
+        
         return destinations
     except Exception as e:
         logging.error(f"Error getting destinations: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch destinations")
 
+@api_router.get("/destinations/search")
+async def search_destinations(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """Typeahead search over destination names and countries"""
+    return DatabaseManager.search_destinations(q, limit)
+
+@api_router.get("/plans/search")
+async def search_plans(
+    q: str = Query("", max_length=200),
+    activity_type: Optional[str] = Query(None, alias="type", max_length=50, description="Activity type, e.g. sightseeing"),
+    tier: Optional[str] = None,
+    destination: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """Ranked search over plan activities and highlights, with match counts per activity type"""
+    if not q.strip() and not activity_type:
+        raise HTTPException(status_code=400, detail="Provide a query (q) or an activity type")
+    if tier and not budget_field(tier):
+        raise HTTPException(status_code=400, detail=f"Unknown budget tier: {tier}")
+    try:
+        after = decode_cursor(cursor)
+        if after is not None and not (isinstance(after, list) and len(after) == 2 and all(isinstance(value, int) for value in after)):
+            raise ValueError(f"Invalid cursor: {cursor}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = DatabaseManager.search_plans(q, activity_type, tier, destination, limit, tuple(after) if after else None)
+    next_after = result.pop("next_after")
+    return {**result, "next_cursor": encode_cursor(list(next_after)) if next_after else None}
+
 @api_router.get("/destinations/{destination_name}/plans", response_model=TravelPlansResponse)
-async def get_travel_plans(destination_name: str):
+async def get_travel_plans(request: Request, destination_name: str):
     """Get travel plans for a specific destination"""
     try:
         # URL decode the destination name
@@ -49,23 +340,71 @@ async def get_travel_plans(destination_name: str):
         if not travel_plan:
             raise HTTPException(status_code=404, detail=f"Travel plans not found for {destination_name}")
         
-        # Format response according to contract
-        response = TravelPlansResponse(
-            destination=travel_plan.destination_name,
-            plans={
-                "backpacker": travel_plan.backpacker,
-                "travelEnthusiast": travel_plan.travel_enthusiast,
-                "luxury": travel_plan.luxury
-            }
-        )
+        if RESPONSE_CACHE_ENABLED:
+            encoded = get_encoded_response(
+                ("plans", normalize_name(destination_name)),
+                travel_plan,
+                lambda: EncodedResponse.from_model(travel_plan, build_travel_plans_response(travel_plan))
+            )
+            return cached_json_response(request, encoded)
         
-        return response
+        return model_response(build_travel_plans_response(travel_plan))
     except HTTPException:
         raise
     except Exception as e:
         logging.error(f"Error getting travel plans for {destination_name}: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch travel plans")
 
+@api_router.get("/destinations/{destination_name}/plans/{tier}", response_model=BudgetPlan)
+async def get_budget_plan(request: Request, destination_name: str, tier: str):
+    """Get a single budget tier of a destination's travel plans"""
+    try:
+        destination_name = unquote(destination_name)
+        
+        if not budget_field(tier):
+            raise HTTPException(status_code=404, detail=f"Unknown budget tier: {tier}")
+        
+        budget_plan = await DatabaseManager.get_budget_plan(destination_name, tier)
+        
+        if not budget_plan:
+            raise HTTPException(status_code=404, detail=f"Travel plans not found for {destination_name}")
+        
+        if RESPONSE_CACHE_ENABLED:
+            encoded = get_encoded_response(
+                ("plans", normalize_name(destination_name), budget_field(tier)),
+                budget_plan,
+                lambda: EncodedResponse.from_model(budget_plan, budget_plan)
+            )
+            return cached_json_response(request, encoded)
+        
+        return model_response(budget_plan)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting {tier} plan for {destination_name}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch travel plans")
+
+@api_router.get("/destinations/{destination_name}/plans/{tier}/days/{day}", response_model=DayItinerary)
+async def get_plan_day(destination_name: str, tier: str, day: int):
+    """Get a single itinerary day of a budget tier"""
+    try:
+        destination_name = unquote(destination_name)
+        
+        if not budget_field(tier):
+            raise HTTPException(status_code=404, detail=f"Unknown budget tier: {tier}")
+        
+        itinerary_day = await DatabaseManager.get_plan_day(destination_name, tier, day)
+        
+        if not itinerary_day:
+            raise HTTPException(status_code=404, detail=f"Day {day} not found in {tier} plan for {destination_name}")
+        
+        return model_response(itinerary_day)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting day {day} of {tier} plan for {destination_name}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch travel plans")
+
 @api_router.post("/trips", response_model=dict)
 async def create_trip(trip_data: UserTripCreate):
     """Create a new user trip"""
@@ -82,6 +421,51 @@ async def create_trip(trip_data: UserTripCreate):
         logging.error(f"Error creating trip: {e}")
         raise HTTPException(status_code=500, detail="Failed to create trip")
 
+@api_router.post("/trips/batch", response_model=dict)
+async def create_trips_batch(batch: TripBatchCreate):
+    """Create many trips at once; safe to replay since IDs are client-supplied"""
+    try:
+        results = await DatabaseManager.create_user_trips(batch.trips)
+        return {"results": results}
+    except Exception as e:
+        logging.error(f"Error creating trip batch: {e}")
+        raise HTTPException(status_code=500, detail="Failed to create trips")
+
+@api_router.post("/trips/progress/batch", response_model=dict)
+async def sync_trip_progress(batch: ProgressSyncBatch):
+    """Apply queued activity changes for many trips at once"""
+    try:
+        results = await DatabaseManager.sync_trip_progress(batch.updates)
+        return {"results": results}
+    except Exception as e:
+        logging.error(f"Error syncing trip progress: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update trip progress")
+
+@api_router.get("/users/{email}/trips", dependencies=[Depends(require_admin_token)])
+async def get_user_trips(email: str):
+    """A user's trips as NDJSON, newest first"""
+    try:
+        return await ndjson_response(DatabaseManager.iter_user_trips(unquote(email)))
+    except Exception as e:
+        logging.error(f"Error listing trips of user: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch trips")
+
+@api_router.get("/trips/export", dependencies=[Depends(require_admin_token)])
+async def export_trips(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to")
+):
+    """Trips starting between from and to (whole days, both optional) as NDJSON, in start date order"""
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    start = datetime.combine(from_date, time.min) if from_date else None
+    end = datetime.combine(to_date + timedelta(days=1), time.min) if to_date else None
+    try:
+        return await ndjson_response(DatabaseManager.export_trips(start, end))
+    except Exception as e:
+        logging.error(f"Error exporting trips: {e}")
+        raise HTTPException(status_code=500, detail="Failed to export trips")
+
 @api_router.get("/trips/{trip_id}/progress", response_model=TripProgressResponse)
 async def get_trip_progress(trip_id: str):
     """Get user trip progress"""
@@ -91,8 +475,9 @@ async def get_trip_progress(trip_id: str):
         if not user_trip:
             raise HTTPException(status_code=404, detail="Trip not found")
         
+        total_activities = progress_total(user_trip.total_activities, user_trip.completed_activities)
         progress_percentage = await DatabaseManager.calculate_progress_percentage(
-            user_trip.completed_activities
+            user_trip.completed_count, total_activities
         )
         
         response = TripProgressResponse(
@@ -100,16 +485,41 @@ async def get_trip_progress(trip_id: str):
             destination=user_trip.destination,
             selected_budget=user_trip.selected_budget,
             completed_activities=user_trip.completed_activities,
+            completed_count=user_trip.completed_count,
+            total_activities=total_activities,
             progress_percentage=progress_percentage
         )
         
-        return response
+        return model_response(response)
     except HTTPException:
         raise
     except Exception as e:
         logging.error(f"Error getting trip progress: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch trip progress")
 
+@api_router.get("/trips/{trip_id}/itinerary", response_model=TripItinerary)
+async def get_trip_itinerary(
+    trip_id: str,
+    tz: str = Query("UTC", max_length=64, description="Traveler's IANA time zone, e.g. Asia/Tokyo; dates follow its calendar")
+):
+    """Get a trip's itinerary on its own dates, fitted to its length and priced for its travelers"""
+    try:
+        zone = ZoneInfo(tz)
+    except (ValueError, ZoneInfoNotFoundError):
+        raise HTTPException(status_code=400, detail=f"Unknown time zone: {tz}")
+    try:
+        itinerary = await DatabaseManager.get_trip_itinerary(trip_id, zone)
+
+        if not itinerary:
+            raise HTTPException(status_code=404, detail="Trip itinerary not found")
+
+        return model_response(itinerary)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting trip itinerary: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch trip itinerary")
+
 @api_router.put("/trips/{trip_id}/progress", response_model=dict)
 async def update_trip_progress(trip_id: str, progress_update: UserTripUpdate):
     """Update user trip progress"""
@@ -120,7 +530,7 @@ async def update_trip_progress(trip_id: str, progress_update: UserTripUpdate):
             raise HTTPException(status_code=404, detail="Trip not found")
         
         progress_percentage = await DatabaseManager.calculate_progress_percentage(
-            updated_trip.completed_activities
+            updated_trip.completed_count, progress_total(updated_trip.total_activities, updated_trip.completed_activities)
         )
         
         return {
@@ -133,29 +543,169 @@ async def update_trip_progress(trip_id: str, progress_update: UserTripUpdate):
         logging.error(f"Error updating trip progress: {e}")
         raise HTTPException(status_code=500, detail="Failed to update trip progress")
 
-@api_router.get("/trips/shared/{share_token}", response_model=UserTrip)
+@api_router.patch("/trips/{trip_id}/activities", response_model=dict)
+async def update_trip_activities(trip_id: str, delta: ActivityProgressDelta):
+    """Check off or uncheck a batch of activities without resending the whole map"""
+    try:
+        if WRITE_BEHIND_ENABLED:
+            # Acknowledged once buffered; GET /trips/{id}/progress already reflects it
+            if not await DatabaseManager.queue_activity_changes(trip_id, delta):
+                raise HTTPException(status_code=404, detail="Trip not found")
+            return JSONResponse(status_code=202, content={"message": "Progress update queued"})
+        
+        counts = await DatabaseManager.apply_activity_changes(trip_id, delta)
+        
+        if counts is None:
+            raise HTTPException(status_code=404, detail="Trip not found")
+        
+        progress_percentage = await DatabaseManager.counts_progress_percentage(trip_id, counts)
+        
+        return {
+            "message": "Progress updated successfully",
+            "progressPercentage": progress_percentage
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error updating trip activities: {e}")
+        raise HTTPException(status_code=500, detail="Failed to update trip progress")
+
+@api_router.get("/trips/shared/{share_token}", response_model=SharedTrip)
 async def get_shared_trip(share_token: str):
-    """Get a shared trip by token"""
+    """Get the public view of a shared trip by token"""
     try:
-        user_trip = await DatabaseManager.get_user_trip_by_token(share_token)
+        shared_trip = await DatabaseManager.get_shared_trip(share_token)
         
-        if not user_trip:
+        if not shared_trip:
             raise HTTPException(status_code=404, detail="Shared trip not found")
         
-        return user_trip
+        return model_response(shared_trip)
     except HTTPException:
         raise
     except Exception as e:
         logging.error(f"Error getting shared trip: {e}")
         raise HTTPException(status_code=500, detail="Failed to fetch shared trip")
 
+ANALYTICS_DEFAULT_DAYS = 30
+
+def analytics_range(from_date: Optional[date], to_date: Optional[date]) -> tuple:
+    """[start, end) datetimes covering whole days, defaulting to the last 30 days"""
+    to_date = to_date or datetime.utcnow().date()
+    from_date = from_date or to_date - timedelta(days=ANALYTICS_DEFAULT_DAYS - 1)
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    return datetime.combine(from_date, time.min), datetime.combine(to_date + timedelta(days=1), time.min)
+
+async def trip_buckets(from_date: Optional[date], to_date: Optional[date], destination: Optional[str]) -> tuple:
+    start, end = analytics_range(from_date, to_date)
+    buckets, source = await DatabaseManager.get_trip_buckets(start, end, destination)
+    window = {"from": start.date().isoformat(), "to": (end - timedelta(days=1)).date().isoformat(), "source": source}
+    return buckets, window
+
+@api_router.get("/analytics/trips-per-day", response_model=dict)
+async def get_trips_per_day(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    destination: Optional[str] = None
+):
+    """Trips created per destination per day"""
+    try:
+        buckets, window = await trip_buckets(from_date, to_date, destination)
+        return {**window, "items": analytics.trips_per_day(buckets)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting trips per day: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics")
+
+@api_router.get("/analytics/budget-mix", response_model=dict)
+async def get_budget_mix(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    destination: Optional[str] = None
+):
+    """Share of trips per budget tier"""
+    try:
+        buckets, window = await trip_buckets(from_date, to_date, destination)
+        return {**window, "items": analytics.budget_mix(buckets)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting budget mix: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics")
+
+@api_router.get("/analytics/completion", response_model=dict)
+async def get_completion(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    destination: Optional[str] = None
+):
+    """Average completion percentage of trips created in the window, overall and per destination"""
+    try:
+        buckets, window = await trip_buckets(from_date, to_date, destination)
+        return {**window, **analytics.completion_summary(buckets)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting completion analytics: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics")
+
+@api_router.get("/analytics/summary", response_model=dict)
+async def get_analytics_summary(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    destination: Optional[str] = None
+):
+    """Trips per day, budget mix and completion from a single aggregation"""
+    try:
+        buckets, window = await trip_buckets(from_date, to_date, destination)
+        return {
+            **window,
+            "trips_per_day": analytics.trips_per_day(buckets),
+            "budget_mix": analytics.budget_mix(buckets),
+            "completion": analytics.completion_summary(buckets),
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting analytics summary: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics")
+
+@api_router.get("/analytics/skipped-activities", response_model=dict)
+async def get_skipped_activities(destination: Optional[str] = None, limit: int = Query(20, ge=1, le=200)):
+    """Activities most often left unchecked on trips that have ended"""
+    try:
+        return {"items": await DatabaseManager.get_skipped_activities(destination, limit)}
+    except Exception as e:
+        logging.error(f"Error getting skipped activities: {e}")
+        raise HTTPException(status_code=500, detail="Failed to fetch analytics")
+
+@api_router.post("/analytics/rollups/refresh", response_model=dict)
+async def refresh_trip_rollups(full: bool = False):
+    """Recompute the trip rollups now; full=true rebuilds every day instead of the lookback window"""
+    try:
+        return await DatabaseManager.refresh_trip_rollups(full)
+    except Exception as e:
+        logging.error(f"Error refreshing trip rollups: {e}")
+        raise HTTPException(status_code=500, detail="Failed to refresh rollups")
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Catalog cache counters"""
+    return DatabaseManager.cache_stats()
+
+@api_router.get("/db/pool")
+async def get_pool_stats():
+    """Connection pool saturation counters"""
+    return DatabaseManager.pool_stats()
+
 @api_router.post("/seed-database")
 async def seed_database():
     """Seed the database with initial data"""
     try:
         from seed_data import seed_database
-        await seed_database()
-        return {"message": "Database seeded successfully"}
+        report = await seed_database()
+        return {"message": "Database seeded successfully", "report": report}
     except Exception as e:
         logging.error(f"Error seeding database: {e}")
         raise HTTPException(status_code=500, detail="Failed to seed database")
@@ -163,6 +713,12 @@ async def seed_database():
 # Include the router in the main app
 app.include_router(api_router)
 
+if ADMISSION_ENABLED:
+    # Inside the metrics middleware, so shed requests are counted and timed too
+    app.add_middleware(AdmissionMiddleware, controller=admission, routes=app.routes, classify=admission_class)
+
+app.add_middleware(MetricsMiddleware, server_timing=SERVER_TIMING_ENABLED)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -177,7 +733,3 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
@@ -0,0 +1,372 @@
+import os
+import asyncio
+import base64
+import json
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import aiosqlite
+from storage import (
+    INSERT_ONLY_FIELDS,
+    PROGRESS_COUNT_FIELDS,
+    ProgressChanges,
+    Storage,
+    bucket_trips,
+    changed_progress,
+    count_activity_completion,
+    day_key,
+    in_range,
+    project,
+)
+
+SQLITE_PATH = os.environ.get('SQLITE_PATH', str(Path(__file__).parent / 'vacation_planner.db'))
+
+# Trip fields used by the export queries; the indexes below must use the identical expressions
+TRIP_USER_EMAIL = "json_extract(document, '$.user_email')"
+TRIP_CREATED_AT = """json_extract(document, '$.created_at."$date"')"""
+TRIP_START_DATE = """json_extract(document, '$.start_date."$date"')"""
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS destinations (
+    name_key TEXT PRIMARY KEY,
+    id TEXT UNIQUE,
+    country TEXT,
+    popular INTEGER NOT NULL DEFAULT 0,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS destinations_popular ON destinations (popular, name_key);
+CREATE INDEX IF NOT EXISTS destinations_country ON destinations (country, name_key);
+CREATE TABLE IF NOT EXISTS travel_plans (
+    destination_key TEXT PRIMARY KEY,
+    document TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_trips (
+    id TEXT PRIMARY KEY,
+    share_token TEXT UNIQUE,
+    document TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS user_trips_user_email ON user_trips ({TRIP_USER_EMAIL}, {TRIP_CREATED_AT});
+CREATE INDEX IF NOT EXISTS user_trips_start_date ON user_trips ({TRIP_START_DATE});
+CREATE TABLE IF NOT EXISTS trip_rollups (
+    date TEXT NOT NULL,
+    destination TEXT,
+    selected_budget TEXT,
+    document TEXT NOT NULL,
+    PRIMARY KEY (date, destination, selected_budget)
+);
+"""
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    if isinstance(value, bytes):
+        return {"$binary": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Cannot store {type(value).__name__}")
+
+def _decode_object(value: dict):
+    if len(value) == 1 and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    if len(value) == 1 and "$binary" in value:
+        return base64.b64decode(value["$binary"])
+    return value
+
+def encode(document: dict) -> str:
+    return json.dumps(document, default=_encode_value, separators=(",", ":"))
+
+def decode(text: str) -> dict:
+    return json.loads(text, object_hook=_decode_object)
+
+class SQLiteStorage(Storage):
+    """Single-file storage for small deployments: documents as JSON with the lookup keys as indexed columns"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self.connection: Optional[aiosqlite.Connection] = None
+        # Read-modify-write of progress maps must not interleave
+        self._write_lock = asyncio.Lock()
+
+    async def connect(self):
+        if self.connection is not None:
+            return
+        self.connection = await aiosqlite.connect(self.path)
+        await self.connection.execute("PRAGMA journal_mode=WAL")
+        await self.connection.execute("PRAGMA synchronous=NORMAL")
+        await self.connection.executescript(SCHEMA)
+        await self.connection.commit()
+
+    async def close(self):
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def ping(self):
+        await self.connection.execute("SELECT 1")
+
+    async def _fetch_one(self, query: str, parameters=()) -> Optional[dict]:
+        async with self.connection.execute(query, parameters) as cursor:
+            row = await cursor.fetchone()
+        return decode(row[0]) if row else None
+
+    async def _fetch_all(self, query: str, parameters=()) -> List[dict]:
+        async with self.connection.execute(query, parameters) as cursor:
+            return [decode(row[0]) for row in await cursor.fetchall()]
+
+    async def _upsert(self, table: str, key_field: str, columns: Tuple[str, ...], documents: List[dict]) -> int:
+        async with self._write_lock:
+            for document in documents:
+                existing = await self._fetch_one(f"SELECT document FROM {table} WHERE {key_field} = ?", (document[key_field],))
+                if existing is not None:
+                    document = {**existing, **{field: value for field, value in document.items() if field not in INSERT_ONLY_FIELDS}}
+                await self.connection.execute(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}, document) VALUES ({', '.join('?' * (len(columns) + 1))})",
+                    (*self._columns(columns, document), encode(document))
+                )
+            await self.connection.commit()
+        return len(documents)
+
+    @staticmethod
+    def _columns(columns: Tuple[str, ...], document: dict) -> tuple:
+        return tuple(int(bool(document.get(column))) if column == "popular" else document.get(column) for column in columns)
+
+    async def _insert(self, table: str, columns: Tuple[str, ...], document: dict):
+        await self.connection.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}, document) VALUES ({', '.join('?' * (len(columns) + 1))})",
+            (*self._columns(columns, document), encode(document))
+        )
+        await self.connection.commit()
+
+    async def insert_destination(self, document: dict):
+        await self._insert("destinations", ("name_key", "id", "country", "popular"), document)
+
+    async def find_destinations(self, popular_only: bool = False) -> List[dict]:
+        if popular_only:
+            return await self._fetch_all("SELECT document FROM destinations WHERE popular = 1")
+        return await self._fetch_all("SELECT document FROM destinations")
+
+    async def iter_destinations(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        country: Optional[str] = None,
+        popular_only: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[dict]:
+        conditions = []
+        parameters = []
+        if popular_only:
+            conditions.append("popular = 1")
+        if country:
+            conditions.append("country = ?")
+            parameters.append(country)
+        if after is not None:
+            conditions.append("name_key > ?")
+            parameters.append(after)
+        query = "SELECT document FROM destinations"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY name_key"
+        if limit:
+            query += " LIMIT ?"
+            parameters.append(limit)
+
+        async with self.connection.execute(query, parameters) as cursor:
+            async for row in cursor:
+                document = decode(row[0])
+                yield project(document, [*fields, "name_key"]) if fields else document
+
+    async def find_destination(self, name_key: str) -> Optional[dict]:
+        return await self._fetch_one("SELECT document FROM destinations WHERE name_key = ?", (name_key,))
+
+    async def upsert_destinations(self, documents: List[dict]) -> int:
+        return await self._upsert("destinations", "name_key", ("name_key", "id", "country", "popular"), documents)
+
+    async def insert_travel_plan(self, document: dict):
+        await self._insert("travel_plans", ("destination_key",), document)
+
+    async def find_travel_plan(self, destination_key: str) -> Optional[dict]:
+        return await self._fetch_one("SELECT document FROM travel_plans WHERE destination_key = ?", (destination_key,))
+
+    async def find_travel_plans(self, destination_keys: List[str]) -> Dict[str, dict]:
+        placeholders = ", ".join("?" * len(destination_keys))
+        return {
+            plan["destination_key"]: plan
+            for plan in await self._fetch_all(f"SELECT document FROM travel_plans WHERE destination_key IN ({placeholders})", destination_keys)
+        }
+
+    async def find_budget_plan(self, destination_key: str, field: str) -> Optional[dict]:
+        plan = await self.find_travel_plan(destination_key)
+        return plan.get(field) if plan else None
+
+    async def find_plan_day(self, destination_key: str, field: str, day: int) -> Optional[dict]:
+        budget_plan = await self.find_budget_plan(destination_key, field)
+        if not budget_plan:
+            return None
+        return next((itinerary_day for itinerary_day in budget_plan.get("itinerary", []) if itinerary_day.get("day") == day), None)
+
+    def iter_travel_plans(self, batch_size: int) -> AsyncIterator[dict]:
+        return self._iter_documents("SELECT document FROM travel_plans", (), None, batch_size)
+
+    async def upsert_travel_plans(self, documents: List[dict]) -> int:
+        return await self._upsert("travel_plans", "destination_key", ("destination_key",), documents)
+
+    async def insert_user_trip(self, document: dict):
+        await self._insert("user_trips", ("id", "share_token"), document)
+
+    async def insert_user_trips(self, documents: List[dict]) -> Tuple[Dict[str, Optional[str]], Dict[int, str]]:
+        errors = {}
+        async with self._write_lock:
+            for index, document in enumerate(documents):
+                try:
+                    await self.connection.execute(
+                        "INSERT INTO user_trips (id, share_token, document) VALUES (?, ?, ?) ON CONFLICT (id) DO NOTHING",
+                        (document["id"], document.get("share_token"), encode(document))
+                    )
+                except aiosqlite.IntegrityError as e:
+                    errors[index] = str(e)
+            await self.connection.commit()
+
+        trip_ids = [document["id"] for document in documents]
+        placeholders = ", ".join("?" * len(trip_ids))
+        async with self.connection.execute(f"SELECT id, share_token FROM user_trips WHERE id IN ({placeholders})", trip_ids) as cursor:
+            stored = {trip_id: share_token for trip_id, share_token in await cursor.fetchall()}
+        return stored, errors
+
+    async def find_user_trip(self, trip_id: str) -> Optional[dict]:
+        return await self._fetch_one("SELECT document FROM user_trips WHERE id = ?", (trip_id,))
+
+    async def find_user_trip_by_token(self, share_token: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[dict]:
+        trip = await self._fetch_one("SELECT document FROM user_trips WHERE share_token = ?", (share_token,))
+        if trip is None:
+            return None
+        return project(trip, fields) if fields else trip
+
+    async def _iter_documents(self, query: str, parameters, fields: Optional[Tuple[str, ...]], batch_size: int) -> AsyncIterator[dict]:
+        async with self.connection.execute(query, parameters) as cursor:
+            cursor.iter_chunk_size = batch_size
+            async for row in cursor:
+                document = decode(row[0])
+                yield project(document, fields) if fields else document
+
+    def iter_user_trips_by_email(self, user_email: str, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[dict]:
+        return self._iter_documents(
+            f"SELECT document FROM user_trips WHERE {TRIP_USER_EMAIL} = ? ORDER BY {TRIP_CREATED_AT} DESC",
+            (user_email,),
+            fields,
+            batch_size
+        )
+
+    def iter_user_trips_by_start(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        fields: Tuple[str, ...],
+        batch_size: int
+    ) -> AsyncIterator[dict]:
+        # ISO timestamps compare correctly as text
+        conditions = [f"{TRIP_START_DATE} IS NOT NULL"]
+        parameters = []
+        if start is not None:
+            conditions.append(f"{TRIP_START_DATE} >= ?")
+            parameters.append(start.isoformat())
+        if end is not None:
+            conditions.append(f"{TRIP_START_DATE} < ?")
+            parameters.append(end.isoformat())
+        return self._iter_documents(
+            f"SELECT document FROM user_trips WHERE {' AND '.join(conditions)} ORDER BY {TRIP_START_DATE}",
+            parameters,
+            fields,
+            batch_size
+        )
+
+    async def _save_user_trip(self, trip: dict):
+        await self.connection.execute("UPDATE user_trips SET document = ? WHERE id = ?", (encode(trip), trip["id"]))
+
+    async def set_trip_progress(self, trip_id: str, progress: dict) -> Optional[dict]:
+        async with self._write_lock:
+            trip = await self.find_user_trip(trip_id)
+            if trip is None:
+                return None
+            trip.update(progress)
+            await self._save_user_trip(trip)
+            await self.connection.commit()
+        return trip
+
+    async def find_progress_counts(self, trip_ids: List[str]) -> Dict[str, dict]:
+        placeholders = ", ".join("?" * len(trip_ids))
+        return {
+            trip["id"]: project(trip, PROGRESS_COUNT_FIELDS)
+            for trip in await self._fetch_all(f"SELECT document FROM user_trips WHERE id IN ({placeholders})", trip_ids)
+        }
+
+    async def _apply_changes(self, trip_id: str, changes: ProgressChanges) -> Optional[dict]:
+        trip = await self.find_user_trip(trip_id)
+        if trip is None:
+            return None
+        trip.update(changed_progress(trip, changes))
+        await self._save_user_trip(trip)
+        return project(trip, PROGRESS_COUNT_FIELDS)
+
+    async def apply_activity_changes(self, trip_id: str, changes: ProgressChanges) -> Optional[dict]:
+        async with self._write_lock:
+            counts = await self._apply_changes(trip_id, changes)
+            await self.connection.commit()
+        return counts
+
+    async def apply_progress_changes(self, updates: List[Tuple[str, ProgressChanges]]):
+        async with self._write_lock:
+            for trip_id, changes in updates:
+                await self._apply_changes(trip_id, changes)
+            await self.connection.commit()
+
+    async def _iter_trips(self, destination: Optional[str]) -> AsyncIterator[dict]:
+        # Trip fields live in the JSON document; small deployments can afford the scan
+        async with self.connection.execute("SELECT document FROM user_trips") as cursor:
+            async for row in cursor:
+                trip = decode(row[0])
+                if not destination or trip.get("destination") == destination:
+                    yield trip
+
+    async def aggregate_trip_buckets(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        return bucket_trips([trip async for trip in self._iter_trips(destination) if in_range(trip.get("created_at"), start, end)])
+
+    async def aggregate_activity_completion(self, ended_before: datetime, destination: Optional[str] = None) -> dict:
+        return count_activity_completion([
+            trip async for trip in self._iter_trips(destination) if in_range(trip.get("end_date"), None, ended_before)
+        ])
+
+    async def save_trip_rollups(self, buckets: List[dict]):
+        async with self._write_lock:
+            await self.connection.executemany(
+                "INSERT OR REPLACE INTO trip_rollups (date, destination, selected_budget, document) VALUES (?, ?, ?, ?)",
+                [(bucket["date"], bucket["destination"], bucket["selected_budget"], encode(bucket)) for bucket in buckets]
+            )
+            await self.connection.commit()
+
+    async def find_trip_rollups(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        conditions = []
+        parameters = []
+        if start is not None:
+            conditions.append("date >= ?")
+            parameters.append(day_key(start))
+        if end is not None:
+            conditions.append("date < ?")
+            parameters.append(day_key(end))
+        if destination:
+            conditions.append("destination = ?")
+            parameters.append(destination)
+        query = "SELECT document FROM trip_rollups"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        return await self._fetch_all(query, parameters)
@@ -0,0 +1,269 @@
+import os
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+from models import utc_naive
+from progress_encoding import completed_ids, count_bits, set_bits
+
+# Kept from the first write when a document is upserted again
+INSERT_ONLY_FIELDS = ("id", "created_at")
+
+PROGRESS_COUNT_FIELDS = ("completed_count", "total_activities", "share_token")
+
+# Progress changes are keyed like the trip stores them: completed_activities keys,
+# or activity ids for trips stored with completed_bits (see progress_encoding)
+ProgressChanges = Dict[Union[str, int], bool]
+
+def project(document: dict, fields) -> dict:
+    """Subset of a document, skipping fields it does not have"""
+    return {field: document[field] for field in fields if field in document}
+
+def apply_changes(completed_activities: Dict[str, bool], completed_count: int, changes: Dict[str, bool]) -> Tuple[Dict[str, bool], int]:
+    """New progress map and count after setting activities; unchanged activities don't move the count"""
+    updated = dict(completed_activities)
+    for key, completed in changes.items():
+        was_completed = updated.get(key) is True
+        if completed and not was_completed:
+            updated[key] = True
+            completed_count += 1
+        elif not completed and was_completed:
+            updated[key] = False
+            completed_count -= 1
+    return updated, completed_count
+
+def changed_progress(trip: dict, changes: ProgressChanges) -> dict:
+    """Progress fields of a stored trip after changes; keys that don't match its encoding are ignored"""
+    if "completed_bits" in trip:
+        completed_bits = set_bits(
+            trip["completed_bits"], {key: completed for key, completed in changes.items() if isinstance(key, int)}
+        )
+        return {"completed_bits": completed_bits, "completed_count": count_bits(completed_bits)}
+    completed_activities, completed_count = apply_changes(
+        trip.get("completed_activities") or {}, trip.get("completed_count", 0),
+        {key: completed for key, completed in changes.items() if isinstance(key, str)}
+    )
+    return {"completed_activities": completed_activities, "completed_count": completed_count}
+
+# Trip analytics are grouped by creation day (UTC, YYYY-MM-DD), destination and budget tier
+TRIP_BUCKET_KEY = ("date", "destination", "selected_budget")
+
+def day_key(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d")
+
+def progress_total(total_activities: int, completed_activities: Optional[Dict[str, bool]]) -> int:
+    """Denominator of a trip's progress: its plan's activity count, or for a trip whose
+    destination has no plan (total_activities 0) the keys of its progress map"""
+    return total_activities or len(completed_activities or {})
+
+def completion_fraction(completed_count: int, total_activities: int) -> float:
+    return min(completed_count / total_activities, 1.0) if total_activities > 0 else 0.0
+
+def in_range(value: Optional[datetime], start: Optional[datetime], end: Optional[datetime]) -> bool:
+    if value is None:
+        return start is None and end is None
+    # Trips stored before dates were normalized on write may still carry an offset
+    value = utc_naive(value)
+    return (start is None or value >= start) and (end is None or value < end)
+
+def bucket_trips(trips: Iterable[dict]) -> List[dict]:
+    """Python equivalent of the Mongo trip bucket $group, for backends without aggregation pipelines"""
+    buckets = {}
+    for trip in trips:
+        key = (day_key(trip["created_at"]), trip.get("destination"), trip.get("selected_budget"))
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = buckets[key] = {**dict(zip(TRIP_BUCKET_KEY, key)), "trips": 0, "completion_sum": 0.0, "completed_trips": 0}
+        fraction = completion_fraction(
+            trip.get("completed_count", 0), progress_total(trip.get("total_activities", 0), trip.get("completed_activities"))
+        )
+        bucket["trips"] += 1
+        bucket["completion_sum"] += fraction
+        bucket["completed_trips"] += fraction >= 1.0
+    return list(buckets.values())
+
+def count_activity_completion(trips: Iterable[dict]) -> dict:
+    """Python equivalent of the Mongo activity completion $facet"""
+    trip_counts = defaultdict(int)
+    completed = defaultdict(int)
+    for trip in trips:
+        plan = (trip.get("destination"), trip.get("selected_budget"))
+        trip_counts[plan] += 1
+        for key, done in (trip.get("completed_activities") or {}).items():
+            if done is True:
+                completed[(*plan, key)] += 1
+        for activity_id in completed_ids(trip.get("completed_bits") or b""):
+            completed[(*plan, activity_id)] += 1
+    return {
+        "trips": [
+            {"destination": destination, "selected_budget": selected_budget, "trips": trips}
+            for (destination, selected_budget), trips in trip_counts.items()
+        ],
+        "completed": [
+            {"destination": destination, "selected_budget": selected_budget, "key": key, "completed": count}
+            for (destination, selected_budget, key), count in completed.items()
+        ],
+    }
+
+class Storage(ABC):
+    """Persistence for destinations, travel plans and user trips, as plain documents
+
+    Implementations only store and fetch; caching, coalescing and the search
+    index live in DatabaseManager on top of whichever backend is selected.
+    """
+
+    name = "storage"
+
+    async def connect(self):
+        """Create indexes/tables and open connections"""
+
+    async def close(self):
+        """Release connections"""
+
+    async def ping(self):
+        """Raise if the backend cannot serve queries"""
+
+    def pool_stats(self) -> Dict[str, float]:
+        """Connection pool saturation counters, where the backend has a pool"""
+        return {}
+
+    @abstractmethod
+    async def insert_destination(self, document: dict):
+        ...
+
+    @abstractmethod
+    async def find_destinations(self, popular_only: bool = False) -> List[dict]:
+        ...
+
+    @abstractmethod
+    def iter_destinations(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        country: Optional[str] = None,
+        popular_only: bool = False,
+        fields: Optional[List[str]] = None
+    ) -> AsyncIterator[dict]:
+        """Destinations ordered by name_key, after a keyset cursor; fields always include name_key"""
+
+    @abstractmethod
+    async def find_destination(self, name_key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def upsert_destinations(self, documents: List[dict]) -> int:
+        """Insert or update by name_key, keeping INSERT_ONLY_FIELDS of existing documents"""
+
+    @abstractmethod
+    async def insert_travel_plan(self, document: dict):
+        ...
+
+    @abstractmethod
+    async def find_travel_plan(self, destination_key: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_travel_plans(self, destination_keys: List[str]) -> Dict[str, dict]:
+        """Stored travel plans among destination_keys, by destination_key, in one query"""
+
+    @abstractmethod
+    async def find_budget_plan(self, destination_key: str, field: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_plan_day(self, destination_key: str, field: str, day: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def iter_travel_plans(self, batch_size: int) -> AsyncIterator[dict]:
+        """Every travel plan, fetched batch_size at a time"""
+
+    @abstractmethod
+    async def upsert_travel_plans(self, documents: List[dict]) -> int:
+        """Insert or update by destination_key, keeping INSERT_ONLY_FIELDS of existing documents"""
+
+    @abstractmethod
+    async def insert_user_trip(self, document: dict):
+        ...
+
+    @abstractmethod
+    async def insert_user_trips(self, documents: List[dict]) -> Tuple[Dict[str, Optional[str]], Dict[int, str]]:
+        """Insert trips whose id is not stored yet; returns share tokens of all stored ids and errors by index"""
+
+    @abstractmethod
+    async def find_user_trip(self, trip_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def find_user_trip_by_token(self, share_token: str, fields: Optional[Tuple[str, ...]] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def iter_user_trips_by_email(self, user_email: str, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[dict]:
+        """A user's trips, newest first, fetched batch_size at a time"""
+
+    @abstractmethod
+    def iter_user_trips_by_start(
+        self,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        fields: Tuple[str, ...],
+        batch_size: int
+    ) -> AsyncIterator[dict]:
+        """Trips with start_date in [start, end), in start_date order, fetched batch_size at a time"""
+
+    @abstractmethod
+    async def set_trip_progress(self, trip_id: str, progress: dict) -> Optional[dict]:
+        """Replace the progress fields (completed_count and the map or bitset); returns the updated trip"""
+
+    @abstractmethod
+    async def find_progress_counts(self, trip_ids: List[str]) -> Dict[str, dict]:
+        """PROGRESS_COUNT_FIELDS of each stored trip, by id"""
+
+    @abstractmethod
+    async def apply_activity_changes(self, trip_id: str, changes: ProgressChanges) -> Optional[dict]:
+        """Set activities of one trip, adjusting completed_count; returns its PROGRESS_COUNT_FIELDS"""
+
+    @abstractmethod
+    async def apply_progress_changes(self, updates: List[Tuple[str, ProgressChanges]]):
+        """Apply changes for many trips in order; unknown trips are ignored"""
+
+    @abstractmethod
+    async def aggregate_trip_buckets(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        """Trips created in [start, end) per TRIP_BUCKET_KEY, with trips, completion_sum and completed_trips"""
+
+    @abstractmethod
+    async def aggregate_activity_completion(self, ended_before: datetime, destination: Optional[str] = None) -> dict:
+        """For trips that ended: {"trips": counts per destination/tier, "completed": counts per activity key or id}"""
+
+    @abstractmethod
+    async def save_trip_rollups(self, buckets: List[dict]):
+        """Replace the materialized buckets with these recomputed ones"""
+
+    @abstractmethod
+    async def find_trip_rollups(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        destination: Optional[str] = None
+    ) -> List[dict]:
+        """Materialized buckets for creation days in [start, end)"""
+
+def create_storage(backend: Optional[str] = None) -> Storage:
+    """Build the configured backend; only its own driver gets imported"""
+    backend = (backend or os.environ.get('STORAGE_BACKEND', 'mongo')).lower()
+    if backend == "mongo":
+        from mongo_storage import MongoStorage
+        return MongoStorage()
+    if backend == "memory":
+        from memory_storage import MemoryStorage
+        return MemoryStorage()
+    if backend == "sqlite":
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage()
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}; expected mongo, memory or sqlite")
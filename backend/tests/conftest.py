@@ -0,0 +1,81 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Exports are disabled without an admin token; anything left unconfigured stays offline
+os.environ["ADMIN_TOKEN"] = "test-admin-token"
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.testclient import TestClient
+
+import database
+import server
+from memory_storage import MemoryStorage
+from storage import Storage
+
+ADMIN_HEADERS = {"X-Admin-Token": "test-admin-token"}
+
+# Every backend runs offline: Mongo through mongomock, SQLite in a temporary file
+BACKENDS = ("memory", "sqlite", "mongomock")
+
+def make_storage(backend: str, tmp_path: Path) -> Storage:
+    if backend == "sqlite":
+        from sqlite_storage import SQLiteStorage
+        return SQLiteStorage(path=str(tmp_path / "test.db"))
+    if backend == "mongomock":
+        from mongomock_motor import AsyncMongoMockClient
+        from mongo_storage import MongoStorage
+        return MongoStorage(db=AsyncMongoMockClient()["test"])
+    return MemoryStorage()
+
+def clear_caches():
+    for cache in (
+        database.destinations_cache,
+        database.travel_plans_cache,
+        database.shared_trips_cache,
+        database.known_trips_cache,
+        database.bitset_trips_cache,
+        database.itinerary_templates_cache,
+        server.encoded_responses_cache,
+    ):
+        cache.clear()
+
+@pytest.fixture(params=BACKENDS)
+def storage(request, tmp_path) -> Storage:
+    return make_storage(request.param, tmp_path)
+
+@pytest.fixture
+def client(storage):
+    """The app on a fresh, empty backend; the lifespan connects it and loads the search indexes"""
+    clear_caches()
+    database.storage = storage
+    with TestClient(server.app) as test_client:
+        yield test_client
+    database.storage = None
+
+@pytest.fixture
+def seeded_client(client):
+    response = client.post("/api/seed-database")
+    assert response.status_code == 200
+    return client
+
+def trip_payload(**overrides) -> dict:
+    payload = {
+        "destination": "Paris, France",
+        "start_date": "2026-03-01T23:30:00Z",
+        "end_date": "2026-03-04T10:00:00Z",
+        "travelers": 2,
+        "selected_budget": "backpacker",
+        "user_email": "traveler@example.com",
+    }
+    payload.update(overrides)
+    return payload
+
+def create_trip(client, **overrides) -> dict:
+    response = client.post("/api/trips", json=trip_payload(**overrides))
+    assert response.status_code == 200
+    return response.json()
@@ -0,0 +1,23 @@
+from conftest import create_trip
+
+PARIS = "Paris, France"
+
+def test_analytics_summary(seeded_client):
+    trip = create_trip(seeded_client)
+    seeded_client.patch(f"/api/trips/{trip['tripId']}/activities", json={"changes": {"0-0": True}})
+    summary = seeded_client.get("/api/analytics/summary").json()
+    assert summary["source"] == "live"
+    assert summary["trips_per_day"][0]["destination"] == PARIS
+    assert summary["budget_mix"] == [{"selected_budget": "backpacker", "trips": 1, "share": 1.0}]
+    assert summary["completion"]["trips"] == 1
+    assert seeded_client.get("/api/analytics/summary", params={"from": "2026-02-02", "to": "2026-02-01"}).status_code == 400
+
+def test_skipped_activities_with_aware_dates(seeded_client):
+    # Ended trips, created with offset timestamps, are compared against naive UTC bounds
+    trip = create_trip(seeded_client, start_date="2020-01-01T09:00:00+09:00", end_date="2020-01-03T09:00:00+09:00")
+    seeded_client.patch(f"/api/trips/{trip['tripId']}/activities", json={"changes": {"0-0": True}})
+    response = seeded_client.get("/api/analytics/skipped-activities", params={"destination": PARIS})
+    assert response.status_code == 200
+    skipped = {item["key"]: item["skipped"] for item in response.json()["items"]}
+    assert skipped["0-1"] == 1
+    assert skipped.get("0-0", 0) == 0
@@ -0,0 +1,36 @@
+from conftest import create_trip, trip_payload
+
+def test_trip_batch_is_idempotent(seeded_client):
+    trips = [{**trip_payload(), "id": f"offline-{index}"} for index in range(3)]
+    first = seeded_client.post("/api/trips/batch", json={"trips": trips})
+    assert first.status_code == 200
+    assert [result["status"] for result in first.json()["results"]] == ["created"] * 3
+
+    # Replaying the queue reports the stored trips, with their original share tokens
+    replay = seeded_client.post("/api/trips/batch", json={"trips": trips})
+    assert replay.status_code == 200
+    assert [result["status"] for result in replay.json()["results"]] == ["exists"] * 3
+    assert [result["shareToken"] for result in replay.json()["results"]] == [
+        result["shareToken"] for result in first.json()["results"]
+    ]
+    for index in range(3):
+        assert seeded_client.get(f"/api/trips/offline-{index}/progress").status_code == 200
+
+def test_batch_limits(seeded_client):
+    assert seeded_client.post("/api/trips/batch", json={"trips": []}).status_code == 422
+    assert seeded_client.post("/api/trips/progress/batch", json={"updates": []}).status_code == 422
+
+def test_progress_batch_applies_in_order(seeded_client):
+    trip = create_trip(seeded_client)
+    response = seeded_client.post("/api/trips/progress/batch", json={"updates": [
+        {"trip_id": trip["tripId"], "changes": {"0-0": True}},
+        {"trip_id": trip["tripId"], "changes": {"0-0": False, "0-2": True}},
+        {"trip_id": "missing", "changes": {"0-0": True}},
+    ]})
+    assert response.status_code == 200
+    statuses = {result["tripId"]: result["status"] for result in response.json()["results"]}
+    assert statuses == {trip["tripId"]: "updated", "missing": "not_found"}
+    progress = seeded_client.get(f"/api/trips/{trip['tripId']}/progress").json()
+    assert progress["completed_count"] == 1
+    assert progress["completed_activities"].get("0-0", False) is False
+    assert progress["completed_activities"]["0-2"] is True
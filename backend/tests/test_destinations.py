@@ -0,0 +1,49 @@
+def list_page(client, **params) -> dict:
+    response = client.get("/api/destinations", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def test_pages_follow_the_cursor(seeded_client):
+    everything = seeded_client.get("/api/destinations").json()
+    names, cursor = [], None
+    while True:
+        page = list_page(seeded_client, limit=2, **({"cursor": cursor} if cursor else {}))
+        assert len(page["items"]) <= 2
+        names += [item["name"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert names == sorted(destination["name"] for destination in everything)
+
+def test_pages_repeat_identically(seeded_client):
+    # Streaming a page must not change the stored documents the next page reads
+    first = list_page(seeded_client, limit=2)
+    assert list_page(seeded_client, limit=2) == first
+    assert first["next_cursor"] is not None
+    assert "name_key" not in first["items"][0]
+    following = list_page(seeded_client, limit=2, cursor=first["next_cursor"])
+    assert following["items"][0]["name"] > first["items"][-1]["name"]
+
+def test_filters_and_fields(seeded_client):
+    page = list_page(seeded_client, fields="name,country", country="France")
+    assert page["items"] == [{"name": "Paris, France", "country": "France"}]
+    assert page["next_cursor"] is None
+    assert list_page(seeded_client, country="Atlantis") == {"items": [], "next_cursor": None}
+
+def test_bad_queries_are_rejected(seeded_client):
+    assert seeded_client.get("/api/destinations", params={"cursor": "not-a-cursor"}).status_code == 400
+    # Decodes, but not to a name
+    assert seeded_client.get("/api/destinations", params={"cursor": "MTIz"}).status_code == 400
+    assert seeded_client.get("/api/destinations", params={"fields": "name,secret"}).status_code == 400
+    assert seeded_client.get("/api/destinations", params={"limit": 0}).status_code == 422
+
+def test_list_revalidates_with_etag(seeded_client):
+    response = seeded_client.get("/api/destinations")
+    revalidated = seeded_client.get("/api/destinations", headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+
+def test_openapi_documents_both_shapes(client):
+    schema = client.get("/openapi.json").json()
+    response = schema["paths"]["/api/destinations"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert {"$ref": "#/components/schemas/DestinationPage"} in response["anyOf"]
+    assert set(schema["components"]["schemas"]["DestinationPage"]["properties"]) == {"items", "next_cursor"}
@@ -0,0 +1,36 @@
+import json
+
+import server
+from conftest import ADMIN_HEADERS, create_trip
+
+def read_ndjson(response) -> list:
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+def test_exports_require_admin_token(seeded_client, monkeypatch):
+    create_trip(seeded_client)
+    assert seeded_client.get("/api/trips/export").status_code == 403
+    assert seeded_client.get("/api/trips/export", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert seeded_client.get("/api/users/traveler@example.com/trips").status_code == 403
+    # Without a configured token the routes do not exist
+    monkeypatch.setattr(server, "ADMIN_TOKEN", "")
+    assert seeded_client.get("/api/trips/export", headers=ADMIN_HEADERS).status_code == 404
+
+def test_exports_filter_by_start_date(seeded_client):
+    create_trip(seeded_client)
+    create_trip(seeded_client, start_date="2026-05-01T10:00:00+02:00", end_date="2026-05-03T10:00:00+02:00")
+    response = seeded_client.get("/api/trips/export", params={"from": "2026-04-01"}, headers=ADMIN_HEADERS)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == server.NDJSON_MEDIA_TYPE
+    assert [trip["start_date"] for trip in read_ndjson(response)] == ["2026-05-01T08:00:00"]
+    assert seeded_client.get(
+        "/api/trips/export", params={"from": "2026-04-02", "to": "2026-04-01"}, headers=ADMIN_HEADERS
+    ).status_code == 400
+
+def test_exports_by_user(seeded_client):
+    create_trip(seeded_client)
+    create_trip(seeded_client, start_date="2026-05-01T10:00:00+02:00", end_date="2026-05-03T10:00:00+02:00")
+    create_trip(seeded_client, user_email="someone@example.com")
+    trips = read_ndjson(seeded_client.get("/api/users/traveler@example.com/trips", headers=ADMIN_HEADERS))
+    assert len(trips) == 2
+    assert {trip["user_email"] for trip in trips} == {"traveler@example.com"}
+    assert read_ndjson(seeded_client.get("/api/users/nobody@example.com/trips", headers=ADMIN_HEADERS)) == []
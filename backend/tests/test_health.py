@@ -0,0 +1,19 @@
+def test_health_endpoints(client):
+    assert client.get("/api/health/live").status_code == 200
+    assert client.get("/api/health/ready").status_code == 200
+    assert client.get("/api/health").status_code == 200
+
+def test_seed_report(client):
+    report = client.post("/api/seed-database").json()["report"]
+    assert report["destinations"] > 0
+    assert report["travel_plans"] > 0
+    # Seeding again updates in place
+    assert client.post("/api/seed-database").json()["report"]["destinations"] == report["destinations"]
+    assert len(client.get("/api/destinations").json()) == report["destinations"]
+
+def test_metrics_exposition(seeded_client):
+    seeded_client.get("/api/destinations")
+    response = seeded_client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+    assert "app_admission_admitted_total" in response.text
@@ -0,0 +1,30 @@
+from conftest import create_trip, trip_payload
+
+def test_itinerary_follows_traveler_calendar(seeded_client):
+    # 2026-03-01T23:30Z to 2026-03-04T10:00Z
+    trip = create_trip(seeded_client)
+    utc = seeded_client.get(f"/api/trips/{trip['tripId']}/itinerary").json()
+    assert (utc["start_date"], utc["end_date"]) == ("2026-03-01", "2026-03-04")
+    assert [day["date"] for day in utc["days"]] == ["2026-03-01", "2026-03-02", "2026-03-03", "2026-03-04"]
+    assert utc["travelers"] == 2
+
+    tokyo = seeded_client.get(f"/api/trips/{trip['tripId']}/itinerary", params={"tz": "Asia/Tokyo"}).json()
+    assert (tokyo["start_date"], tokyo["end_date"]) == ("2026-03-02", "2026-03-04")
+    assert len(tokyo["days"]) == 3
+
+def test_itinerary_days_keep_plan_keys(seeded_client):
+    trip = create_trip(seeded_client)
+    itinerary = seeded_client.get(f"/api/trips/{trip['tripId']}/itinerary").json()
+    plan = seeded_client.get("/api/destinations/Paris, France/plans/backpacker").json()
+    first = itinerary["days"][0]
+    assert first["plan_day_index"] == 0
+    assert [activity["task"] for activity in first["activities"]] == [
+        activity["task"] for activity in plan["itinerary"][0]["activities"]
+    ]
+
+def test_itinerary_errors(seeded_client):
+    trip = create_trip(seeded_client)
+    assert seeded_client.get(f"/api/trips/{trip['tripId']}/itinerary", params={"tz": "Mars/Base"}).status_code == 400
+    assert seeded_client.get("/api/trips/missing/itinerary").status_code == 404
+    # Per-person pricing needs someone to travel
+    assert seeded_client.post("/api/trips", json=trip_payload(travelers=0)).status_code == 422
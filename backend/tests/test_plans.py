@@ -0,0 +1,28 @@
+from urllib.parse import quote
+
+PARIS = quote("Paris, France")
+
+def test_full_plans(seeded_client):
+    body = seeded_client.get(f"/api/destinations/{PARIS}/plans").json()
+    assert set(body["plans"]) == {"backpacker", "travelEnthusiast", "luxury"}
+    # Lookups ignore case and spacing
+    assert seeded_client.get(f"/api/destinations/{quote('  paris,   FRANCE ')}/plans").json() == body
+
+def test_tier_and_day(seeded_client):
+    plans = seeded_client.get(f"/api/destinations/{PARIS}/plans").json()["plans"]
+    tier = seeded_client.get(f"/api/destinations/{PARIS}/plans/travelEnthusiast")
+    assert tier.status_code == 200
+    assert tier.json() == plans["travelEnthusiast"]
+    # Field names work as well as API tier names
+    assert seeded_client.get(f"/api/destinations/{PARIS}/plans/travel_enthusiast").json() == tier.json()
+
+    day = seeded_client.get(f"/api/destinations/{PARIS}/plans/backpacker/days/2")
+    assert day.status_code == 200
+    assert day.json() == plans["backpacker"]["itinerary"][1]
+
+def test_missing_plans_return_404(seeded_client):
+    assert seeded_client.get(f"/api/destinations/{PARIS}/plans/gold").status_code == 404
+    assert seeded_client.get(f"/api/destinations/{PARIS}/plans/backpacker/days/99").status_code == 404
+    # Seeded without a travel plan
+    assert seeded_client.get(f"/api/destinations/{quote('Bali, Indonesia')}/plans").status_code == 404
+    assert seeded_client.get(f"/api/destinations/{quote('Bali, Indonesia')}/plans/backpacker").status_code == 404
@@ -0,0 +1,59 @@
+from conftest import create_trip
+
+def patch_activities(client, trip_id: str, changes: dict):
+    return client.patch(f"/api/trips/{trip_id}/activities", json={"changes": changes})
+
+def test_patch_sets_only_changed_activities(seeded_client):
+    trip_id = create_trip(seeded_client)["tripId"]
+    progress = seeded_client.get(f"/api/trips/{trip_id}/progress").json()
+    assert progress["completed_count"] == 0
+    assert progress["total_activities"] > 0
+
+    patched = patch_activities(seeded_client, trip_id, {"0-0": True, "0-1": True})
+    assert patched.status_code == 200
+    assert patched.json()["progressPercentage"] > 0
+    assert patch_activities(seeded_client, trip_id, {"0-1": False}).status_code == 200
+    # Checking an already checked activity does not count it again
+    assert patch_activities(seeded_client, trip_id, {"0-0": True}).status_code == 200
+
+    progress = seeded_client.get(f"/api/trips/{trip_id}/progress").json()
+    assert progress["completed_count"] == 1
+    assert progress["completed_activities"]["0-0"] is True
+    assert progress["completed_activities"].get("0-1") is not True
+
+def test_put_replaces_progress(seeded_client):
+    trip_id = create_trip(seeded_client)["tripId"]
+    patch_activities(seeded_client, trip_id, {"0-0": True})
+    replaced = seeded_client.put(f"/api/trips/{trip_id}/progress", json={"completed_activities": {"0-1": True, "0-2": True}})
+    assert replaced.status_code == 200
+
+    progress = seeded_client.get(f"/api/trips/{trip_id}/progress").json()
+    assert progress["completed_count"] == 2
+    assert progress["completed_activities"] == {"0-1": True, "0-2": True}
+
+def test_unknown_trip_returns_404(seeded_client):
+    assert seeded_client.get("/api/trips/missing/progress").status_code == 404
+    assert patch_activities(seeded_client, "missing", {"0-0": True}).status_code == 404
+    assert seeded_client.put("/api/trips/missing/progress", json={"completed_activities": {}}).status_code == 404
+
+def test_empty_patch_is_rejected(seeded_client):
+    trip_id = create_trip(seeded_client)["tripId"]
+    assert patch_activities(seeded_client, trip_id, {}).status_code == 422
+
+def test_counters_follow_progress(seeded_client):
+    trip_id = create_trip(seeded_client)["tripId"]
+    total = seeded_client.get(f"/api/trips/{trip_id}/progress").json()["total_activities"]
+    patched = patch_activities(seeded_client, trip_id, {f"0-{index}": True for index in range(3)})
+    assert patched.json()["progressPercentage"] == round(3 / total * 100, 1)
+
+def test_trip_without_plan_counts_its_progress_keys(seeded_client):
+    # Seeded without travel plans, so the trip has no activity total
+    trip_id = create_trip(seeded_client, destination="Bali, Indonesia")["tripId"]
+    patched = patch_activities(seeded_client, trip_id, {"0-0": True})
+    assert patched.json()["progressPercentage"] == 100.0
+    replaced = seeded_client.put(f"/api/trips/{trip_id}/progress", json={"completed_activities": {"0-0": True, "0-1": False}})
+    assert replaced.json()["progressPercentage"] == 50.0
+
+    progress = seeded_client.get(f"/api/trips/{trip_id}/progress").json()
+    assert progress["total_activities"] == 2
+    assert progress["progress_percentage"] == 50.0
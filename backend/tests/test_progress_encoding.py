@@ -0,0 +1,53 @@
+import asyncio
+
+import database
+from conftest import create_trip
+
+def stored_trip(trip_id: str) -> dict:
+    return asyncio.run(database.storage.find_user_trip(trip_id))
+
+class CountingReads:
+    """Storage proxy recording the trips DatabaseManager reads; a backend's own reads are not counted"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.reads = []
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    async def find_user_trip(self, trip_id):
+        self.reads.append(trip_id)
+        return await self.storage.find_user_trip(trip_id)
+
+def test_map_writes_skip_trip_read(seeded_client, storage, monkeypatch):
+    trip_id = create_trip(seeded_client)["tripId"]
+    counting = CountingReads(storage)
+    monkeypatch.setattr(database, "storage", counting)
+
+    seeded_client.patch(f"/api/trips/{trip_id}/activities", json={"changes": {"0-0": True}})
+    seeded_client.put(f"/api/trips/{trip_id}/progress", json={"completed_activities": {"0-0": True, "0-1": True}})
+    seeded_client.post("/api/trips/progress/batch", json={"updates": [{"trip_id": trip_id, "changes": {"0-2": True}}]})
+    assert counting.reads == []
+
+def test_bitset_trips_read_and_write_the_map(seeded_client, monkeypatch):
+    monkeypatch.setattr(database, "PROGRESS_ENCODING", "bitset")
+    trip_id = create_trip(seeded_client)["tripId"]
+    assert "completed_bits" in stored_trip(trip_id)
+
+    patched = seeded_client.patch(f"/api/trips/{trip_id}/activities", json={"changes": {"0-0": True, "1-2": True}})
+    assert patched.status_code == 200
+    seeded_client.post("/api/trips/progress/batch", json={"updates": [{"trip_id": trip_id, "changes": {"1-2": False}}]})
+
+    progress = seeded_client.get(f"/api/trips/{trip_id}/progress").json()
+    assert progress["completed_count"] == 1
+    assert progress["completed_activities"] == {"0-0": True}
+    assert "completed_activities" not in stored_trip(trip_id)
+
+def test_bitset_trips_found_after_cache_expiry(seeded_client, monkeypatch):
+    monkeypatch.setattr(database, "PROGRESS_ENCODING", "bitset")
+    trip_id = create_trip(seeded_client)["tripId"]
+    database.bitset_trips_cache.clear()
+
+    seeded_client.patch(f"/api/trips/{trip_id}/activities", json={"changes": {"0-1": True}})
+    assert seeded_client.get(f"/api/trips/{trip_id}/progress").json()["completed_activities"] == {"0-1": True}
@@ -0,0 +1,72 @@
+from search_index import PlanSearchIndex
+
+def plan(destination: str, tasks: list) -> dict:
+    budget_plan = {
+        "highlights": [],
+        "itinerary": [{"day": 1, "activities": [
+            {"id": index, "time": "10:00", "task": task, "type": "sightseeing"} for index, task in enumerate(tasks)
+        ]}],
+    }
+    return {"destination_name": destination, "backpacker": budget_plan}
+
+def page_through(index: PlanSearchIndex, query: str, limit: int, between_pages=None) -> list:
+    texts, after = [], None
+    while True:
+        page = index.search(query, limit=limit, after=after)
+        texts += [(result["destination"], result["text"]) for result in page["results"]]
+        after = page["next_after"]
+        if after is None:
+            return texts
+        if between_pages:
+            between_pages()
+
+def test_ranking_is_shortest_first():
+    index = PlanSearchIndex()
+    index.rebuild([("a", plan("A", ["museum visit with a long guided tour", "museum visit"]))])
+    results = index.search("museum")["results"]
+    assert [result["text"] for result in results] == ["museum visit", "museum visit with a long guided tour"]
+    assert results[0]["score"] > results[1]["score"]
+    # No query tokens, nothing to score
+    assert {result["score"] for result in index.search(activity_type="sightseeing")["results"]} == {0.0}
+
+def test_pages_survive_reindexing():
+    index = PlanSearchIndex()
+    index.rebuild([
+        ("a", plan("A", [f"museum visit a{number}" for number in range(4)])),
+        ("b", plan("B", [f"museum visit b{number}" for number in range(4)])),
+    ])
+    edited = plan("A", [f"museum visit a{number}" for number in range(5)])
+    edits = []
+
+    def edit_once():
+        if not edits:
+            edits.append(True)
+            index.add("a", edited)
+
+    # An edited plan moves behind the cursor: its entries may repeat, none are skipped
+    seen = page_through(index, "museum", limit=3, between_pages=edit_once)
+    assert set(seen) == {("A", f"museum visit a{number}") for number in range(5)} | {
+        ("B", f"museum visit b{number}") for number in range(4)
+    }
+
+def test_plan_search_endpoint(seeded_client):
+    body = seeded_client.get("/api/plans/search", params={"q": "eiffel"}).json()
+    assert body["total"] >= 1
+    assert all(result["destination"] == "Paris, France" for result in body["results"])
+    narrowed = seeded_client.get("/api/plans/search", params={"q": "eiffel", "type": "sightseeing"}).json()
+    assert narrowed["results"]
+    assert all(result["type"] == "sightseeing" for result in narrowed["results"])
+    assert narrowed["total"] == body["facets"]["type"]["sightseeing"]
+
+def test_plan_search_pages(seeded_client):
+    first = seeded_client.get("/api/plans/search", params={"type": "dining", "limit": 2}).json()
+    assert first["next_cursor"]
+    second = seeded_client.get("/api/plans/search", params={"type": "dining", "limit": 2, "cursor": first["next_cursor"]}).json()
+    keys = lambda page: {(result["destination"], result["tier"], result["key"]) for result in page["results"]}
+    assert not keys(first) & keys(second)
+
+def test_destination_typeahead(seeded_client):
+    results = seeded_client.get("/api/destinations/search", params={"q": "par"}).json()
+    assert [result["name"] for result in results] == ["Paris, France"]
+    assert seeded_client.get("/api/destinations/search", params={"q": "japan"}).json()[0]["name"] == "Tokyo, Japan"
+    assert seeded_client.get("/api/destinations/search", params={"q": "zzz"}).json() == []
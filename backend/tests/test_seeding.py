@@ -0,0 +1,62 @@
+import asyncio
+
+import pytest
+
+import database
+from conftest import clear_caches
+from models import DestinationCreate
+from seed_data import build_sample_catalog
+from seeding import SeedError, load_catalog, parse_catalog_record
+
+def run_with_storage(storage, work):
+    async def main():
+        await storage.connect()
+        try:
+            return await work()
+        finally:
+            await storage.close()
+    return asyncio.run(main())
+
+@pytest.fixture
+def catalog_storage(storage, monkeypatch):
+    clear_caches()
+    monkeypatch.setattr(database, "storage", storage)
+    return storage
+
+def test_load_catalog_is_idempotent(catalog_storage):
+    catalog = build_sample_catalog()
+
+    async def work():
+        first = await load_catalog(catalog, batch_size=2, concurrency=2)
+        again = await load_catalog(catalog, batch_size=2, concurrency=2)
+        return first, again, await catalog_storage.find_destinations()
+
+    first, again, destinations = run_with_storage(catalog_storage, work)
+    assert first.destinations == len(destinations) == sum(isinstance(record, DestinationCreate) for record in catalog)
+    assert first.travel_plans > 0
+    assert (again.destinations, again.travel_plans) == (first.destinations, first.travel_plans)
+
+def test_failed_batch_raises_after_the_rest_are_written(catalog_storage, monkeypatch):
+    upsert_destinations = catalog_storage.upsert_destinations
+
+    async def fail_on_oslo(documents):
+        if any(document["name"] == "Oslo" for document in documents):
+            raise ConnectionError("write failed")
+        return await upsert_destinations(documents)
+
+    monkeypatch.setattr(catalog_storage, "upsert_destinations", fail_on_oslo)
+    records = [DestinationCreate(name=name, country="X") for name in ("Lisbon", "Oslo", "Rome")]
+
+    async def work():
+        with pytest.raises(SeedError) as raised:
+            await load_catalog(records, batch_size=1)
+        return raised.value, await catalog_storage.find_destinations()
+
+    error, destinations = run_with_storage(catalog_storage, work)
+    assert len(error.errors) == 1
+    assert sorted(destination["name"] for destination in destinations) == ["Lisbon", "Rome"]
+
+def test_parse_catalog_record_shapes():
+    records = list(parse_catalog_record({"destination": {"name": "Lisbon", "country": "Portugal"}}))
+    assert [type(record).__name__ for record in records] == ["DestinationCreate"]
+    assert list(parse_catalog_record({"name": "Oslo", "country": "Norway"}))[0].name == "Oslo"
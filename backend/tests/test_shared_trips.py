@@ -0,0 +1,23 @@
+from conftest import create_trip
+
+def test_shared_trip_is_public_view(seeded_client):
+    trip = create_trip(seeded_client)
+    seeded_client.patch(f"/api/trips/{trip['tripId']}/activities", json={"changes": {"0-0": True}})
+
+    shared = seeded_client.get(f"/api/trips/shared/{trip['shareToken']}")
+    assert shared.status_code == 200
+    body = shared.json()
+    assert body["destination"] == "Paris, France"
+    assert body["completed_count"] == 1
+    assert body["progress_percentage"] > 0
+    assert not {"id", "user_email", "share_token", "completed_bits"} & set(body)
+
+def test_shared_trip_follows_progress(seeded_client):
+    trip = create_trip(seeded_client)
+    assert seeded_client.get(f"/api/trips/shared/{trip['shareToken']}").json()["completed_count"] == 0
+    # Writes invalidate the cached view
+    seeded_client.patch(f"/api/trips/{trip['tripId']}/activities", json={"changes": {"0-0": True, "0-1": True}})
+    assert seeded_client.get(f"/api/trips/shared/{trip['shareToken']}").json()["completed_count"] == 2
+
+def test_unknown_share_token_returns_404(seeded_client):
+    assert seeded_client.get("/api/trips/shared/unknown-token").status_code == 404
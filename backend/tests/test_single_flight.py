@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+
+import database
+from cache import TTLCache
+from conftest import clear_caches
+from database import DatabaseManager
+from memory_storage import MemoryStorage
+from models import DestinationCreate, UserTripCreate, UserTripUpdate
+from singleflight import SingleFlight
+
+class GatedReads(MemoryStorage):
+    """Memory storage whose lookups read, then wait for release() before returning"""
+
+    def __init__(self):
+        super().__init__()
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.lookups = 0
+
+    def hold(self):
+        self.gate.clear()
+
+    def release(self):
+        self.gate.set()
+
+    async def lookups_reached(self, count: int):
+        """Wait until count lookups have read storage; fails if a read joined another instead"""
+        async def reached():
+            while self.lookups < count:
+                await asyncio.sleep(0)
+        await asyncio.wait_for(reached(), timeout=1)
+
+    async def gated(self, document):
+        # Copied at read time, like a document fetched from a database
+        document = dict(document) if document else None
+        self.lookups += 1
+        await self.gate.wait()
+        return document
+
+    async def find_destination(self, name_key):
+        return await self.gated(await super().find_destination(name_key))
+
+    async def find_user_trip(self, trip_id):
+        return await self.gated(await super().find_user_trip(trip_id))
+
+@pytest.fixture
+def gated_storage():
+    clear_caches()
+    database.storage = GatedReads()
+    yield database.storage
+    database.storage = None
+
+def test_stale_generation_is_not_stored():
+    cache = TTLCache()
+    generation = cache.generation
+    cache.invalidate("key")
+    cache.set("key", "stale", generation)
+    assert cache.get("key") is None
+    cache.set("key", "fresh", cache.generation)
+    assert cache.get("key") == "fresh"
+    assert cache.stats()["stale_writes"] == 1
+
+def test_single_flight_coalesces_concurrent_calls():
+    async def scenario():
+        flights = SingleFlight()
+        calls = []
+
+        async def load():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flights.do("key", load) for _ in range(10)))
+        assert results == ["value"] * 10
+        assert len(calls) == 1
+        assert flights.stats()["coalesced"] == 9
+    asyncio.run(scenario())
+
+def test_load_in_flight_across_invalidation_is_not_cached(gated_storage):
+    async def scenario():
+        await DatabaseManager.upsert_destinations([DestinationCreate(name="Lisbon", country="Portugal")])
+        gated_storage.hold()
+        before = asyncio.ensure_future(DatabaseManager.get_destination_by_name("Lisbon"))
+        await gated_storage.lookups_reached(1)
+
+        await DatabaseManager.upsert_destinations([DestinationCreate(name="Lisbon", country="Portugal", popular=True)])
+        after = asyncio.ensure_future(DatabaseManager.get_destination_by_name("Lisbon"))
+        await gated_storage.lookups_reached(2)
+        gated_storage.release()
+
+        # The earlier read may see the old document, but a read after the write does not join it
+        assert (await before).popular is False
+        assert (await after).popular is True
+        assert (await DatabaseManager.get_destination_by_name("Lisbon")).popular is True
+    asyncio.run(scenario())
+
+def test_trip_reads_see_completed_writes(gated_storage):
+    async def scenario():
+        trip = await DatabaseManager.create_user_trip(UserTripCreate(
+            destination="Lisbon",
+            start_date="2026-03-01T00:00:00",
+            end_date="2026-03-03T00:00:00",
+            travelers=1,
+            selected_budget="backpacker",
+        ))
+        gated_storage.hold()
+        before = asyncio.ensure_future(DatabaseManager.get_user_trip(trip.id))
+        await gated_storage.lookups_reached(1)
+
+        await DatabaseManager.update_trip_progress(trip.id, UserTripUpdate(completed_activities={"0-0": True}))
+        after = asyncio.ensure_future(DatabaseManager.get_user_trip(trip.id))
+        await gated_storage.lookups_reached(2)
+        gated_storage.release()
+
+        assert (await before).completed_count == 0
+        assert (await after).completed_count == 1
+    asyncio.run(scenario())
@@ -0,0 +1,110 @@
+import asyncio
+from datetime import datetime
+
+from storage import PROGRESS_COUNT_FIELDS
+
+def run(storage, scenario):
+    """Run scenario(storage) on a connected backend"""
+    async def main():
+        await storage.connect()
+        try:
+            await scenario(storage)
+        finally:
+            await storage.close()
+    asyncio.run(main())
+
+def destination(name_key: str, **fields) -> dict:
+    return {"id": f"id-{name_key}", "name": name_key.title(), "name_key": name_key, "country": "X", "popular": False, **fields}
+
+def trip(trip_id: str, **fields) -> dict:
+    return {
+        "id": trip_id,
+        "destination": "Paris, France",
+        "selected_budget": "backpacker",
+        "start_date": datetime(2026, 3, 1),
+        "end_date": datetime(2026, 3, 4),
+        "travelers": 1,
+        "completed_activities": {},
+        "completed_count": 0,
+        "total_activities": 18,
+        "share_token": f"token-{trip_id}",
+        "user_email": "traveler@example.com",
+        "created_at": datetime(2026, 2, 1),
+        **fields,
+    }
+
+def test_upsert_keeps_insert_only_fields(storage):
+    async def scenario(storage):
+        await storage.upsert_destinations([destination("lisbon", created_at=datetime(2026, 1, 1))])
+        await storage.upsert_destinations([
+            destination("lisbon", id="replaced", popular=True, created_at=datetime(2026, 2, 1))
+        ])
+        stored = await storage.find_destination("lisbon")
+        assert stored["id"] == "id-lisbon"
+        assert stored["created_at"] == datetime(2026, 1, 1)
+        assert stored["popular"] is True
+    run(storage, scenario)
+
+def test_iter_destinations_pages_by_name_key(storage):
+    async def scenario(storage):
+        await storage.upsert_destinations([destination(key, popular=key != "cairo") for key in ("cairo", "athens", "denver", "bern")])
+        first = [document["name_key"] async for document in storage.iter_destinations(2)]
+        assert first == ["athens", "bern"]
+        rest = [document["name_key"] async for document in storage.iter_destinations(10, after="bern")]
+        assert rest == ["cairo", "denver"]
+        popular = [document["name_key"] async for document in storage.iter_destinations(popular_only=True, fields=["name"])]
+        assert popular == ["athens", "bern", "denver"]
+    run(storage, scenario)
+
+def test_find_travel_plans_in_one_query(storage):
+    async def scenario(storage):
+        await storage.upsert_travel_plans([
+            {"id": f"plan-{key}", "destination_key": key, "destination_name": key.title()} for key in ("rome", "oslo")
+        ])
+        plans = await storage.find_travel_plans(["rome", "oslo", "unknown"])
+        assert set(plans) == {"rome", "oslo"}
+        assert "_id" not in plans["rome"]
+    run(storage, scenario)
+
+def test_insert_user_trips_is_idempotent(storage):
+    async def scenario(storage):
+        stored, errors = await storage.insert_user_trips([trip("a"), trip("b")])
+        assert errors == {}
+        stored, errors = await storage.insert_user_trips([trip("a", share_token="other"), trip("c")])
+        assert stored == {"a": "token-a", "c": "token-c"}
+        assert (await storage.find_user_trip_by_token("token-b"))["id"] == "b"
+    run(storage, scenario)
+
+def test_activity_changes_adjust_count(storage):
+    async def scenario(storage):
+        await storage.insert_user_trip(trip("a"))
+        counts = await storage.apply_activity_changes("a", {"0-0": True, "0-1": True})
+        assert set(counts) <= set(PROGRESS_COUNT_FIELDS)
+        assert counts["completed_count"] == 2
+        # Repeating a change does not count it twice
+        counts = await storage.apply_activity_changes("a", {"0-0": True, "0-1": False})
+        assert counts["completed_count"] == 1
+        assert await storage.apply_activity_changes("missing", {"0-0": True}) is None
+
+        await storage.apply_progress_changes([("a", {"0-2": True}), ("missing", {"0-0": True}), ("a", {"0-2": False})])
+        stored = await storage.find_user_trip("a")
+        assert stored["completed_count"] == 1
+        assert stored["completed_activities"]["0-0"] is True
+        assert (await storage.find_progress_counts(["a", "missing"])).keys() == {"a"}
+    run(storage, scenario)
+
+def test_trips_by_start_in_range(storage):
+    async def scenario(storage):
+        await storage.insert_user_trips([
+            trip("march", start_date=datetime(2026, 3, 1)),
+            trip("may", start_date=datetime(2026, 5, 1)),
+            trip("april", start_date=datetime(2026, 4, 1)),
+        ])
+        in_range = [
+            document["id"]
+            async for document in storage.iter_user_trips_by_start(datetime(2026, 3, 15), datetime(2026, 5, 1), ("id",), 1)
+        ]
+        assert in_range == ["april"]
+        every = [document["id"] async for document in storage.iter_user_trips_by_start(None, None, ("id",), 2)]
+        assert every == ["march", "april", "may"]
+    run(storage, scenario)
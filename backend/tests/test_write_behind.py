@@ -0,0 +1,96 @@
+import asyncio
+
+import database
+from conftest import clear_caches
+from database import DatabaseManager
+from models import ActivityProgressDelta, UserTripCreate
+from write_behind import ProgressWriteBuffer
+
+class Recorder:
+    """Flush callback recording each batch; fails the first `failures` calls"""
+
+    def __init__(self, failures: int = 0):
+        self.batches = []
+        self.failures = failures
+
+    async def __call__(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("storage unavailable")
+        self.batches.append(batch)
+
+def test_changes_merge_until_the_window_ends():
+    async def scenario():
+        recorder = Recorder()
+        buffer = ProgressWriteBuffer(recorder, window_seconds=0.01)
+        buffer.add("a", {"0-0": True, "0-1": True})
+        buffer.add("a", {"0-1": False})
+        buffer.add("b", {"1-0": True})
+        assert buffer.apply_pending("a", {"0-1": True, "0-2": True}, 2) == ({"0-0": True, "0-1": False, "0-2": True}, 2)
+
+        await asyncio.sleep(0.05)
+        assert recorder.batches == [{"a": {"0-0": True, "0-1": False}, "b": {"1-0": True}}]
+        assert buffer.stats()["pending_changes"] == 0
+        assert buffer.pending_changes("a") == {}
+    asyncio.run(scenario())
+
+def test_full_buffer_flushes_at_once_and_close_waits_for_it():
+    async def scenario():
+        recorder = Recorder()
+        buffer = ProgressWriteBuffer(recorder, window_seconds=60, max_pending=2)
+        buffer.add("a", {"0-0": True, "0-1": True})
+        # Flushing in the background, without waiting for the window
+        assert len(buffer._tasks) == 1 and buffer._timer is None
+        await buffer.close()
+        assert recorder.batches == [{"a": {"0-0": True, "0-1": True}}]
+        assert not buffer._tasks
+    asyncio.run(scenario())
+
+def test_failed_flush_is_requeued_behind_newer_changes():
+    async def scenario():
+        recorder = Recorder(failures=1)
+        buffer = ProgressWriteBuffer(recorder, window_seconds=0.01)
+        buffer.add("a", {"0-0": True, "0-1": True})
+        await buffer.flush()
+        assert buffer.stats()["flush_failures"] == 1
+        # Still visible to reads while waiting for the retry
+        assert buffer.pending_changes("a") == {"0-0": True, "0-1": True}
+
+        buffer.add("a", {"0-1": False})
+        await asyncio.sleep(0.05)
+        assert recorder.batches == [{"a": {"0-0": True, "0-1": False}}]
+        assert buffer.stats()["pending_changes"] == 0
+    asyncio.run(scenario())
+
+def test_buffered_changes_reach_storage(storage, monkeypatch):
+    async def scenario():
+        await storage.connect()
+        try:
+            trip = await DatabaseManager.create_user_trip(UserTripCreate(
+                destination="Lisbon",
+                start_date="2026-03-01T00:00:00",
+                end_date="2026-03-03T00:00:00",
+                travelers=1,
+                selected_budget="backpacker",
+            ))
+            assert not await DatabaseManager.queue_activity_changes("missing", ActivityProgressDelta(changes={"0-0": True}))
+            assert await DatabaseManager.queue_activity_changes(trip.id, ActivityProgressDelta(changes={"0-0": True, "0-1": True}))
+            assert database.progress_buffer.stats()["pending_trips"] == 1
+
+            # Reads overlay the buffer before the flush
+            assert (await DatabaseManager.get_user_trip(trip.id)).completed_count == 2
+            assert (await storage.find_user_trip(trip.id))["completed_count"] == 0
+
+            await DatabaseManager.flush_progress_buffer()
+            stored = await storage.find_user_trip(trip.id)
+            assert stored["completed_count"] == 2
+            assert stored["completed_activities"] == {"0-0": True, "0-1": True}
+        finally:
+            await storage.close()
+
+    clear_caches()
+    monkeypatch.setattr(database, "storage", storage)
+    monkeypatch.setattr(database, "progress_buffer", ProgressWriteBuffer(
+        DatabaseManager.write_buffered_progress, window_seconds=60
+    ))
+    asyncio.run(scenario())
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Coroutine, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Changes = Dict[str, bool]
+
+class ProgressWriteBuffer:
+    """Merges activity check-offs per trip in memory and writes them as one coalesced bulk update"""
+
+    def __init__(
+        self,
+        flush_callback: Callable[[Dict[str, Changes]], Awaitable[None]],
+        window_seconds: float = 0.25,
+        max_pending: int = 1000,
+    ):
+        self._flush_callback = flush_callback
+        self.window_seconds = window_seconds
+        self.max_pending = max_pending
+        self._pending: Dict[str, Changes] = {}
+        self._pending_count = 0
+        # Batches handed to the database but not yet acknowledged, still visible to reads
+        self._flushing: List[Dict[str, Changes]] = []
+        self._timer: Optional[asyncio.Task] = None
+        # Referenced until done, so the loop can't drop a flush mid-write; close() awaits them
+        self._tasks: Set[asyncio.Task] = set()
+        self._flush_lock = asyncio.Lock()
+        self.queued = 0
+        self.flushes = 0
+        self.flushed_changes = 0
+        self.flush_failures = 0
+
+    def add(self, trip_id: str, changes: Changes):
+        """Queue changes for a trip; later values for the same activity win"""
+        trip_changes = self._pending.setdefault(trip_id, {})
+        for key, completed in changes.items():
+            if key not in trip_changes:
+                self._pending_count += 1
+            trip_changes[key] = completed
+        self.queued += len(changes)
+
+        if self._pending_count >= self.max_pending:
+            self._cancel_timer()
+            self._spawn(self.flush())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_after_window())
+
+    def _spawn(self, coroutine: Coroutine) -> asyncio.Task:
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Error in buffered progress flush: {task.exception()}")
+
+    def pending_changes(self, trip_id: str) -> Changes:
+        """Unwritten changes for a trip, oldest batch first"""
+        merged: Changes = {}
+        for batch in (*self._flushing, self._pending):
+            merged.update(batch.get(trip_id, {}))
+        return merged
+
+    def apply_pending(self, trip_id: str, completed_activities: Changes, completed_count: int) -> Tuple[Changes, int]:
+        """Overlay unwritten changes on a stored progress map so reads see the caller's own writes"""
+        pending = self.pending_changes(trip_id)
+        if not pending:
+            return completed_activities, completed_count
+        merged = dict(completed_activities)
+        for key, completed in pending.items():
+            was_completed = bool(merged.get(key))
+            completed_count += int(completed) - int(was_completed)
+            merged[key] = completed
+        return merged, completed_count
+
+    async def _flush_after_window(self):
+        try:
+            await asyncio.sleep(self.window_seconds)
+        except asyncio.CancelledError:
+            return
+        self._timer = None
+        await self.flush()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    async def flush(self):
+        """Write everything queued so far"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch, self._pending, self._pending_count = self._pending, {}, 0
+            self._flushing.append(batch)
+            try:
+                await self._flush_callback(batch)
+                self.flushes += 1
+                self.flushed_changes += sum(len(changes) for changes in batch.values())
+            except Exception as e:
+                self.flush_failures += 1
+                logger.error(f"Error flushing buffered progress for {len(batch)} trips: {e}")
+                # Requeue for the next window without overriding anything newer
+                for trip_id, changes in batch.items():
+                    trip_changes = self._pending.setdefault(trip_id, {})
+                    for key, completed in changes.items():
+                        if key not in trip_changes:
+                            trip_changes[key] = completed
+                            self._pending_count += 1
+                if self._timer is None:
+                    self._timer = self._spawn(self._flush_after_window())
+            finally:
+                self._flushing.remove(batch)
+
+    async def close(self):
+        """Stop the timer, wait for flushes already started and flush whatever is left; called on shutdown"""
+        self._cancel_timer()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending_trips": len(self._pending),
+            "pending_changes": self._pending_count,
+            "queued": self.queued,
+            "flushes": self.flushes,
+            "flushed_changes": self.flushed_changes,
+            "flush_failures": self.flush_failures,
+        }
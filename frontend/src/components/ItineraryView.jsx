@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   ArrowLeft, 
   Clock, 
@@ -56,6 +56,9 @@ const ItineraryView = ({
   const [loading, setLoading] = useState(true);
   const [checkedItems, setCheckedItems] = useLocalStorage(`trip-progress-${savedTripId || 'local'}`, {});
   const [savingProgress, setSavingProgress] = useState(false);
+  // Toggles not yet sent, by activity key; flushed one PATCH at a time so none are dropped
+  const pendingChanges = useRef({});
+  const flushing = useRef(false);
   const { toast } = useToast();
   
   const budgetInfo = budgetTypes[selectedBudget];
@@ -116,15 +119,35 @@ const ItineraryView = ({
     setCheckedItems(newCheckedItems);
     
     // Save progress to backend if we have a trip ID
-    if (savedTripId && !savingProgress) {
-      setSavingProgress(true);
-      try {
-        await api.updateTripProgress(savedTripId, newCheckedItems);
-      } catch (error) {
-        console.log('Failed to save progress to backend, using local storage');
-      } finally {
-        setSavingProgress(false);
+    if (savedTripId) {
+      pendingChanges.current[key] = newCheckedItems[key];
+      flushProgress();
+    }
+  };
+
+  const flushProgress = async () => {
+    if (flushing.current) {
+      // The running flush sends this change once its request finishes
+      return;
+    }
+    flushing.current = true;
+    setSavingProgress(true);
+    try {
+      while (Object.keys(pendingChanges.current).length > 0) {
+        const changes = pendingChanges.current;
+        pendingChanges.current = {};
+        try {
+          await api.updateTripActivities(savedTripId, changes);
+        } catch (error) {
+          // Keep unsent changes for the next flush; newer toggles of the same activity win
+          pendingChanges.current = { ...changes, ...pendingChanges.current };
+          console.log('Failed to save progress to backend, using local storage');
+          break;
+        }
       }
+    } finally {
+      flushing.current = false;
+      setSavingProgress(false);
     }
   };
 
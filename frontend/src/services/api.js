@@ -34,10 +34,11 @@ export const api = {
   // Get popular destinations
   getDestinations: async (popularOnly = true) => {
     try {
+      // First page only, with just the fields the destination picker renders
       const response = await apiClient.get('/destinations', {
-        params: { popular: popularOnly }
+        params: { popular: popularOnly, limit: 24, fields: 'name,country,popular,image_url' }
       });
-      return response.data;
+      return response.data.items;
     } catch (error) {
       console.error('Error fetching destinations:', error);
       // Return fallback data if API fails
@@ -107,6 +108,20 @@ export const api = {
     }
   },
 
+  // Check off or uncheck only the activities that changed
+  updateTripActivities: async (tripId, changes) => {
+    try {
+      const response = await apiClient.patch(`/trips/${tripId}/activities`, {
+        changes
+      });
+      return response.data;
+    } catch (error) {
+      console.error('Error updating trip activities:', error);
+      // The caller keeps the changes and resends them with its next flush
+      throw new Error('Failed to update trip activities');
+    }
+  },
+
   // Get shared trip
   getSharedTrip: async (shareToken) => {
     try {